@@ -1,16 +1,19 @@
-from django.contrib import admin
+import os
+
+from django.conf import settings
+from django.contrib import admin, messages
 from django.urls import path, reverse
 from django.template.response import TemplateResponse
-from django.utils.html import format_html
-from django.shortcuts import get_object_or_404
-from decimal import Decimal
-from django.http import HttpResponse
-from django.db.models import Sum
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import pagesizes
+from django.utils.html import format_html, format_html_join
+from django.shortcuts import get_object_or_404, redirect
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.db.models import Count
+from django.db import connections
+from django.core.paginator import Paginator
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property, lazy
+from django.core.exceptions import PermissionDenied, ValidationError
 
 from .models import (
     Account,
@@ -22,15 +25,356 @@ from .models import (
     PayMoney,
     SalePurchase,
     CashBankTransaction,
+    Invoice,
+    FiscalYear,
+    YearBalance,
+    Job,
+    StockAlert,
+    RequestProfile,
+)
+from . import search, tenancy, reporting, jobs, master_import, stock, voiding, profiling
+from .ledger import (
+    AccountLedger,
+    PartyLedger,
+    StockLedger,
+    CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    STREAM_THRESHOLD,
 )
 
 # =====================================================
 # ADMIN BRANDING
 # =====================================================
 
-admin.site.site_header = "Bhavikha Plastic Pvt Ltd"
-admin.site.site_title = "Bhavikha Plastic Admin"
-admin.site.index_title = "Bhavikha Plastic Accounts Panel"
+# Evaluated per request, so each company sees its own name
+admin.site.site_header = lazy(lambda: tenancy.company()["name"], str)()
+admin.site.site_title = lazy(lambda: f"{tenancy.company()['short_name']} Admin", str)()
+admin.site.index_title = lazy(lambda: f"{tenancy.company()['short_name']} Accounts Panel", str)()
+
+# Rows returned by an autocomplete lookup (changelist searches are paged)
+SEARCH_RESULT_LIMIT = 50
+
+
+# =====================================================
+# ESTIMATED COUNT PAGINATOR (LARGE CHANGELISTS)
+# =====================================================
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts exactly up to ``exact_count_limit`` rows (a bounded
+    COUNT over a LIMIT subquery). Beyond that an unfiltered changelist
+    takes the row count from SQLite's planner statistics (sqlite_stat1,
+    filled by ANALYZE / PRAGMA optimize) instead of a full COUNT(*).
+
+    ``base`` is the admin's own queryset: a proxy admin's purpose /
+    type filter with nothing else applied is counted on its
+    (purpose, date) / (transaction_type, date) index alone. Any further
+    filter (list_filter, search, date drill-down) stops at the capped
+    count instead: its pages all exist and the total shows as
+    "10000+" (``capped``).
+    """
+
+    exact_count_limit = 10000
+    capped = False
+
+    def __init__(self, *args, base=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base = base
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        capped = queryset[:self.exact_count_limit + 1].count()
+        if capped <= self.exact_count_limit:
+            return capped
+
+        where = queryset.query.where
+        if where and self.base is not None and where == self.base.query.where:
+            return self.base.order_by().count()
+
+        if where:
+            self.capped = True
+            return capped
+
+        estimate = self.estimated_table_rows(queryset.model, queryset.db)
+        if estimate is None:
+            return queryset.count()
+
+        return max(estimate, capped)
+
+    @staticmethod
+    def estimated_table_rows(model, using):
+        connection = connections[using]
+        if connection.vendor != "sqlite":
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = %s",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        # First number in the stat column is the table row count
+        return int(row[0].split()[0])
+
+
+# =====================================================
+# LEDGER PAGE HELPERS (CLASSIC / STREAMING)
+# =====================================================
+
+# Filled in by ledger.js once the totals request returns
+STREAM_TOTALS_PLACEHOLDER = dict.fromkeys(("opening", "credit", "debit", "closing"), "…")
+
+
+def ledger_year(request):
+    """
+    Closed FiscalYear picked with ?year=<id>, or None for the live books.
+    """
+    year_id = request.GET.get("year")
+    if not year_id or not year_id.isdigit():
+        return None
+    return get_object_or_404(FiscalYear, pk=year_id, is_closed=True)
+
+
+def ledger_context(request, source, rows_url_name, pk):
+    """
+    Small ledgers render every row in the template. Long ones (or
+    ?view=stream) send only the page shell; rows (and the totals) are
+    fetched from the JSON endpoint by static/js/ledger.js.
+    """
+    view = request.GET.get("view")
+    count = source.count()
+
+    stream = view == "stream" or (view != "full" and count > STREAM_THRESHOLD)
+
+    rows_url = reverse(rows_url_name, args=[pk])
+    if source.year is not None:
+        rows_url += f"?year={source.year.pk}"
+
+    return {
+        "stream": stream,
+        "row_count": count,
+        "rows_url": rows_url,
+        "year": source.year,
+        "snapshot": reporting.status(),
+        "closed_years": FiscalYear.objects.filter(is_closed=True),
+        "chunk_size": CHUNK_SIZE,
+        "columns": list(zip(source.COLUMNS, source.HEADERS)),
+        "signed_column": source.SIGNED_COLUMN,
+        "totals": STREAM_TOTALS_PLACEHOLDER if stream else source.totals(),
+        "ledger": [] if stream else source.rows(),
+    }
+
+
+def ledger_rows_response(request, source):
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+        limit = int(request.GET.get("limit", CHUNK_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "offset and limit must be integers"}, status=400)
+
+    if request.GET.get("totals"):
+        return JsonResponse(source.totals_json())
+
+    limit = max(1, min(limit, MAX_CHUNK_SIZE))
+    return JsonResponse(source.chunk(offset, limit))
+
+
+def enqueue_job(modeladmin, request, name, **kwargs):
+    """
+    Queue a background job from an admin action and point the user at it.
+    """
+    job = jobs.enqueue(name, user=request.user, **kwargs)
+    url = reverse("admin:accounting_job_change", args=[job.pk])
+
+    modeladmin.message_user(
+        request,
+        format_html('Queued job <a href="{}">#{}</a> ({}). It runs in the background.', url, job.pk, name),
+        messages.SUCCESS,
+    )
+    return job
+
+
+def export_ledgers_action(kind):
+    def export(modeladmin, request, queryset):
+        enqueue_job(modeladmin, request, "export_ledgers", kind=kind, ids=list(queryset.values_list("pk", flat=True)))
+
+    export.__name__ = f"export_{kind}_ledgers"
+    return admin.action(description="Export full ledgers to CSV (background job)")(export)
+
+
+class MasterImportMixin:
+    """
+    "Import CSV / XLSX" button on a master changelist: upserts the
+    uploaded rows (accounting.master_import) or lists every bad row.
+    """
+
+    import_kind = None
+    change_list_template = "master_import_change_list.html"
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="%s_%s_import" % info,
+            ),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        kind = master_import.KINDS[self.import_kind]
+        errors = []
+
+        if request.method == "POST" and request.FILES.get("file"):
+            upload = request.FILES["file"]
+            try:
+                table = master_import.read_table(upload.file, upload.name)
+                result = master_import.import_masters(self.import_kind, table)
+            except master_import.ImportFailed as failure:
+                errors = failure.errors
+            else:
+                self.message_user(
+                    request,
+                    f"{result['created']} created, {result['updated']} updated, {result['unchanged']} unchanged.",
+                    messages.SUCCESS,
+                )
+                info = self.model._meta.app_label, self.model._meta.model_name
+                return redirect("admin:%s_%s_changelist" % info)
+
+        return TemplateResponse(
+            request,
+            "master_import.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": f"Import {self.model._meta.verbose_name_plural}",
+                "columns": kind.columns,
+                "required": kind.required,
+                "key": " + ".join(kind.key),
+                "errors": errors,
+            },
+        )
+
+
+class RankedChangeList(ChangeList):
+    """
+    A search keeps the ranking from accounting.search; the admin's
+    ordering only breaks ties. Sorting by a column still wins.
+    """
+
+    def get_ordering(self, request, queryset):
+        if self.query and not self.params.get(ORDER_VAR):
+            return self._get_deterministic_ordering(queryset.query.order_by)
+        return super().get_ordering(request, queryset)
+
+
+class RankedSearchMixin:
+    """
+    Party / product search through the FTS index (accounting.search),
+    within the filtered queryset. Autocomplete gets the best
+    SEARCH_RESULT_LIMIT matches; the changelist pages through all of
+    them, best first.
+    """
+
+    # search_parties / search_inventory
+    search_lookup = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+
+        autocomplete = getattr(request.resolver_match, "url_name", None) == "autocomplete"
+        lookup = getattr(search, self.search_lookup)
+        return lookup(
+            search_term, queryset, limit=SEARCH_RESULT_LIMIT if autocomplete else None
+        ), False
+
+    def get_changelist(self, request, **kwargs):
+        return RankedChangeList
+
+
+class LastRateMixin:
+    """
+    Sale / purchase forms: choosing the party and product fills an
+    empty price with the last rate and lists the recent ones under it
+    (static/js/rates.js reading /api/rates/).
+    """
+
+    # "sale" / "purchase"; None reads the form's own purpose field
+    rate_purpose = None
+
+    class Media:
+        js = ("js/rates.js",)
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        field = super().formfield_for_dbfield(db_field, request, **kwargs)
+        if db_field.name == "price_per_unit":
+            field.widget.attrs.update({
+                "data-rates-url": reverse("last-rates"),
+                "data-purpose": self.rate_purpose or "",
+            })
+        return field
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Shared changelist settings for the transaction proxy admins:
+    joined loads, no full-table COUNT(*), indexed date ordering.
+    Posted rows are voided (accounting.voiding), never deleted.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+    list_per_page = 50
+    actions = ['void_selected']
+
+    # voiding.void() argument per concrete model
+    VOID_KINDS = {SalePurchase: 'sales', Invoice: 'invoices', CashBankTransaction: 'cash'}
+
+    def has_delete_permission(self, request, obj=None):
+        # A delete would leave party / account / stock balances wrong
+        return False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            base=self.get_queryset(request),
+        )
+
+    @admin.action(description="Void selected (post reversing entries)", permissions=['add'])
+    def void_selected(self, request, queryset):
+        kind = self.VOID_KINDS[self.model._meta.concrete_model]
+
+        try:
+            result = voiding.void(**{kind: queryset})
+        except ValidationError as error:
+            self.message_user(request, " ".join(error.messages), messages.ERROR)
+            return
+
+        self.message_user(
+            request,
+            f"Voided {result[kind]} row(s): corrected {result['parties']} party, "
+            f"{result['accounts']} account and {result['products']} product balance(s).",
+            messages.SUCCESS,
+        )
 
 
 # =====================================================
@@ -38,9 +382,12 @@ admin.site.index_title = "Bhavikha Plastic Accounts Panel"
 # =====================================================
 
 @admin.register(Account)
-class AccountAdmin(admin.ModelAdmin):
+class AccountAdmin(MasterImportMixin, admin.ModelAdmin):
     list_display = ('name', 'account_type', 'balance', 'view_ledger')
     readonly_fields = ('balance', 'created_at')
+    search_fields = ('^name',)
+    actions = [export_ledgers_action('account')]
+    import_kind = 'account'
 
     def view_ledger(self, obj):
         url = reverse("admin:account-ledger", args=[obj.pk])
@@ -56,89 +403,77 @@ class AccountAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.account_ledger_view),
                 name="account-ledger",
             ),
+            path(
+                "<int:account_id>/account-ledger/rows/",
+                self.admin_site.admin_view(self.account_ledger_rows_view),
+                name="account-ledger-rows",
+            ),
         ]
         return custom + urls
 
+    @reporting.reporting_view
     def account_ledger_view(self, request, account_id):
         account = get_object_or_404(Account, pk=account_id)
-
-        sales = SalePurchase.objects.filter(
-            account=account,
-            payment_mode="cash"
-        )
-
-        cash_txns = CashBankTransaction.objects.filter(
-            account=account
-        )
-
-        combined = []
-
-        for s in sales:
-            combined.append({
-                "date": s.date,
-                "type": s.purpose.upper(),
-                "party": s.party.name,
-                "amount": s.amount
-            })
-
-        for c in cash_txns:
-            combined.append({
-                "date": c.date,
-                "type": c.transaction_type.upper(),
-                "party": c.party.name,
-                "amount": c.amount
-            })
-
-        combined.sort(key=lambda x: x["date"])
-
-        balance = account.opening_balance or Decimal("0")
-
-        ledger = []
-        for entry in combined:
-
-            if entry["type"] in ["SALE", "RECEIVE"]:
-                balance += entry["amount"]
-                credit = entry["amount"]
-                debit = Decimal("0")
-            else:
-                balance -= entry["amount"]
-                debit = entry["amount"]
-                credit = Decimal("0")
-
-            ledger.append({
-                "date": entry["date"],
-                "type": entry["type"],
-                "party": entry["party"],
-                "debit": debit,
-                "credit": credit,
-                "balance": balance
-            })
+        source = AccountLedger(account, year=ledger_year(request))
 
         return TemplateResponse(
             request,
             "account_ledger.html",
             {
                 **self.admin_site.each_context(request),
+                **ledger_context(request, source, "admin:account-ledger-rows", account.pk),
                 "account": account,
-                "ledger": ledger,
             },
         )
 
+    @reporting.reporting_view
+    def account_ledger_rows_view(self, request, account_id):
+        account = get_object_or_404(Account, pk=account_id)
+        return ledger_rows_response(request, AccountLedger(account, year=ledger_year(request)))
+
 
 # =====================================================
 # PARTY ADMIN WITH LEDGER
 # =====================================================
 
 @admin.register(Party)
-class PartyAdmin(admin.ModelAdmin):
+class PartyAdmin(RankedSearchMixin, MasterImportMixin, admin.ModelAdmin):
     list_display = ('name', 'party_type', 'credit_balance', 'view_ledger')
     list_filter = ('party_type',)
+    # Prefix lookups so the name / phone indexes can be used
+    search_fields = ('^name', '^phone')
+    ordering = ('name',)
+    actions = [export_ledgers_action('party'), 'rebuild_search_index']
+    import_kind = 'party'
+    search_lookup = 'search_parties'
+
+    # Autocomplete on the sale / purchase / receive / pay forms only
+    # offers parties of the matching type
+    AUTOCOMPLETE_PARTY_TYPES = {
+        'sale': 'customer',
+        'receivemoney': 'customer',
+        'purchase': 'supplier',
+        'paymoney': 'supplier',
+    }
+
+    def get_search_results(self, request, queryset, search_term):
+        party_type = self.AUTOCOMPLETE_PARTY_TYPES.get(
+            request.GET.get('model_name')
+        )
+        if party_type:
+            queryset = queryset.filter(party_type=party_type)
+
+        return super().get_search_results(request, queryset, search_term)
 
     def get_readonly_fields(self, request, obj=None):
         if obj:
             return ('opening_balance', 'credit_balance')
         return ('credit_balance',)
 
+    @admin.action(description="Rebuild party / product search index (background job)")
+    def rebuild_search_index(self, request, queryset):
+        enqueue_job(self, request, "rebuild_search_index")
+
     def view_ledger(self, obj):
         url = reverse("admin:party-ledger", args=[obj.pk])
         return format_html('<a class="button" href="{}">View Ledger</a>', url)
@@ -153,79 +488,48 @@ class PartyAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.party_ledger_view),
                 name="party-ledger",
             ),
+            path(
+                "<int:party_id>/ledger/rows/",
+                self.admin_site.admin_view(self.party_ledger_rows_view),
+                name="party-ledger-rows",
+            ),
         ]
         return custom + urls
 
+    @reporting.reporting_view
     def party_ledger_view(self, request, party_id):
         party = get_object_or_404(Party, pk=party_id)
+        source = PartyLedger(party, year=ledger_year(request))
 
-        sales = SalePurchase.objects.filter(party=party)
-        cash = CashBankTransaction.objects.filter(party=party)
-
-        combined = []
-
-        for s in sales:
-            combined.append({
-                "date": s.date,
-                "type": s.purpose.upper(),
-                "mode": s.payment_mode.upper(),
-                "product": s.inventory.name,
-                "quantity": s.quantity,
-                "rate": s.price_per_unit,
-                "amount": s.amount
-            })
-
-        for c in cash:
-            combined.append({
-                "date": c.date,
-                "type": c.transaction_type.upper(),
-                "mode": "CASH",
-                "product": "-",
-                "quantity": "",
-                "rate": "",
-                "amount": c.amount
-            })
-
-        combined.sort(key=lambda x: x["date"])
-
-        balance = party.opening_balance or Decimal("0")
-        ledger = []
-
-        for entry in combined:
-
-            # Only credit transactions affect receivable
-            if entry["type"] == "SALE" and entry["mode"] == "CREDIT":
-                balance += entry["amount"]
-
-            elif entry["type"] == "PURCHASE" and entry["mode"] == "CREDIT":
-                balance -= entry["amount"]
-
-            elif entry["type"] == "RECEIVE":
-                balance -= entry["amount"]
-
-            elif entry["type"] == "PAY":
-                balance += entry["amount"]
-
-            ledger.append({
-                **entry,
-                "balance": balance
-            })
+        if request.GET.get("export"):
+            # Built by a background job (accounting.tasks.party_ledger_pdf)
+            job = enqueue_job(
+                self, request, "party_ledger_pdf",
+                party_id=party.pk, year_id=source.year.pk if source.year else None,
+            )
+            return redirect("admin:accounting_job_change", job.pk)
 
         return TemplateResponse(
             request,
             "party_ledger.html",
             {
                 **self.admin_site.each_context(request),
+                **ledger_context(request, source, "admin:party-ledger-rows", party.pk),
                 "party": party,
-                "ledger": ledger,
             },
         )
+
+    @reporting.reporting_view
+    def party_ledger_rows_view(self, request, party_id):
+        party = get_object_or_404(Party, pk=party_id)
+        return ledger_rows_response(request, PartyLedger(party, year=ledger_year(request)))
+
 # =====================================================
 # INVENTORY ADMIN WITH STOCK LEDGER (FIXED VERSION)
 # =====================================================
 
 @admin.register(Inventory)
-class InventoryAdmin(admin.ModelAdmin):
+class InventoryAdmin(RankedSearchMixin, MasterImportMixin, admin.ModelAdmin):
     list_display = (
         'name',
         'quantity',   # ✅ This is real current stock
@@ -233,6 +537,16 @@ class InventoryAdmin(admin.ModelAdmin):
         'default_price',
         'view_stock_ledger'
     )
+    search_fields = ('^name',)
+    ordering = ('name',)
+    actions = [export_ledgers_action('inventory')]
+    import_kind = 'inventory'
+    search_lookup = 'search_inventory'
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Stock or thresholds may have changed
+        stock.evaluate([obj.pk])
 
     # -------------------------------
     # LEDGER BUTTON
@@ -257,69 +571,50 @@ class InventoryAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.stock_ledger_view),
                 name="inventory-stock-ledger",
             ),
+            path(
+                "<int:product_id>/stock-ledger/rows/",
+                self.admin_site.admin_view(self.stock_ledger_rows_view),
+                name="inventory-stock-ledger-rows",
+            ),
         ]
         return custom + urls
 
     # -------------------------------
     # STOCK LEDGER VIEW (CORRECT)
     # -------------------------------
+    @reporting.reporting_view
     def stock_ledger_view(self, request, product_id):
         product = get_object_or_404(Inventory, pk=product_id)
-
-        transactions = SalePurchase.objects.filter(
-            inventory=product
-        ).order_by("-date")  # 🔥 reverse order
-
-        running_stock = product.quantity or Decimal("0")  # ✅ start from REAL stock
-
-        ledger = []
-
-        for txn in transactions:
-
-            if txn.purpose == "sale":
-                qty_in = Decimal("0")
-                qty_out = txn.quantity
-                stock_before = running_stock + txn.quantity
-
-            else:  # purchase
-                qty_in = txn.quantity
-                qty_out = Decimal("0")
-                stock_before = running_stock - txn.quantity
-
-            ledger.append({
-                "date": txn.date,
-                "type": txn.purpose.upper(),
-                "party": txn.party.name,
-                "mode": txn.payment_mode.upper(),
-                "qty_in": qty_in,
-                "qty_out": qty_out,
-                "rate": txn.price_per_unit,
-                "stock": running_stock,          # stock after transaction
-                "stock_before": stock_before     # optional
-            })
-
-            running_stock = stock_before
-
-        ledger.reverse()  # show oldest first
+        source = StockLedger(product, year=ledger_year(request))
 
         return TemplateResponse(
             request,
             "inventory_stock_ledger.html",
             {
                 **self.admin_site.each_context(request),
+                **ledger_context(request, source, "admin:inventory-stock-ledger-rows", product.pk),
                 "product": product,
-                "ledger": ledger,
                 "calculated_stock": product.quantity,  # ✅ real stock
             },
         )
+
+    @reporting.reporting_view
+    def stock_ledger_rows_view(self, request, product_id):
+        product = get_object_or_404(Inventory, pk=product_id)
+        return ledger_rows_response(request, StockLedger(product, year=ledger_year(request)))
+
 # =====================================================
 # SALES / PURCHASE / CASH PROXY ADMINS
 # =====================================================
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(LastRateMixin, LargeTableAdmin):
     list_display = ('date', 'party', 'inventory', 'quantity', 'amount')
+    list_select_related = ('party', 'inventory')
+    list_filter = ('payment_mode',)
+    autocomplete_fields = ('party', 'inventory', 'account')
     readonly_fields = ('date',)
+    rate_purpose = 'sale'
 
     def get_queryset(self, request):
         return super().get_queryset(request).filter(purpose='sale')
@@ -330,9 +625,13 @@ class SaleAdmin(admin.ModelAdmin):
 
 
 @admin.register(Purchase)
-class PurchaseAdmin(admin.ModelAdmin):
+class PurchaseAdmin(LastRateMixin, LargeTableAdmin):
     list_display = ('date', 'party', 'inventory', 'quantity', 'amount')
+    list_select_related = ('party', 'inventory')
+    list_filter = ('payment_mode',)
+    autocomplete_fields = ('party', 'inventory', 'account')
     readonly_fields = ('date',)
+    rate_purpose = 'purchase'
 
     def get_queryset(self, request):
         return super().get_queryset(request).filter(purpose='purchase')
@@ -343,8 +642,10 @@ class PurchaseAdmin(admin.ModelAdmin):
 
 
 @admin.register(ReceiveMoney)
-class ReceiveMoneyAdmin(admin.ModelAdmin):
+class ReceiveMoneyAdmin(LargeTableAdmin):
     list_display = ('date', 'party', 'account', 'amount')
+    list_select_related = ('party', 'account')
+    autocomplete_fields = ('party', 'account')
     readonly_fields = ('date',)
 
     def get_queryset(self, request):
@@ -356,8 +657,10 @@ class ReceiveMoneyAdmin(admin.ModelAdmin):
 
 
 @admin.register(PayMoney)
-class PayMoneyAdmin(admin.ModelAdmin):
+class PayMoneyAdmin(LargeTableAdmin):
     list_display = ('date', 'party', 'account', 'amount')
+    list_select_related = ('party', 'account')
+    autocomplete_fields = ('party', 'account')
     readonly_fields = ('date',)
 
     def get_queryset(self, request):
@@ -365,4 +668,355 @@ class PayMoneyAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         obj.transaction_type = 'pay'
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+
+# =====================================================
+# MULTI-LINE INVOICE ADMIN
+# =====================================================
+
+class InvoiceLineFormSet(BaseInlineFormSet):
+    """
+    Checks the lines' stock against the invoice header before anything
+    is saved, so a shortfall comes back on the form instead of from
+    Invoice.post() (which checks again under the row locks).
+    """
+
+    def clean(self):
+        super().clean()
+
+        invoice = self.instance
+        if any(self.errors) or not invoice.purpose:
+            return
+
+        needed = {}
+        for form in self.forms:
+            data = form.cleaned_data
+            if not data or data.get("DELETE"):
+                continue
+            item = data["inventory"]
+            needed[item.pk] = needed.get(item.pk, 0) + data["quantity"]
+
+        if not needed:
+            raise ValidationError("Invoice needs at least one line.")
+
+        invoice.check_stock(needed, Inventory.objects.in_bulk(list(needed)))
+
+
+class InvoiceLineInline(LastRateMixin, admin.TabularInline):
+    model = SalePurchase
+    formset = InvoiceLineFormSet
+    fk_name = 'invoice'
+    fields = ('inventory', 'quantity', 'price_per_unit', 'amount')
+    readonly_fields = ('amount',)
+    autocomplete_fields = ('inventory',)
+    extra = 5
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(LargeTableAdmin):
+    list_display = ('date', 'purpose', 'payment_mode', 'party', 'amount')
+    list_select_related = ('party',)
+    list_filter = ('purpose', 'payment_mode')
+    autocomplete_fields = ('party', 'account')
+    readonly_fields = ('amount',)
+    inlines = [InvoiceLineInline]
+
+    def has_change_permission(self, request, obj=None):
+        # Posted invoices are final, like single sales / purchases
+        return obj is None and super().has_change_permission(request, obj)
+
+    def save_model(self, request, obj, form, change):
+        # Posted together with its lines in save_related()
+        pass
+
+    def save_related(self, request, form, formsets, change):
+        lines = []
+        for formset in formsets:
+            lines += formset.save(commit=False)
+
+        form.instance.post(lines)
+
+
+# =====================================================
+# STOCK ALERTS ADMIN
+# =====================================================
+
+@admin.register(StockAlert)
+class StockAlertAdmin(admin.ModelAdmin):
+    """
+    Products to reorder, most urgent first. Maintained by
+    accounting.stock as postings happen; read-only here.
+    """
+
+    list_display = (
+        'inventory', 'quantity', 'reorder_level', 'daily_usage',
+        'days_of_cover', 'min_cover_days', 'since', 'view_stock_ledger',
+    )
+    list_select_related = ('inventory',)
+    list_filter = ('below_reorder_level', 'below_cover')
+    search_fields = ('inventory__name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Reorder level")
+    def reorder_level(self, obj):
+        return obj.inventory.reorder_level
+
+    @admin.display(description="Min. cover days")
+    def min_cover_days(self, obj):
+        return obj.inventory.min_cover_days
+
+    @admin.display(description="Stock Ledger")
+    def view_stock_ledger(self, obj):
+        url = reverse("admin:inventory-stock-ledger", args=[obj.inventory_id])
+        return format_html('<a class="button" href="{}">View Stock Ledger</a>', url)
+
+
+# =====================================================
+# FISCAL YEAR ADMIN (Year Close)
+# =====================================================
+
+# Links of a YearBalance: (field, label, plural label)
+YEAR_BALANCE_KINDS = (
+    ('party', 'party', 'parties'),
+    ('account', 'account', 'accounts'),
+    ('inventory', 'product', 'products'),
+)
+
+
+class YearBalanceKindFilter(admin.SimpleListFilter):
+    title = 'kind'
+    parameter_name = 'kind'
+
+    def lookups(self, request, model_admin):
+        return [(field, plural.capitalize()) for field, _, plural in YEAR_BALANCE_KINDS]
+
+    def queryset(self, request, queryset):
+        if self.value() in [field for field, _, _ in YEAR_BALANCE_KINDS]:
+            return queryset.filter(**{f"{self.value()}__isnull": False})
+        return queryset
+
+
+@admin.register(YearBalance)
+class YearBalanceAdmin(admin.ModelAdmin):
+    """
+    Opening / closing figures of the closed years, one per party,
+    account and product: paged and filtered here (linked from the
+    year) rather than listed in full on the year's page.
+    """
+
+    list_display = ('fiscal_year', 'kind', 'name', 'opening', 'closing')
+    list_select_related = ('fiscal_year', 'party', 'account', 'inventory')
+    list_filter = ('fiscal_year', YearBalanceKindFilter)
+    search_fields = ('party__name', 'account__name', 'inventory__name')
+    ordering = ('fiscal_year', 'id')
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Kind")
+    def kind(self, obj):
+        return next(label for field, label, _ in YEAR_BALANCE_KINDS if getattr(obj, f"{field}_id"))
+
+    @admin.display(description="Name")
+    def name(self, obj):
+        return (obj.party or obj.account or obj.inventory).name
+
+
+@admin.register(FiscalYear)
+class FiscalYearAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date', 'is_closed', 'closed_at')
+    readonly_fields = ('is_closed', 'closed_at', 'balances')
+    actions = ['close_selected_years']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None and obj.is_closed:
+            return ('name', 'start_date', 'end_date', 'is_closed', 'closed_at', 'balances')
+        return self.readonly_fields
+
+    @admin.display(description="Carried-forward balances")
+    def balances(self, obj):
+        # Counts only (one query); the rows are paged in YearBalanceAdmin
+        if obj.pk is None or not obj.is_closed:
+            return "-"
+
+        counts = YearBalance.objects.filter(fiscal_year=obj).aggregate(
+            **{field: Count(field) for field, _, _ in YEAR_BALANCE_KINDS}
+        )
+        url = reverse("admin:accounting_yearbalance_changelist")
+        return format_html_join(
+            " · ", '<a href="{}?fiscal_year__id__exact={}&amp;kind={}">{} {}</a>',
+            ((url, obj.pk, field, counts[field], plural) for field, _, plural in YEAR_BALANCE_KINDS),
+        )
+
+    def has_delete_permission(self, request, obj=None):
+        # Closed years own archived rows and carried-forward balances
+        if obj is not None and obj.is_closed:
+            return False
+        return super().has_delete_permission(request, obj)
+
+    @admin.action(description="Close selected fiscal years (lock + archive, background job)")
+    def close_selected_years(self, request, queryset):
+        enqueue_job(self, request, "close_fiscal_years", year_ids=list(queryset.values_list('pk', flat=True)))
+
+
+# =====================================================
+# BACKGROUND JOB ADMIN
+# =====================================================
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'progress_bar', 'message', 'created_by', 'created_at', 'finished_at', 'result_link')
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'name', 'kwargs', 'status', 'progress', 'message', 'cancel_requested',
+        'result', 'result_link', 'error', 'worker', 'created_by',
+        'created_at', 'started_at', 'finished_at',
+    )
+    actions = ['cancel_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Jobs are only viewed, cancelled and deleted
+        return False
+
+    def progress_bar(self, obj):
+        return format_html('<progress value="{}" max="100"></progress> {}%', obj.progress, obj.progress)
+
+    progress_bar.short_description = "Progress"
+
+    def result_link(self, obj):
+        if obj.status == Job.SUCCEEDED and obj.result and obj.result.get("file"):
+            url = reverse("admin:job-download", args=[obj.pk])
+            return format_html('<a href="{}">Download</a>', url)
+        return ""
+
+    result_link.short_description = "Result"
+
+    @admin.action(description="Cancel selected jobs")
+    def cancel_jobs(self, request, queryset):
+        for job in queryset.exclude(status__in=(Job.SUCCEEDED, Job.FAILED, Job.CANCELLED)):
+            job.cancel()
+        self.message_user(request, "Cancellation requested.", messages.SUCCESS)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom = [
+            path(
+                "<int:job_id>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="job-download",
+            ),
+        ]
+        return custom + urls
+
+    def download_view(self, request, job_id):
+        job = get_object_or_404(Job, pk=job_id, status=Job.SUCCEEDED)
+        if not self.has_view_permission(request, job):
+            raise PermissionDenied
+
+        filename = os.path.basename((job.result or {}).get("file", ""))
+        path_on_disk = os.path.join(settings.JOBS_RESULTS_DIR, filename)
+
+        if not filename or not os.path.exists(path_on_disk):
+            raise Http404("Result file not found.")
+
+        return FileResponse(open(path_on_disk, "rb"), as_attachment=True, filename=filename)
+
+
+# =====================================================
+# REQUEST PROFILES ADMIN
+# =====================================================
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Browses the slow-request profiles on disk (accounting.profiling):
+    a list, a top-functions table per profile and its stacks as folded
+    text or JSON for flamegraph tools. Needs the view permission.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        # Only these views: the stock ones would query a table
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path("", self.admin_site.admin_view(self.changelist_view), name="%s_%s_changelist" % info),
+            path("<str:profile_id>/", self.admin_site.admin_view(self.profile_view), name="%s_%s_change" % info),
+            path("<str:profile_id>/folded/", self.admin_site.admin_view(self.folded_view), name="request-profile-folded"),
+            path("<str:profile_id>/json/", self.admin_site.admin_view(self.json_view), name="request-profile-json"),
+        ]
+
+    def _load(self, request, profile_id):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = profiling.load(profile_id)
+        if profile is None:
+            raise Http404("Profile not found (it may have been rotated out).")
+        return profile
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        return TemplateResponse(
+            request,
+            "request_profiles.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": "Request profiles",
+                "profiles": profiling.stored(),
+                "enabled": bool(settings.PROFILE_PATHS) or settings.PROFILE_SLOWER_THAN_MS is not None,
+                "keep": settings.PROFILE_KEEP,
+            },
+        )
+
+    def profile_view(self, request, profile_id):
+        profile = self._load(request, profile_id)
+
+        return TemplateResponse(
+            request,
+            "request_profile.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": f"{profile['method']} {profile['path']}",
+                "profile": profile,
+            },
+        )
+
+    def folded_view(self, request, profile_id):
+        profile = self._load(request, profile_id)
+
+        response = HttpResponse(profiling.folded(profile), content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{profile_id}.folded"'
+        return response
+
+    def json_view(self, request, profile_id):
+        return JsonResponse(self._load(request, profile_id))
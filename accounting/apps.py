@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
 
 
 class AccountingConfig(AppConfig):
     name = 'accounting'
+
+    def ready(self):
+        from . import search
+        from . import tasks  # noqa: F401  registers the background job tasks
+        from .models import Party, Inventory
+
+        # Keep the FTS lookup tables in sync with the master tables
+        post_save.connect(search.index_party, sender=Party)
+        post_delete.connect(search.unindex_party, sender=Party)
+        post_save.connect(search.index_inventory, sender=Inventory)
+        post_delete.connect(search.unindex_inventory, sender=Inventory)
+
@@ -0,0 +1,355 @@
+# accounting/backup.py
+
+"""
+Full-book backup and restore.
+
+export_books() writes a directory:
+
+    manifest.json            tables, columns, row counts, checksums, figures
+    account-0001.jsonl.gz    gzip'd JSON Lines, one array per row in the
+    party-0001.jsonl.gz      manifest's column order, at most CHUNK_ROWS
+    ...                      rows per file
+
+Rows are streamed from one read transaction (or from the reporting
+snapshot), so the backup is consistent and never held in memory.
+On SQLite without WAL, writers wait while the export runs; export the
+snapshot (``snapshot=True``) to keep the books open for posting.
+
+import_books() checks every file's SHA-256 and the column layout
+before touching the database, then loads all tables in one transaction
+with batched raw INSERTs (no save(), signals or auto_now), foreign
+keys checked once at the end. It finally recomputes the balance
+figures and rolls everything back unless they equal the manifest's.
+Derived tables (search index, price history, stock alerts) are rebuilt,
+not backed up.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from contextlib import nullcontext
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction as db_transaction
+from django.utils import timezone
+
+from . import pricing, reporting, search, stock, tenancy
+from .closing import party_movements, account_movements
+from .ledger_core import to_minor
+from .models import (
+    Account,
+    Party,
+    Inventory,
+    SalePurchase,
+    CashBankTransaction,
+    Invoice,
+    FiscalYear,
+    YearBalance,
+    ArchivedSalePurchase,
+    ArchivedCashBankTransaction,
+    ArchivedInvoice,
+)
+
+
+FORMAT = "accounteaszy-books"
+VERSION = 1
+
+MANIFEST = "manifest.json"
+
+# Parents before children, so a restore never points at a missing row
+MODELS = (
+    Account,
+    Party,
+    Inventory,
+    FiscalYear,
+    YearBalance,
+    Invoice,
+    SalePurchase,
+    CashBankTransaction,
+    ArchivedInvoice,
+    ArchivedSalePurchase,
+    ArchivedCashBankTransaction,
+)
+
+# Rows per data file
+CHUNK_ROWS = 100_000
+
+# Rows per INSERT batch on restore
+BATCH_SIZE = 2000
+
+
+class BackupError(Exception):
+    """
+    A backup that cannot be restored (bad manifest, checksum, layout
+    or figures). Nothing has been written when it is raised.
+    """
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def figures():
+    """
+    Per kind: stored balances and the balances the ledgers imply, summed
+    in minor units, and how many entities disagree. A faithful restore
+    reproduces every number.
+    """
+    sales, cash = SalePurchase.objects.all(), CashBankTransaction.objects.all()
+    result = {}
+
+    for kind, model, stored_field, moves in (
+        ("party", Party, "credit_balance", party_movements(sales, cash)),
+        ("account", Account, "balance", account_movements(sales, cash)),
+    ):
+        stored = ledger = mismatched = 0
+
+        for pk, opening, balance in model.objects.values_list("pk", "opening_balance", stored_field).iterator():
+            expected = to_minor(opening) + moves.get(pk, 0)
+            stored += to_minor(balance)
+            ledger += expected
+            mismatched += expected != to_minor(balance)
+
+        result[kind] = {"stored": stored, "ledger": ledger, "mismatched": mismatched}
+
+    result["inventory"] = {
+        "stored": sum(to_minor(quantity) for quantity in Inventory.objects.values_list("quantity", flat=True).iterator()),
+    }
+    return result
+
+
+# =====================================================
+# EXPORT
+# =====================================================
+
+def _write_table(model, directory, chunk_rows):
+    columns = _columns(model)
+    files = []
+    rows = 0
+
+    handle = None
+    queryset = model.objects.order_by("pk").values_list(*columns)
+
+    try:
+        for row in queryset.iterator(chunk_size=BATCH_SIZE):
+            if handle is None or files[-1]["rows"] == chunk_rows:
+                if handle is not None:
+                    handle.close()
+                name = f"{model._meta.model_name}-{len(files) + 1:04d}.jsonl.gz"
+                handle = gzip.open(os.path.join(directory, name), "wt", encoding="utf-8", compresslevel=6)
+                files.append({"name": name, "rows": 0})
+
+            handle.write(json.dumps(row, default=_json_default, separators=(",", ":")))
+            handle.write("\n")
+            files[-1]["rows"] += 1
+            rows += 1
+    finally:
+        if handle is not None:
+            handle.close()
+
+    for entry in files:
+        path = os.path.join(directory, entry["name"])
+        entry["bytes"] = os.path.getsize(path)
+        entry["sha256"] = _sha256(path)
+
+    return {"model": model._meta.label_lower, "columns": columns, "rows": rows, "files": files}
+
+
+def export_books(directory, snapshot=False, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Back up the active tenant's books into ``directory`` (created; must
+    be empty). Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if os.listdir(directory):
+        raise BackupError(f"{directory} is not empty.")
+
+    manifest = {
+        "format": FORMAT,
+        "version": VERSION,
+        "created_at": timezone.now().isoformat(),
+        "tenant": tenancy.current(),
+        "tables": [],
+    }
+
+    with reporting.reads() if snapshot else nullcontext():
+        manifest["snapshot"] = reporting.taken_at().isoformat() if snapshot and reporting.available() else None
+
+        # One read transaction: every table as of the same moment
+        with db_transaction.atomic(using=router.db_for_read(Account)):
+            for model in MODELS:
+                table = _write_table(model, directory, chunk_rows)
+                manifest["tables"].append(table)
+                if progress:
+                    progress(table)
+
+            manifest["figures"] = figures()
+
+    with open(os.path.join(directory, MANIFEST), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+
+    return manifest
+
+
+# =====================================================
+# RESTORE
+# =====================================================
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError) as error:
+        raise BackupError(f"Cannot read {MANIFEST}: {error}")
+
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise BackupError("Not a books backup of a supported version.")
+
+    return manifest
+
+
+def verify_files(directory, manifest):
+    """
+    Check the layout matches this code and every file its checksum.
+    """
+    models = {model._meta.label_lower: model for model in MODELS}
+
+    for table in manifest["tables"]:
+        model = models.get(table["model"])
+        if model is None:
+            raise BackupError(f"Unknown table {table['model']}.")
+        if table["columns"] != _columns(model):
+            raise BackupError(f"{table['model']}: columns differ from this version of the app.")
+
+        for entry in table["files"]:
+            path = os.path.join(directory, entry["name"])
+            if not os.path.exists(path):
+                raise BackupError(f"{entry['name']} is missing.")
+            if _sha256(path) != entry["sha256"]:
+                raise BackupError(f"{entry['name']} is corrupt (checksum mismatch).")
+
+
+def _loaders(model, columns, connection):
+    """
+    Per column: JSON value -> database value, through the field so
+    decimals, dates and datetimes are stored as Django stores them.
+    """
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    loaders = []
+
+    for column in columns:
+        field = fields[column]
+
+        def load(value, field=field):
+            if value is None:
+                return None
+            return field.get_db_prep_save(field.to_python(value), connection)
+
+        loaders.append(load)
+
+    return loaders
+
+
+def _load_table(model, table, directory, connection):
+    quote = connection.ops.quote_name
+    columns = table["columns"]
+    loaders = _loaders(model, columns, connection)
+
+    placeholders = ", ".join(["%s"] * len(columns))
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} "
+        f"({', '.join(quote(model._meta.get_field(column).column) for column in columns)}) "
+        f"VALUES ({placeholders})"
+    )
+
+    loaded = 0
+
+    with connection.cursor() as cursor:
+        for entry in table["files"]:
+            batch = []
+            rows = 0
+
+            with gzip.open(os.path.join(directory, entry["name"]), "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    values = json.loads(line)
+                    batch.append([load(value) for load, value in zip(loaders, values)])
+                    rows += 1
+
+                    if len(batch) == BATCH_SIZE:
+                        cursor.executemany(sql, batch)
+                        batch = []
+
+            if batch:
+                cursor.executemany(sql, batch)
+
+            if rows != entry["rows"]:
+                raise BackupError(f"{entry['name']}: {rows} rows, manifest says {entry['rows']}.")
+            loaded += rows
+
+    return loaded
+
+
+def import_books(directory, replace=False, progress=None):
+    """
+    Restore a backup into the active tenant's database. The books must
+    be empty unless ``replace`` (then they are deleted first, in the same
+    transaction). Returns the restored figures.
+    """
+    manifest = read_manifest(directory)
+    verify_files(directory, manifest)
+
+    models = {model._meta.label_lower: model for model in MODELS}
+    using = router.db_for_write(Account)
+    connection = connections[using]
+
+    with db_transaction.atomic(using=using):
+
+        if any(model.objects.using(using).exists() for model in MODELS):
+            if not replace:
+                raise BackupError("The books are not empty; restore with replace to overwrite them.")
+            with connection.cursor() as cursor:
+                for model in reversed(MODELS):
+                    cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+
+        with connection.constraint_checks_disabled():
+            for table in manifest["tables"]:
+                model = models[table["model"]]
+                _load_table(model, table, directory, connection)
+                if progress:
+                    progress(table)
+
+        try:
+            connection.check_constraints(table_names=[model._meta.db_table for model in MODELS])
+        except IntegrityError as error:
+            raise BackupError(f"Restored rows break a constraint: {error}")
+
+        restored = figures()
+        if restored != manifest["figures"]:
+            raise BackupError(f"Balances differ after restore: {restored} != {manifest['figures']}.")
+
+        # Derived from the postings; also drops rows of replaced books
+        pricing.rebuild(using)
+        stock.rebuild(using=using)
+
+    # bulk inserts skip the signals that maintain the search index
+    search.rebuild_index(using)
+
+    return restored
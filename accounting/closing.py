@@ -0,0 +1,213 @@
+# accounting/closing.py
+
+"""
+Fiscal-year close.
+
+close_year() runs as one transaction:
+
+1. checks the year has ended and every earlier year is closed,
+2. sums each party / account / product's movement up to the year end
+   in SQL (integer minor units, grouped per entity),
+3. stores opening and closing figures in YearBalance and carries the
+   closing balances forward as Party / Account opening balances,
+4. copies the year's Invoice, SalePurchase and CashBankTransaction rows
+   into the Archived* tables (INSERT … SELECT, ids kept) and deletes
+   them from the live tables,
+5. marks the year closed, which locks its dates against new postings.
+
+Live tables then only hold rows after the last closed year, and the
+ledgers read a closed year from the archive when asked for it.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction as db_transaction
+from django.db.models import F, Sum, When
+from django.utils import timezone
+
+from .models import (
+    Account,
+    Party,
+    Inventory,
+    SalePurchase,
+    CashBankTransaction,
+    Invoice,
+    FiscalYear,
+    YearBalance,
+    ArchivedSalePurchase,
+    ArchivedCashBankTransaction,
+    ArchivedInvoice,
+)
+from .ledger import _minor, _signed
+from .ledger_core import to_minor, to_decimal
+
+
+# Rows per bulk_create / bulk_update batch
+BATCH_SIZE = 500
+
+
+def _movements(queryset, key, effect):
+    """
+    {entity id: summed effect in minor units} for one table.
+    """
+    return dict(
+        queryset.order_by()
+        .values(key)
+        .annotate(total=Sum(_minor(effect)))
+        .values_list(key, "total")
+    )
+
+
+def _merge(*movements):
+    merged = {}
+    for movement in movements:
+        for key, value in movement.items():
+            merged[key] = merged.get(key, 0) + (value or 0)
+    return merged
+
+
+def party_movements(sales, cash):
+    """
+    {party id: change in what the party owes} over the given
+    sale / purchase and cash / bank rows, in minor units.
+    """
+    sale_effect = _signed(When(purpose="sale", then=F("amount")), default=-F("amount"))
+
+    return _merge(
+        _movements(sales.filter(payment_mode="credit"), "party", sale_effect),
+        _movements(cash, "party", _signed(When(transaction_type="receive", then=-F("amount")), default=F("amount"))),
+    )
+
+
+def account_movements(sales, cash):
+    """
+    {account id: change in balance}, as party_movements().
+    """
+    sale_effect = _signed(When(purpose="sale", then=F("amount")), default=-F("amount"))
+
+    return _merge(
+        _movements(sales.filter(payment_mode="cash"), "account", sale_effect),
+        _movements(cash, "account", _signed(When(transaction_type="receive", then=F("amount")), default=-F("amount"))),
+    )
+
+
+def _move(model, archive, year, cutoff):
+    """
+    Copy rows dated before ``cutoff`` into the archive table, then
+    delete them from the live table. Returns the number moved.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+
+    columns = [field.column for field in model._meta.concrete_fields]
+    selected = model.objects.using(using).filter(date__lt=cutoff).order_by()
+
+    sql, params = selected.values_list(*[field.attname for field in model._meta.concrete_fields]).query.sql_with_params()
+    ids_sql, ids_params = selected.values("pk").query.sql_with_params()
+
+    target = ", ".join(quote(column) for column in ["fiscal_year_id", *columns])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(archive._meta.db_table)} ({target}) "
+            f"SELECT %s, * FROM ({sql}) closed_rows",
+            [year.pk, *params],
+        )
+        moved = cursor.rowcount
+
+        cursor.execute(
+            f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN ({ids_sql})",
+            ids_params,
+        )
+
+    return moved
+
+
+# =====================================================
+# YEAR CLOSE
+# =====================================================
+
+def close_year(year):
+    """
+    Close ``year`` (a FiscalYear). Returns {"archived": rows moved}.
+    """
+
+    with db_transaction.atomic():
+
+        year = FiscalYear.objects.select_for_update().get(pk=year.pk)
+
+        if year.is_closed:
+            raise ValidationError(f"{year} is already closed.")
+
+        if year.end_date >= timezone.localdate():
+            raise ValidationError(f"{year} has not ended yet.")
+
+        if FiscalYear.objects.filter(is_closed=False, end_date__lt=year.start_date).exists():
+            raise ValidationError("Close earlier fiscal years first.")
+
+        cutoff = year.cutoff
+
+        # Everything still live before the cutoff belongs to this close
+        sales = SalePurchase.objects.filter(date__lt=cutoff)
+        cash = CashBankTransaction.objects.filter(date__lt=cutoff)
+
+        party_moves = party_movements(sales, cash)
+        account_moves = account_movements(sales, cash)
+
+        # Stock has no stored opening: the closing stock is the current
+        # quantity less whatever moved after the year end
+        stock_effect = _signed(When(purpose="sale", then=-F("quantity")), default=F("quantity"))
+        stock_moves = _movements(sales, "inventory", stock_effect)
+        stock_after = _movements(SalePurchase.objects.filter(date__gte=cutoff), "inventory", stock_effect)
+
+        # ---------- year balances + carried-forward openings ----------
+        balances = []
+        parties = []
+        accounts = []
+
+        for party in Party.objects.only("id", "opening_balance"):
+            opening = to_minor(party.opening_balance)
+            closing = opening + party_moves.get(party.pk, 0)
+            balances.append(YearBalance(
+                fiscal_year=year, party=party,
+                opening=to_decimal(opening), closing=to_decimal(closing),
+            ))
+            if closing != opening:
+                party.opening_balance = to_decimal(closing)
+                parties.append(party)
+
+        for account in Account.objects.only("id", "opening_balance"):
+            opening = to_minor(account.opening_balance)
+            closing = opening + account_moves.get(account.pk, 0)
+            balances.append(YearBalance(
+                fiscal_year=year, account=account,
+                opening=to_decimal(opening), closing=to_decimal(closing),
+            ))
+            if closing != opening:
+                account.opening_balance = to_decimal(closing)
+                accounts.append(account)
+
+        for item in Inventory.objects.only("id", "quantity"):
+            closing = to_minor(item.quantity) - stock_after.get(item.pk, 0)
+            balances.append(YearBalance(
+                fiscal_year=year, inventory=item,
+                opening=to_decimal(closing - stock_moves.get(item.pk, 0)),
+                closing=to_decimal(closing),
+            ))
+
+        YearBalance.objects.bulk_create(balances, batch_size=BATCH_SIZE)
+        Party.objects.bulk_update(parties, ["opening_balance"], batch_size=BATCH_SIZE)
+        Account.objects.bulk_update(accounts, ["opening_balance"], batch_size=BATCH_SIZE)
+
+        # ---------- archive (headers before their lines) ----------
+        archived = (
+            _move(Invoice, ArchivedInvoice, year, cutoff)
+            + _move(SalePurchase, ArchivedSalePurchase, year, cutoff)
+            + _move(CashBankTransaction, ArchivedCashBankTransaction, year, cutoff)
+        )
+
+        year.is_closed = True
+        year.closed_at = timezone.now()
+        year.save(update_fields=["is_closed", "closed_at"])
+
+    return {"archived": archived}
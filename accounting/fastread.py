@@ -0,0 +1,194 @@
+# accounting/fastread.py
+
+"""
+Fast read path for the list endpoints.
+
+A ModelSerializer builds a model instance per row and runs DRF's
+per-field machinery on it, which for large pages costs more CPU than
+the query. RowCodec is compiled once per serializer class: it lists
+the serializer's fields as values_list() columns (plus the joined
+party / account / inventory names) and pairs each with a plain
+function that turns the database value into exactly what the DRF
+field would output. A page is then one query of tuples and one dict
+per row.
+
+Decimal and datetime output is the serializer's: decimals quantized
+to the field's places and printed with ``{:f}``, datetimes converted
+to the current time zone in ISO 8601 with a ``Z`` for UTC. Fields
+with settings that have no fast equivalent (localized decimals,
+custom formats, ...) fall back to the DRF field's own
+to_representation(), so the output never differs, only the speed.
+
+The path is opt-in: ``?fast=1`` on a list URL of a viewset using
+FastListMixin.
+"""
+
+import decimal
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+
+# Foreign keys whose ``name`` is added as ``<field>_name``
+NAMED_RELATIONS = ("party", "account", "inventory")
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+# =====================================================
+# ENCODERS
+# =====================================================
+
+def _decimal_encoder(field):
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    rounding = field.rounding
+
+    # DRF copies the thread's context on every call; it is copied once
+    # here (nothing in the app changes the decimal context)
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+
+    def encode(value):
+        return f"{value.quantize(quantum, rounding=rounding, context=context):f}"
+
+    return lambda: encode
+
+
+def _datetime_encoder(field):
+    def bind():
+        # Looked up once per page, not per value
+        tz = timezone.get_current_timezone()
+
+        def encode(value):
+            text = value.astimezone(tz).isoformat()
+            if text.endswith("+00:00"):
+                text = text[:-6] + "Z"
+            return text
+
+        return encode
+
+    return bind
+
+
+def _encoder(field):
+    """
+    Factory, called once per page, of the function from database value
+    to the field's output; None when the value is output as it is.
+    """
+    if isinstance(field, serializers.DecimalField):
+        coerce = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+        if coerce and field.decimal_places is not None and not field.localize and not field.normalize_output:
+            return _decimal_encoder(field)
+
+    elif isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if (output_format or "").lower() == ISO_8601 and not hasattr(field, "timezone"):
+            return _datetime_encoder(field)
+
+    elif isinstance(field, serializers.DateField):
+        output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+        if (output_format or "").lower() == ISO_8601:
+            return lambda: date_isoformat
+
+    elif isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.IntegerField,
+                            serializers.BooleanField, serializers.ChoiceField)) or type(field) is serializers.CharField:
+        # Keys, numbers and text come from the database as output;
+        # stored choices are the choice keys themselves
+        return None
+
+    return lambda: field.to_representation
+
+
+def date_isoformat(value):
+    return value.isoformat()
+
+
+# =====================================================
+# CODEC
+# =====================================================
+
+class RowCodec:
+    """
+    Compiled mapping from values_list() rows to a serializer's output.
+    """
+
+    def __init__(self, serializer_class):
+        fields = serializer_class().fields
+        model = serializer_class.Meta.model
+
+        self.names = []
+        self.columns = []
+        self.encoders = []
+
+        for name, field in fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+                raise TypeError(f"{serializer_class.__name__}.{name}: nested fields have no fast path.")
+
+            self.names.append(name)
+            self.columns.append(field.source)
+            self.encoders.append(_encoder(field))
+
+        relations = {field.name for field in model._meta.concrete_fields if field.is_relation}
+        for relation in NAMED_RELATIONS:
+            if relation in relations:
+                self.names.append(f"{relation}_name")
+                self.columns.append(f"{relation}__name")
+                self.encoders.append(None)
+
+        self.names = tuple(self.names)
+        self.columns = tuple(self.columns)
+        self.encoders = tuple(self.encoders)
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def encode(self, rows):
+        names = self.names
+        encoders = tuple(make() if make else None for make in self.encoders)
+
+        return [
+            {
+                name: value if value is None or encode is None else encode(value)
+                for name, encode, value in zip(names, encoders, row)
+            }
+            for row in rows
+        ]
+
+
+_codecs = {}
+
+
+def codec(serializer_class):
+    if serializer_class not in _codecs:
+        _codecs[serializer_class] = RowCodec(serializer_class)
+    return _codecs[serializer_class]
+
+
+# =====================================================
+# VIEWSET MIXIN
+# =====================================================
+
+class FastListMixin:
+    """
+    ``?fast=1`` on the list URL serves the page through RowCodec: the
+    same fields and values as the serializer, plus ``party_name`` /
+    ``account_name`` / ``inventory_name``. Without it nothing changes.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("fast", "").lower() not in TRUE_VALUES:
+            return super().list(request, *args, **kwargs)
+
+        row_codec = codec(self.get_serializer_class())
+        rows = row_codec.rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_codec.encode(page))
+
+        return Response(row_codec.encode(rows))
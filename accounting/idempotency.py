@@ -0,0 +1,110 @@
+# accounting/idempotency.py
+
+"""
+Idempotency-Key support for the posting API endpoints.
+
+A client that may retry a POST sends a unique ``Idempotency-Key``
+header. The first request runs normally and its response is stored in
+the same database transaction as the posting itself; any retry with
+the same key gets the stored response back (marked with an
+``Idempotent-Replayed: true`` header) and nothing is posted again.
+
+The lookup is a single unique-index read, cheap enough for every
+request.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = "Idempotency-Key"
+
+DEFAULT_TTL = 60 * 60 * 24
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", DEFAULT_TTL))
+
+
+def fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    raw = f"{request.user.pk}|{request.method}|{request.path}|{payload}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def prune_expired(now=None):
+    """
+    Delete keys past their TTL. Returns the number removed.
+    """
+    cutoff = (now or timezone.now()) - ttl()
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        return Response(
+            {"detail": f"{HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    return Response(
+        record.response_body,
+        status=record.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+# =====================================================
+# VIEWSET MIXIN
+# =====================================================
+
+class IdempotentCreateMixin:
+    """
+    Makes ``create()`` of a DRF viewset replay-safe when the request
+    carries an Idempotency-Key header. Requests without one are
+    handled exactly as before.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+
+        request_fingerprint = fingerprint(request)
+
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None:
+            if record.created_at >= timezone.now() - ttl():
+                return _replay(record, request_fingerprint)
+            record.delete()
+
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+
+                IdempotencyKey.objects.create(
+                    key=key,
+                    fingerprint=request_fingerprint,
+                    status_code=response.status_code,
+                    response_body=response.data,
+                )
+
+        except IntegrityError:
+            # A concurrent retry with the same key won the race: our
+            # posting was rolled back with the failed key insert
+            record = IdempotencyKey.objects.filter(key=key).first()
+            if record is None:
+                raise
+            return _replay(record, request_fingerprint)
+
+        return response
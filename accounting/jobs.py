@@ -0,0 +1,298 @@
+# accounting/jobs.py
+
+"""
+Background jobs without an external broker.
+
+A job is a row in the Job table naming a registered task and its
+keyword arguments. JobRunner runs them on a thread pool inside the web
+process (started from wsgi.py / asgi.py when settings.JOBS_AUTOSTART
+is on), or in a dedicated ``manage.py run_jobs`` process.
+
+Workers claim a queued job with one conditional UPDATE, so any number
+of processes can share the table without running a job twice. The
+runner polls every tenant database (accounting.tenancy) and runs each
+job against the database it was queued in.
+
+Tasks are plain functions registered with ``@task("name")`` (see
+accounting.tasks). They receive the Job first and report with
+``job.set_progress(done, total, message)``, which also raises
+Cancelled once someone cancels the job. Whatever they return
+(JSON-serialisable) is stored as the job's result.
+"""
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction as db_transaction
+from django.db.utils import DatabaseError
+from django.utils import timezone
+
+from . import tenancy
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+TASKS = {}
+
+
+class Cancelled(Exception):
+    """
+    Raised inside a task when its job has been cancelled.
+    """
+
+
+def task(name):
+    """
+    Register ``func(job, **kwargs)`` as the task ``name``.
+    """
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, user=None, **kwargs):
+    """
+    Queue a task; returns the Job. Runners are woken once the
+    surrounding transaction commits.
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown task: {name}")
+
+    job = Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+    if _runner is not None:
+        db_transaction.on_commit(_runner.wake)
+
+    return job
+
+
+# =====================================================
+# EXECUTION
+# =====================================================
+
+def claim():
+    """
+    Take the oldest queued job in the active database, or None.
+    """
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED)
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:10]
+    )
+
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            started_at=timezone.now(),
+            worker=WORKER,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+    return None
+
+
+def execute(job):
+    """
+    Run a claimed job to completion and record how it ended.
+    """
+    fields = {}
+
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f"Unknown task: {job.name}")
+
+        fields = {"status": Job.SUCCEEDED, "progress": 100, "result": func(job, **job.kwargs)}
+
+    except Cancelled:
+        fields = {"status": Job.CANCELLED, "message": "Cancelled."}
+
+    except Exception:
+        logger.exception("Job %s failed", job.pk)
+        fields = {"status": Job.FAILED, "error": traceback.format_exc()}
+
+    fields["finished_at"] = timezone.now()
+
+    try:
+        Job.objects.filter(pk=job.pk).update(**fields)
+    except (TypeError, ValueError):
+        # Result could not be stored as JSON
+        fields = {"status": Job.FAILED, "error": traceback.format_exc(), "finished_at": fields["finished_at"]}
+        Job.objects.filter(pk=job.pk).update(**fields)
+
+    for key, value in fields.items():
+        setattr(job, key, value)
+
+    return job
+
+
+def run_pending(limit=None):
+    """
+    Run queued jobs of the active database in this thread until none
+    are left (or ``limit`` have run). Returns the jobs run.
+    """
+    done = []
+
+    while limit is None or len(done) < limit:
+        job = claim()
+        if job is None:
+            break
+        done.append(execute(job))
+
+    return done
+
+
+def recover():
+    """
+    Fail jobs left 'running' by a process of this host that has died.
+    """
+    host = socket.gethostname()
+
+    for alias in tenancy.aliases():
+        with tenancy.activate(alias):
+            running = Job.objects.filter(status=Job.RUNNING, worker__startswith=f"{host}:")
+
+            for job in running.only('pk', 'worker'):
+                pid = int(job.worker.rsplit(":", 1)[1])
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                        status=Job.FAILED,
+                        error="Worker process stopped before the job finished.",
+                        finished_at=timezone.now(),
+                    )
+                except PermissionError:
+                    pass
+
+
+# =====================================================
+# RUNNER (THREAD POOL)
+# =====================================================
+
+class JobRunner:
+    """
+    A dispatcher thread claims jobs while worker slots are free and
+    hands them to a thread pool. It sleeps between polls unless woken
+    by enqueue() or a finished job.
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers or settings.JOBS_WORKERS
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+
+        self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="accounting-job")
+        self.slots = threading.Semaphore(self.workers)
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.dispatch, name="accounting-job-dispatcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, wait=True):
+        self.stopping.set()
+        self.wakeup.set()
+        self.pool.shutdown(wait=wait)
+
+    def wake(self):
+        self.wakeup.set()
+
+    # -------------------------------------------------
+
+    def dispatch(self):
+        try:
+            recover()
+        except DatabaseError:
+            logger.exception("Could not check for interrupted jobs")
+
+        last_error = None
+
+        while not self.stopping.is_set():
+            claimed = False
+
+            try:
+                for alias in tenancy.aliases():
+                    claimed |= self.fill(alias)
+                last_error = None
+            except DatabaseError as error:
+                # e.g. not migrated yet: log once, keep polling
+                if str(error) != last_error:
+                    logger.exception("Job dispatcher could not poll the job table")
+                last_error = str(error)
+            finally:
+                connections.close_all()
+
+            if not claimed:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+
+    def fill(self, alias):
+        claimed = False
+
+        while self.slots.acquire(blocking=False):
+            try:
+                with tenancy.activate(alias):
+                    job = claim()
+            except DatabaseError:
+                self.slots.release()
+                raise
+
+            if job is None:
+                self.slots.release()
+                break
+
+            claimed = True
+            self.pool.submit(self.run, alias, job)
+
+        return claimed
+
+    def run(self, alias, job):
+        try:
+            with tenancy.activate(alias):
+                execute(job)
+        finally:
+            connections.close_all()
+            self.slots.release()
+            self.wakeup.set()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def start(workers=None, poll_interval=None):
+    """
+    Start this process's runner (once).
+    """
+    global _runner
+
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(workers, poll_interval).start()
+
+    return _runner
+
+
+def autostart():
+    """
+    Called from wsgi.py / asgi.py: start the in-process runner when
+    settings.JOBS_AUTOSTART is on.
+    """
+    if settings.JOBS_AUTOSTART:
+        start()
@@ -0,0 +1,753 @@
+# accounting/ledger.py
+
+"""
+Ledger row sources shared by the admin ledger pages and their JSON
+row endpoints.
+
+Each ledger is one UNION ALL of SalePurchase, Invoice and
+CashBankTransaction rows ordered by (date, source, id) — sales and
+purchases before cash entries on the same timestamp, as the original
+in-Python sort did. An invoice is one row; its lines are attached for
+display only.
+
+Any window of rows can be produced without touching the rows before
+it: the balance carried into the window is summed in SQL and the
+running balance is only accumulated across the window itself.
+
+A ledger built with ``year=`` (a closed FiscalYear) reads that year's
+rows from the archive tables and starts from the opening figure stored
+when the year was closed.
+
+Balance effects are selected as integer minor units (paise, or
+hundredths of a unit for stock), so SQLite's REAL arithmetic never
+rounds them; running balances and totals are computed by
+ledger_core.LedgerCore and only turned into Decimal for display.
+
+The ``a``-prefixed methods are the same reads for the async (ASGI)
+endpoints in accounting.views: querysets go through Django's async ORM
+and long reads are async generators that fetch in batches, so a big
+ledger streams out without holding a worker thread for its duration.
+Raw-SQL sums have no async cursor in Django and run via sync_to_async.
+"""
+
+from array import array
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import (
+    Case, When, F, Max, Value, DecimalField, IntegerField, CharField, ExpressionWrapper,
+)
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+from django.utils.dateformat import format as format_date
+
+from .models import (
+    Account,
+    Party,
+    Inventory,
+    SalePurchase,
+    CashBankTransaction,
+    Invoice,
+    ArchivedSalePurchase,
+    ArchivedCashBankTransaction,
+    ArchivedInvoice,
+)
+from .ledger_core import LedgerCore, to_minor, to_decimal
+
+
+ZERO = Decimal("0")
+
+# Ordinal of 0001-01-01 in julian days: julianday(x) - this = date.toordinal()
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+# Rows per JSON chunk requested by the virtual-scrolled table
+CHUNK_SIZE = 200
+MAX_CHUNK_SIZE = 1000
+
+# Ledgers longer than this open in streaming mode by default
+STREAM_THRESHOLD = 2000
+
+# Rows fetched per query by the async generators
+STREAM_BATCH = 1000
+
+
+def _decimal(value=None):
+    return Value(value, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _integer(value=None):
+    return Value(value, output_field=IntegerField())
+
+
+def _text(value):
+    return Value(value, output_field=CharField())
+
+
+def _signed(*whens, default):
+    return Case(
+        *whens,
+        default=default,
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def _minor(expression):
+    return Cast(
+        Round(ExpressionWrapper(
+            expression * Value(100),
+            output_field=DecimalField(max_digits=16, decimal_places=2),
+        )),
+        output_field=IntegerField(),
+    )
+
+
+def _type_label(row_type, signed):
+    # Compensating entries (accounting.voiding) carry negated amounts
+    label = row_type.upper()
+    return f"{label} REVERSAL" if signed is not None and signed < 0 else label
+
+
+def _as_text(value):
+    if value is None or value == "":
+        return ""
+    return str(value)
+
+
+# =====================================================
+# BASE SOURCE
+# =====================================================
+
+class LedgerSource:
+    """
+    Subclasses provide ``sides()``: one entry per table in the union,
+    in same-timestamp tie-break order, each
+
+        (filtered queryset, signed balance effect, display columns)
+
+    with the same column keys in the same order on every side, plus
+    the opening balance and ``present(row, balance)``. The union
+    exposes the signed effect as ``r_minor`` (integer minor units).
+    """
+
+    ORDER = ("r_date", "r_src", "r_id")
+
+    # Column keys of the rows returned by present(), in display order
+    COLUMNS = ()
+    HEADERS = ()
+    SIGNED_COLUMN = ""
+
+    def __init__(self, obj, year=None, until=None):
+        self.obj = obj
+        self.year = year
+        self.until = until
+
+    @staticmethod
+    def high_water():
+        """
+        Highest id of each live table, for ``until=``: a ledger built
+        with it reads the rows as they stood then, whatever is posted
+        meanwhile (postings are never edited, only added). Read it in
+        the same transaction as the ledger objects.
+        """
+        return tuple(
+            model.objects.aggregate(last=Max("pk"))["last"] or 0
+            for model in (SalePurchase, Invoice, CashBankTransaction)
+        )
+
+    # -------------------------------------------------
+
+    def tables(self):
+        """
+        (sale / purchase, invoice, cash / bank) querysets: the live
+        tables (up to ``self.until``), or the archive of ``self.year``.
+        """
+        if self.year is None:
+            tables = SalePurchase.objects.all(), Invoice.objects.all(), CashBankTransaction.objects.all()
+            if self.until is None:
+                return tables
+            return tuple(table.filter(pk__lte=last) for table, last in zip(tables, self.until))
+
+        return (
+            ArchivedSalePurchase.objects.filter(fiscal_year=self.year),
+            ArchivedInvoice.objects.filter(fiscal_year=self.year),
+            ArchivedCashBankTransaction.objects.filter(fiscal_year=self.year),
+        )
+
+    def sides(self):
+        return []
+
+    def opening(self):
+        if self.year is not None:
+            return self.year.opening_of(self.obj)
+        return self.live_opening()
+
+    def live_opening(self):
+        return ZERO
+
+    def present(self, row, balance):
+        raise NotImplementedError
+
+    def attach_details(self, rows):
+        """
+        Hook to decorate a window of fetched rows in bulk.
+        """
+
+    # -------------------------------------------------
+
+    def _union(self, with_columns):
+        """
+        Ordered union of all sides. Without display columns it only
+        selects the ordering keys and the signed effect, so no joins.
+        """
+        parts = []
+        for src, (base, signed, columns) in enumerate(self.sides()):
+            annotations = {
+                "r_id": F("id"),
+                "r_src": Value(src, output_field=IntegerField()),
+                "r_date": F("date"),
+                **(columns if with_columns else {}),
+                "r_minor": _minor(signed),
+            }
+            parts.append(base.annotate(**annotations).values(*annotations))
+
+        queryset = parts[0]
+        if len(parts) > 1:
+            queryset = queryset.union(*parts[1:], all=True)
+
+        return queryset.order_by(*self.ORDER)
+
+    def queryset(self):
+        return self._union(with_columns=True)
+
+    def count(self):
+        # Index-only counts per side are far cheaper than counting the union
+        return sum(base.count() for base, _, _ in self.sides())
+
+    def _key_sql(self, limit=None, ordered=True):
+        queryset = self._union(with_columns=False)
+        if limit is not None:
+            queryset = queryset[:limit]
+        elif not ordered:
+            # Whole-ledger sums do not need the sort
+            queryset = queryset.order_by()
+
+        sql, params = queryset.query.sql_with_params()
+        return connections[queryset.db], sql, params
+
+    def signed_total(self, limit=None):
+        """
+        Sum of ``r_minor`` over the first ``limit`` rows (all rows when
+        ``limit`` is None), in minor units.
+        """
+        if limit == 0:
+            return 0
+
+        connection, sql, params = self._key_sql(limit, ordered=limit is not None)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COALESCE(SUM(r_minor), 0) FROM ({sql}) ledger_rows",
+                params,
+            )
+            return cursor.fetchone()[0]
+
+    def carry(self, offset):
+        """
+        Running balance just before row ``offset``, in minor units.
+        """
+        return to_minor(self.opening()) + self.signed_total(offset)
+
+    def _window(self, offset, limit):
+        queryset = self.queryset()
+        if limit is not None:
+            return queryset[offset:offset + limit]
+        if offset:
+            return queryset[offset:]
+        return queryset
+
+    def _present_all(self, rows, carry):
+        """
+        (entries, balance after the last one) for fetched rows starting
+        from ``carry`` minor units.
+        """
+        running = LedgerCore([row["r_minor"] for row in rows], opening=carry).running()
+
+        entries = [
+            self.present(row, to_decimal(balance))
+            for row, balance in zip(rows, running)
+        ]
+        return entries, running[-1] if rows else carry
+
+    def rows(self, offset=0, limit=None):
+        rows = list(self._window(offset, limit))
+        self.attach_details(rows)
+        return self._present_all(rows, self.carry(offset))[0]
+
+    def closing(self):
+        return to_decimal(self.carry(0) + self.signed_total())
+
+    def batches(self, batch_size=STREAM_BATCH):
+        """
+        The whole ledger in one ordered read, as lists of up to
+        ``batch_size`` entries with the running balance carried from
+        batch to batch (sync twin of abatches()).
+        """
+        balance = to_minor(self.opening())
+        batch = []
+
+        for row in self.queryset().iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                entries, balance = self._present_batch(batch, balance)
+                yield entries
+                batch = []
+
+        if batch:
+            yield self._present_batch(batch, balance)[0]
+
+    # -------------------------------------------------
+
+    def core(self, batch_size=10000):
+        """
+        Whole ledger as a LedgerCore (signed minor units + day
+        ordinals), streamed from SQL without building row objects.
+        """
+        connection, sql, params = self._key_sql()
+        signed = array("q")
+        days = array("l")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT CAST(julianday(r_date) - {JULIAN_ORDINAL_OFFSET} AS INTEGER), r_minor "
+                f"FROM ({sql}) ledger_rows",
+                params,
+            )
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                batch_days, batch_signed = zip(*batch)
+                days.extend(batch_days)
+                signed.extend(batch_signed)
+
+        return LedgerCore(signed, days, opening=to_minor(self.opening()))
+
+    def daily_totals(self):
+        """
+        (days, credits, debits): ordinals of the days with activity and
+        the inflow / outflow of each, summed in SQL, in minor units.
+        """
+        connection, sql, params = self._key_sql(ordered=False)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT CAST(julianday(r_date) - {JULIAN_ORDINAL_OFFSET} AS INTEGER) AS r_day, "
+                "SUM(MAX(r_minor, 0)), SUM(MAX(-r_minor, 0)) "
+                f"FROM ({sql}) ledger_rows GROUP BY r_day ORDER BY r_day",
+                params,
+            )
+            rows = cursor.fetchall()
+
+        days, credits, debits = zip(*rows) if rows else ((), (), ())
+        return array("l", days), array("q", credits), array("q", debits)
+
+    def totals(self):
+        """
+        Opening, total in (credit), total out (debit) and closing,
+        summed in SQL without loading the ledger into Python.
+        """
+        connection, sql, params = self._key_sql(ordered=False)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COALESCE(SUM(r_minor), 0), COALESCE(SUM(ABS(r_minor)), 0) "
+                f"FROM ({sql}) ledger_rows",
+                params,
+            )
+            net, magnitude = cursor.fetchone()
+
+        opening = to_minor(self.opening())
+        credit = (net + magnitude) // 2
+
+        return {
+            "opening": to_decimal(opening),
+            "credit": to_decimal(credit),
+            "debit": to_decimal(credit - net),
+            "closing": to_decimal(opening + net),
+        }
+
+    def monthly_totals(self):
+        """
+        [(first day of month, totals), ...] for every month with activity.
+        """
+        core = self.core()
+        if not len(core):
+            return []
+
+        first = date.fromordinal(core.days[0]).replace(day=1)
+        last = date.fromordinal(core.days[-1])
+
+        months = []
+        month = first
+        while month <= last:
+            months.append(month)
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        periods = core.period_totals([m.toordinal() for m in months])
+        return [
+            (month, {key: to_decimal(value) for key, value in totals.items()})
+            for month, totals in zip(months, periods)
+        ]
+
+    # -------------------------------------------------
+
+    def chunk(self, offset, limit):
+        """
+        JSON-ready window of the ledger for the streaming table.
+        Invoice lines go in ``details``, keyed by row position.
+        """
+        return self._chunk_json(offset, self.count(), self.rows(offset, limit))
+
+    def _chunk_json(self, offset, count, entries):
+        return {
+            "offset": offset,
+            "count": count,
+            "columns": list(self.COLUMNS),
+            "rows": [self.render_row(entry) for entry in entries],
+            "details": {
+                index: [
+                    [line["product"], _as_text(line["quantity"]), _as_text(line["rate"]), _as_text(line["amount"])]
+                    for line in entry["lines"]
+                ]
+                for index, entry in enumerate(entries)
+                if entry.get("lines")
+            },
+        }
+
+    def totals_json(self):
+        return {key: str(value) for key, value in self.totals().items()}
+
+    def render_row(self, entry):
+        return [self.render(key, entry[key]) for key in self.COLUMNS]
+
+    # -------------------------------------------------
+    # async (ASGI) variants
+
+    async def acount(self):
+        return sum([await base.acount() for base, _, _ in self.sides()])
+
+    async def arows(self, offset=0, limit=None):
+        rows = [row async for row in self._window(offset, limit)]
+        await sync_to_async(self.attach_details)(rows)
+        return self._present_all(rows, await sync_to_async(self.carry)(offset))[0]
+
+    async def achunk(self, offset, limit):
+        return self._chunk_json(offset, await self.acount(), await self.arows(offset, limit))
+
+    async def atotals_json(self):
+        return await sync_to_async(self.totals_json)()
+
+    def _present_batch(self, rows, carry):
+        self.attach_details(rows)
+        return self._present_all(rows, carry)
+
+    async def abatches(self, batch_size=STREAM_BATCH):
+        """
+        The whole ledger in ledger order as lists of up to ``batch_size``
+        entries, the running balance carried from batch to batch. Rows
+        are presented off the event loop.
+        """
+        balance = to_minor(await sync_to_async(self.opening)())
+        batch = []
+
+        async for row in self.queryset().aiterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                entries, balance = await sync_to_async(self._present_batch)(batch, balance)
+                yield entries
+                batch = []
+
+        if batch:
+            yield (await sync_to_async(self._present_batch)(batch, balance))[0]
+
+    async def astream(self, batch_size=STREAM_BATCH):
+        async for entries in self.abatches(batch_size):
+            for entry in entries:
+                yield entry
+
+    async def amonthly_totals(self, batch_size=STREAM_BATCH):
+        """
+        Yields (first day of month, totals) for each month with activity
+        as soon as the month's last row has been read.
+        """
+        balance = to_minor(await sync_to_async(self.opening)())
+        month = None
+        signed = []
+
+        async for row in self._union(with_columns=False).aiterator(chunk_size=batch_size):
+            # UTC day, as monthly_totals() buckets by julianday(r_date)
+            row_month = row["r_date"].date().replace(day=1)
+
+            if row_month != month and signed:
+                totals = LedgerCore(signed, opening=balance).totals()
+                balance = totals["closing"]
+                yield month, {key: to_decimal(value) for key, value in totals.items()}
+                signed = []
+
+            month = row_month
+            signed.append(row["r_minor"])
+
+        if signed:
+            totals = LedgerCore(signed, opening=balance).totals()
+            yield month, {key: to_decimal(value) for key, value in totals.items()}
+
+    @staticmethod
+    def render(key, value):
+        if key == "date":
+            return format_date(timezone.localtime(value), "d-m-Y")
+        return _as_text(value)
+
+
+class InvoiceLinesMixin:
+    """
+    Invoices appear as one ledger row (r_invoice set); their lines are
+    loaded for a whole window of rows in one query.
+    """
+
+    def attach_details(self, rows):
+        invoice_ids = [row["r_invoice"] for row in rows if row.get("r_invoice")]
+        if not invoice_ids:
+            return
+
+        lines = {}
+        for line in (
+            self.tables()[0].filter(invoice_id__in=invoice_ids)
+            .order_by("id")
+            .values("invoice_id", "inventory__name", "quantity", "price_per_unit", "amount")
+        ):
+            lines.setdefault(line["invoice_id"], []).append({
+                "product": line["inventory__name"],
+                "quantity": line["quantity"],
+                "rate": line["price_per_unit"],
+                "amount": line["amount"],
+            })
+
+        for row in rows:
+            if row.get("r_invoice"):
+                row["lines"] = lines.get(row["r_invoice"], [])
+
+
+# =====================================================
+# PARTY LEDGER
+# =====================================================
+
+class PartyLedger(InvoiceLinesMixin, LedgerSource):
+    """
+    Only credit sales / purchases and receipts / payments move what a
+    party owes; cash sales are listed with no balance effect.
+    """
+
+    COLUMNS = ("date", "type", "mode", "product", "quantity", "rate", "amount", "balance")
+    HEADERS = ("Date", "Type", "Mode", "Product", "Quantity", "Rate", "Amount", "Running Balance")
+    SIGNED_COLUMN = "balance"
+
+    def live_opening(self):
+        return self.obj.opening_balance or ZERO
+
+    @staticmethod
+    def _credit_effect():
+        return _signed(
+            When(purpose="sale", payment_mode="credit", then=F("amount")),
+            When(purpose="purchase", payment_mode="credit", then=-F("amount")),
+            default=_decimal(0),
+        )
+
+    def sides(self):
+        sales, invoices, cash = self.tables()
+
+        return [
+            (
+                sales.filter(party=self.obj, invoice__isnull=True),
+                self._credit_effect(),
+                {
+                    "r_type": F("purpose"),
+                    "r_mode": F("payment_mode"),
+                    "r_product": F("inventory__name"),
+                    "r_quantity": F("quantity"),
+                    "r_rate": F("price_per_unit"),
+                    "r_amount": F("amount"),
+                    "r_invoice": _integer(),
+                },
+            ),
+            (
+                invoices.filter(party=self.obj),
+                self._credit_effect(),
+                {
+                    "r_type": F("purpose"),
+                    "r_mode": F("payment_mode"),
+                    "r_product": _text(""),
+                    "r_quantity": _decimal(),
+                    "r_rate": _decimal(),
+                    "r_amount": F("amount"),
+                    "r_invoice": F("id"),
+                },
+            ),
+            (
+                cash.filter(party=self.obj),
+                _signed(When(transaction_type="receive", then=-F("amount")), default=F("amount")),
+                {
+                    "r_type": F("transaction_type"),
+                    "r_mode": _text("cash"),
+                    "r_product": _text("-"),
+                    "r_quantity": _decimal(),
+                    "r_rate": _decimal(),
+                    "r_amount": F("amount"),
+                    "r_invoice": _integer(),
+                },
+            ),
+        ]
+
+    def present(self, row, balance):
+        entry = {
+            "date": row["r_date"],
+            "type": _type_label(row["r_type"], row["r_amount"]),
+            "mode": row["r_mode"].upper(),
+            "product": row["r_product"],
+            "quantity": row["r_quantity"] if row["r_quantity"] is not None else "",
+            "rate": row["r_rate"] if row["r_rate"] is not None else "",
+            "amount": row["r_amount"],
+            "balance": balance,
+        }
+
+        if row["r_invoice"]:
+            entry["product"] = f"Invoice #{row['r_invoice']} ({len(row['lines'])} items)"
+            entry["lines"] = row["lines"]
+
+        return entry
+
+
+# =====================================================
+# ACCOUNT (CASH / BANK) LEDGER
+# =====================================================
+
+class AccountLedger(InvoiceLinesMixin, LedgerSource):
+
+    COLUMNS = ("date", "type", "party", "debit", "credit", "balance")
+    HEADERS = ("Date", "Type", "Party", "Debit", "Credit", "Balance")
+
+    def live_opening(self):
+        return self.obj.opening_balance or ZERO
+
+    def sides(self):
+        sales, invoices, cash = self.tables()
+        sale_effect = _signed(When(purpose="sale", then=F("amount")), default=-F("amount"))
+
+        return [
+            (
+                sales.filter(account=self.obj, payment_mode="cash", invoice__isnull=True),
+                sale_effect,
+                {
+                    "r_type": F("purpose"),
+                    "r_party": F("party__name"),
+                    "r_amount": F("amount"),
+                    "r_invoice": _integer(),
+                },
+            ),
+            (
+                invoices.filter(account=self.obj, payment_mode="cash"),
+                sale_effect,
+                {
+                    "r_type": F("purpose"),
+                    "r_party": F("party__name"),
+                    "r_amount": F("amount"),
+                    "r_invoice": F("id"),
+                },
+            ),
+            (
+                cash.filter(account=self.obj),
+                _signed(When(transaction_type="receive", then=F("amount")), default=-F("amount")),
+                {
+                    "r_type": F("transaction_type"),
+                    "r_party": F("party__name"),
+                    "r_amount": F("amount"),
+                    "r_invoice": _integer(),
+                },
+            ),
+        ]
+
+    def present(self, row, balance):
+        inflow = row["r_type"] in ("sale", "receive")
+
+        entry = {
+            "date": row["r_date"],
+            "type": _type_label(row["r_type"], row["r_amount"]),
+            "party": row["r_party"],
+            "debit": ZERO if inflow else row["r_amount"],
+            "credit": row["r_amount"] if inflow else ZERO,
+            "balance": balance,
+        }
+
+        if row["r_invoice"]:
+            entry["type"] = f"{entry['type']} INVOICE #{row['r_invoice']}"
+            entry["lines"] = row["lines"]
+
+        return entry
+
+
+# =====================================================
+# INVENTORY STOCK LEDGER
+# =====================================================
+
+class StockLedger(LedgerSource):
+    """
+    Balance is stock quantity. The real current stock is the closing
+    figure, so the opening stock is derived backwards from it. Invoice
+    lines are listed individually here.
+    """
+
+    COLUMNS = ("date", "type", "party", "mode", "qty_in", "qty_out", "rate", "stock")
+    HEADERS = ("Date", "Type", "Party", "Mode", "Qty In", "Qty Out", "Rate", "Stock After")
+
+    def live_opening(self):
+        if not hasattr(self, "_opening"):
+            self._opening = (self.obj.quantity or ZERO) - to_decimal(self.signed_total())
+        return self._opening
+
+    def sides(self):
+        return [
+            (
+                self.tables()[0].filter(inventory=self.obj),
+                _signed(When(purpose="sale", then=-F("quantity")), default=F("quantity")),
+                {
+                    "r_type": F("purpose"),
+                    "r_party": F("party__name"),
+                    "r_mode": F("payment_mode"),
+                    "r_quantity": F("quantity"),
+                    "r_rate": F("price_per_unit"),
+                },
+            ),
+        ]
+
+    def present(self, row, balance):
+        sale = row["r_type"] == "sale"
+
+        return {
+            "date": row["r_date"],
+            "type": _type_label(row["r_type"], row["r_quantity"]),
+            "party": row["r_party"],
+            "mode": row["r_mode"].upper(),
+            "qty_in": ZERO if sale else row["r_quantity"],
+            "qty_out": row["r_quantity"] if sale else ZERO,
+            "rate": row["r_rate"],
+            "stock": balance,
+        }
+
+
+# (model, ledger) per kind, as named in URLs and job arguments
+LEDGERS = {
+    "party": (Party, PartyLedger),
+    "account": (Account, AccountLedger),
+    "inventory": (Inventory, StockLedger),
+}
@@ -0,0 +1,166 @@
+# accounting/ledger_core.py
+
+"""
+Compact ledger arithmetic on integer minor units (paise, or hundredths
+of a unit for stock quantities).
+
+Amounts are loaded straight from SQL as integers into ``array('q')``
+buffers (8 bytes per row instead of a Decimal object plus a dict per
+row). Running balances, debit / credit splits and period totals are
+computed with C-level iteration (itertools.accumulate, map over
+operators, slice sums), so integer arithmetic stays exact and Decimal
+is only created for values that are actually displayed.
+
+Standard-library arrays keep this free of new dependencies; NumPy would
+be faster still but is not required by the project.
+"""
+
+from array import array
+from bisect import bisect_left
+from decimal import Decimal
+from itertools import accumulate
+from operator import sub
+
+
+
+def to_minor(value):
+    """
+    Decimal (or None) with at most 2 places → integer minor units.
+    """
+    if value is None:
+        return 0
+    return int(Decimal(value).scaleb(2).to_integral_value())
+
+
+def to_decimal(minor):
+    """
+    Integer minor units → Decimal with exactly 2 places.
+    """
+    return Decimal(minor).scaleb(-2)
+
+
+# =====================================================
+# LEDGER ARRAYS
+# =====================================================
+
+class LedgerCore:
+    """
+    One ledger as two parallel arrays, in ledger order:
+
+        signed  balance effect of each row, in minor units
+        days    proleptic ordinal of each row's date (for period totals)
+    """
+
+    __slots__ = ("signed", "days", "opening")
+
+    def __init__(self, signed, days=None, opening=0):
+        self.signed = signed if isinstance(signed, array) else array("q", signed)
+        self.days = days if days is None or isinstance(days, array) else array("l", days)
+        self.opening = opening
+
+    def __len__(self):
+        return len(self.signed)
+
+    # -------------------------------------------------
+
+    def running(self):
+        """
+        Balance after each row.
+        """
+        balances = array("q", accumulate(self.signed, initial=self.opening))
+        del balances[0]
+        return balances
+
+    def closing(self):
+        return self.opening + sum(self.signed)
+
+    def credits(self):
+        """
+        Inflows (positive effects) per row, 0 elsewhere.
+        """
+        return array("q", [value if value > 0 else 0 for value in self.signed])
+
+    def debits(self, credits=None):
+        """
+        Outflows per row as positive numbers, 0 elsewhere.
+        """
+        credits = self.credits() if credits is None else credits
+        return array("q", map(sub, credits, self.signed))
+
+    def splits(self):
+        credits = self.credits()
+        return credits, self.debits(credits)
+
+    @staticmethod
+    def _in_out(signed):
+        # sum of positives = (net + sum of magnitudes) / 2, exact on ints
+        net = sum(signed)
+        credit = (net + sum(map(abs, signed))) // 2
+        return net, credit, credit - net
+
+    def totals(self):
+        net, credit, debit = self._in_out(self.signed)
+        return {
+            "opening": self.opening,
+            "credit": credit,
+            "debit": debit,
+            "closing": self.opening + net,
+        }
+
+    # -------------------------------------------------
+
+    def period_totals(self, boundaries):
+        """
+        Totals per period. ``boundaries`` are ascending day ordinals; a
+        period runs from one boundary up to (not including) the next.
+        Rows must be in date order, as ledgers are; rows before the
+        first boundary are folded into the first period's opening.
+        """
+        if self.days is None:
+            raise ValueError("period_totals() needs row dates")
+
+        periods = []
+
+        cuts = [bisect_left(self.days, day) for day in boundaries]
+        cuts.append(len(self.signed))
+        balance = self.opening + sum(self.signed[:cuts[0]])
+
+        for start, end in zip(cuts, cuts[1:]):
+            net, credit, debit = self._in_out(self.signed[start:end])
+            opening = balance
+            balance += net
+
+            periods.append({
+                "opening": opening,
+                "credit": credit,
+                "debit": debit,
+                "closing": balance,
+            })
+
+        return periods
+
+
+def bucket_totals(days, credits, debits, boundaries, opening=0):
+    """
+    Resample per-day inflows / outflows (``days`` ascending, one entry
+    per day) into the periods between consecutive ``boundaries``; the
+    last boundary closes the final period, so n boundaries give n - 1
+    periods. Days before the first boundary go into the opening, days
+    from the last one on are left out.
+
+    Prefix sums make every period two lookups, however long the history.
+    Returns the opening and per-period credit / debit / closing arrays.
+    """
+    inflow = array("q", accumulate(credits, initial=0))
+    outflow = array("q", accumulate(debits, initial=0))
+
+    cuts = [bisect_left(days, day) for day in boundaries]
+    inflow_at = [inflow[cut] for cut in cuts]
+    outflow_at = [outflow[cut] for cut in cuts]
+
+    return {
+        "opening": opening + inflow_at[0] - outflow_at[0],
+        "credit": array("q", map(sub, inflow_at[1:], inflow_at)),
+        "debit": array("q", map(sub, outflow_at[1:], outflow_at)),
+        "closing": array("q", map(opening.__add__, map(sub, inflow_at[1:], outflow_at[1:]))),
+    }
@@ -0,0 +1,97 @@
+import random
+import time
+import tracemalloc
+from array import array
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from accounting.ledger_core import LedgerCore, to_decimal
+
+
+def decimal_ledger(amounts, opening):
+    """
+    The per-row dict + Decimal loop the admin ledger views used to run.
+    """
+    balance = opening
+    ledger = []
+
+    for entry in amounts:
+        if entry["amount"] > 0:
+            balance += entry["amount"]
+            credit = entry["amount"]
+            debit = Decimal("0")
+        else:
+            balance += entry["amount"]
+            debit = -entry["amount"]
+            credit = Decimal("0")
+
+        ledger.append({
+            "day": entry["day"],
+            "debit": debit,
+            "credit": credit,
+            "balance": balance,
+        })
+
+    return ledger
+
+
+def core_ledger(signed, days, opening):
+    core = LedgerCore(signed, days, opening=opening)
+    credits, debits = core.splits()
+    return core.running(), credits, debits, core.totals()
+
+
+def measure(fn, *args):
+    # Timed without tracemalloc (it slows allocation-heavy code a lot),
+    # then run again under tracemalloc for the peak.
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = "Compare the Decimal ledger loop with the integer LedgerCore on synthetic rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        count = options["rows"]
+        start_day = date(2020, 4, 1).toordinal()
+
+        signed = array("q", (rng.randint(-5_000_000, 5_000_000) for _ in range(count)))
+        days = array("l", sorted(start_day + rng.randrange(1500) for _ in range(count)))
+        opening = 123_456
+
+        amounts = [
+            {"day": d, "amount": to_decimal(s)}
+            for d, s in zip(days, signed)
+        ]
+
+        old, old_time, old_peak = measure(decimal_ledger, amounts, to_decimal(opening))
+        new, new_time, new_peak = measure(core_ledger, signed, days, opening)
+
+        running, credits, debits, _ = new
+        for i in range(0, count, max(count // 1000, 1)):
+            row = old[i]
+            assert to_decimal(running[i]) == row["balance"], i
+            assert to_decimal(credits[i]) == row["credit"], i
+            assert to_decimal(debits[i]) == row["debit"], i
+
+        self.stdout.write(f"rows:            {count:,}")
+        self.stdout.write(f"Decimal loop:    {old_time * 1000:9.1f} ms  peak {old_peak / 2**20:8.1f} MiB")
+        self.stdout.write(f"LedgerCore:      {new_time * 1000:9.1f} ms  peak {new_peak / 2**20:8.1f} MiB")
+        self.stdout.write(self.style.SUCCESS(
+            f"speedup x{old_time / new_time:.1f}, memory /{old_peak / max(new_peak, 1):.1f}, results agree"
+        ))
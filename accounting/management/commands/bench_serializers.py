@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from accounting.fastread import codec
+from accounting.serializers import SalePurchaseSerializer, CashBankTransactionSerializer
+
+
+SERIALIZERS = {
+    "sales": SalePurchaseSerializer,
+    "cash": CashBankTransactionSerializer,
+}
+
+
+def serializer_page(serializer_class, queryset):
+    return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+
+def fast_page(serializer_class, queryset):
+    row_codec = codec(serializer_class)
+    return JSONRenderer().render(row_codec.encode(row_codec.rows(queryset)))
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+class Command(BaseCommand):
+    help = "Compare list serialization through the DRF serializers with the fast values() path on stored rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        for kind, serializer_class in SERIALIZERS.items():
+            model = serializer_class.Meta.model
+            queryset = model.objects.order_by("-date", "-id")[:options["rows"]]
+
+            count = queryset.count()
+            if not count:
+                raise CommandError(f"No {model._meta.verbose_name_plural} to serialize.")
+
+            old, old_time = best_of(options["repeat"], serializer_page, serializer_class, queryset)
+            new, new_time = best_of(options["repeat"], fast_page, serializer_class, queryset)
+
+            # Same rows, keys and values; the fast rows only add the joined names
+            old_rows = [list(row.items()) for row in json.loads(old)]
+            new_rows = [[item for item in row.items() if not item[0].endswith("_name")] for row in json.loads(new)]
+            if old_rows != new_rows:
+                raise CommandError(f"{kind}: fast output differs from the serializer's.")
+
+            self.stdout.write(f"{kind} ({count:,} rows)")
+            self.stdout.write(f"  serializer:  {old_time * 1000:9.1f} ms  {count / old_time:12,.0f} rows/s")
+            self.stdout.write(f"  fast path:   {new_time * 1000:9.1f} ms  {count / new_time:12,.0f} rows/s")
+            self.stdout.write(self.style.SUCCESS(f"  speedup x{old_time / new_time:.1f}, output identical"))
+
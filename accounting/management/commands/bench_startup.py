@@ -0,0 +1,89 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Optional dependencies that must stay out of start-up (imported on
+# first use: accounting.pdf, master_import, profiling)
+LAZY_MODULES = ("reportlab", "openpyxl", "cProfile", "pstats")
+
+# Fresh interpreter: time django.setup() and one request through the
+# full middleware stack, then list the lazy modules that got imported
+PROBE = """
+import json, sys, time
+
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - started
+
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+
+loaded = sorted(name for name in {lazy!r} if name in sys.modules)
+
+started = time.perf_counter()
+status = Client().get({path!r}).status_code
+first_request = time.perf_counter() - started
+
+print(json.dumps({{"setup": setup, "first_request": first_request, "status": status, "loaded": loaded}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time django.setup() and the first request in fresh processes; fail when the median "
+        "exceeds the budget or a lazily imported dependency is loaded at start-up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--path", default="/admin/login/")
+        parser.add_argument("--max-setup-ms", type=float, default=settings.STARTUP_BUDGET_SETUP_MS)
+        parser.add_argument("--max-first-request-ms", type=float, default=settings.STARTUP_BUDGET_FIRST_REQUEST_MS)
+
+    def handle(self, *args, **options):
+        probe = PROBE.format(lazy=LAZY_MODULES, path=options["path"])
+        environment = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)}
+
+        results = []
+        for _ in range(options["runs"]):
+            completed = subprocess.run(
+                [sys.executable, "-c", probe],
+                cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True,
+            )
+            if completed.returncode:
+                raise CommandError(f"Probe failed:\n{completed.stderr}")
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+        setup = statistics.median(result["setup"] for result in results) * 1000
+        first_request = statistics.median(result["first_request"] for result in results) * 1000
+        loaded = sorted({name for result in results for name in result["loaded"]})
+
+        self.stdout.write(f"runs:            {len(results)}")
+        self.stdout.write(f"django.setup():  {setup:8.1f} ms  (budget {options['max_setup_ms']:.0f} ms)")
+        self.stdout.write(
+            f"first request:   {first_request:8.1f} ms  (budget {options['max_first_request_ms']:.0f} ms, "
+            f"GET {options['path']} -> {results[0]['status']})"
+        )
+
+        problems = []
+        if setup > options["max_setup_ms"]:
+            problems.append(f"django.setup() took {setup:.0f} ms, over its {options['max_setup_ms']:.0f} ms budget")
+        if first_request > options["max_first_request_ms"]:
+            problems.append(
+                f"the first request took {first_request:.0f} ms, over its {options['max_first_request_ms']:.0f} ms budget"
+            )
+        if loaded:
+            problems.append(f"{', '.join(loaded)} imported at start-up; import on first use instead")
+
+        if problems:
+            raise CommandError("; ".join(problems))
+
+        self.stdout.write(self.style.SUCCESS("within budget"))
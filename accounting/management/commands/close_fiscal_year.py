@@ -0,0 +1,27 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.closing import close_year
+from accounting.models import FiscalYear
+
+
+class Command(BaseCommand):
+    help = "Close a fiscal year: lock its dates, carry balances forward and archive its rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="FiscalYear name, e.g. 2025-26")
+
+    def handle(self, *args, **options):
+        try:
+            year = FiscalYear.objects.get(name=options["name"])
+        except FiscalYear.DoesNotExist:
+            raise CommandError(f"No fiscal year named {options['name']!r}.")
+
+        try:
+            result = close_year(year)
+        except ValidationError as error:
+            raise CommandError("; ".join(error.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {year.name}: {result['archived']} rows archived."
+        ))
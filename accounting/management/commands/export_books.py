@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import backup, tenancy
+
+
+class Command(BaseCommand):
+    help = "Back up the books to a directory of compressed JSONL chunks with a checksummed manifest."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Created if missing; must be empty. {tenant} is replaced by the company alias.")
+        parser.add_argument("--snapshot", action="store_true",
+                            help="Read the reporting snapshot instead of the live database, so postings are not held up.")
+        parser.add_argument("--chunk-rows", type=int, default=backup.CHUNK_ROWS)
+
+    def handle(self, *args, **options):
+        directory = options["directory"].format(tenant=tenancy.current())
+
+        def progress(table):
+            self.stdout.write(f"{table['model']:40} {table['rows']:>10,} rows  {len(table['files'])} file(s)")
+
+        try:
+            manifest = backup.export_books(
+                directory, snapshot=options["snapshot"], chunk_rows=options["chunk_rows"], progress=progress,
+            )
+        except backup.BackupError as error:
+            raise CommandError(str(error))
+
+        rows = sum(table["rows"] for table in manifest["tables"])
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows:,} rows to {directory}"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import backup, tenancy
+
+
+class Command(BaseCommand):
+    help = "Restore books written by export_books, then verify the balances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="{tenant} is replaced by the company alias.")
+        parser.add_argument("--replace", action="store_true",
+                            help="Delete the current books first (in the same transaction).")
+
+    def handle(self, *args, **options):
+        directory = options["directory"].format(tenant=tenancy.current())
+
+        def progress(table):
+            self.stdout.write(f"{table['model']:40} {table['rows']:>10,} rows")
+
+        try:
+            restored = backup.import_books(directory, replace=options["replace"], progress=progress)
+        except backup.BackupError as error:
+            raise CommandError(str(error))
+
+        for kind, figures in restored.items():
+            if figures.get("mismatched"):
+                self.stderr.write(self.style.WARNING(
+                    f"{figures['mismatched']} {kind} balance(s) disagree with their ledgers (as in the backup)."
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f"Restored {directory}; balances verified."))
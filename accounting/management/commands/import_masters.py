@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.master_import import KINDS, ImportFailed, import_masters, read_table
+
+
+class Command(BaseCommand):
+    help = "Create or update parties, accounts or inventory from a CSV / XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(KINDS))
+        parser.add_argument("file", help=".csv or .xlsx, header row first")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and count, write nothing.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["file"], "rb") as handle:
+                table = read_table(handle, options["file"])
+            result = import_masters(options["kind"], table, dry_run=options["dry_run"])
+
+        except OSError as error:
+            raise CommandError(str(error))
+
+        except ImportFailed as failure:
+            for line, message in failure.errors:
+                self.stderr.write(f"line {line}: {message}")
+            raise CommandError(f"{failure} — nothing was imported.")
+
+        summary = f"{result['created']} created, {result['updated']} updated, {result['unchanged']} unchanged"
+        if result["stock_kept"]:
+            summary += f"; stock kept for {result['stock_kept']} item(s) with postings"
+        if options["dry_run"]:
+            summary += " (dry run, nothing written)"
+
+        self.stdout.write(self.style.SUCCESS(summary))
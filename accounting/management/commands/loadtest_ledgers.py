@@ -0,0 +1,274 @@
+import asyncio
+import io
+import statistics
+import time
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models import Account, Party, Inventory, SalePurchase, CashBankTransaction
+
+
+LONG_LEDGER = "Load test: long ledger"
+SHORT_LEDGER = "Load test: short ledger"
+
+
+def seed(rows):
+    """
+    Two parties (one with ``rows`` entries, one with a handful),
+    inserted with bulk_create: stored balances are left alone.
+    """
+    product, _ = Inventory.objects.get_or_create(name="Load test product")
+    account, _ = Account.objects.get_or_create(name="Load test cash", defaults={"account_type": "cash"})
+    parties = []
+
+    for name, count in ((LONG_LEDGER, rows), (SHORT_LEDGER, 20)):
+        party, created = Party.objects.get_or_create(name=name, defaults={"party_type": "customer"})
+        parties.append(party)
+        if not created:
+            continue
+
+        now = timezone.now()
+        SalePurchase.objects.bulk_create(
+            [
+                SalePurchase(
+                    purpose="sale", payment_mode="credit", party=party, inventory=product,
+                    quantity=Decimal("1"), price_per_unit=Decimal("90"), amount=Decimal("90"),
+                    date=now - timezone.timedelta(minutes=i),
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        CashBankTransaction.objects.bulk_create(
+            [
+                CashBankTransaction(
+                    transaction_type="receive", party=party, account=account, amount=Decimal("50"),
+                    date=now - timezone.timedelta(minutes=i, seconds=30),
+                )
+                for i in range(count // 2)
+            ],
+            batch_size=1000,
+        )
+
+    return parties
+
+
+def session_cookie(username):
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        user = User.objects.create_user(username)
+
+    client = Client()
+    client.force_login(user)
+    return f"sessionid={client.cookies['sessionid'].value}"
+
+
+# =====================================================
+# DRIVERS
+# =====================================================
+
+def wsgi_get(handler, path, cookie):
+    url = urlsplit(path)
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "HTTP_COOKIE": cookie,
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    status = []
+
+    try:
+        response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+        size = sum(len(chunk) for chunk in response)
+        response.close()
+    finally:
+        connections.close_all()
+
+    return int(status[0].split()[0]), size
+
+
+async def asgi_get(handler, path, cookie):
+    url = urlsplit(path)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": [(b"host", b"localhost"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    done = asyncio.Event()
+    requested = False
+    status = None
+    size = 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await handler(scope, receive, send)
+    return status, size
+
+
+def http_get(base, path, cookie):
+    request = urllib.request.Request(base.rstrip("/") + path, headers={"Cookie": cookie})
+    with urllib.request.urlopen(request) as response:
+        return response.status, len(response.read())
+
+
+# =====================================================
+# COMMAND
+# =====================================================
+
+class Command(BaseCommand):
+    help = (
+        "Fire slow (full ledger export) and fast (first rows of a short ledger) "
+        "requests together and compare latencies: a fixed pool of WSGI workers "
+        "against the async endpoints on one ASGI event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Insert a long ledger of this many rows first (use a scratch database).")
+        parser.add_argument("--slow", type=int, default=4, help="Concurrent full-ledger exports.")
+        parser.add_argument("--fast", type=int, default=40, help="Quick requests fired alongside them.")
+        parser.add_argument("--workers", type=int, default=4, help="WSGI worker threads.")
+        parser.add_argument("--interval", type=float, default=0.01,
+                            help="Seconds between quick requests.")
+        parser.add_argument("--user", default="loadtest", help="User the requests are logged in as.")
+        parser.add_argument("--url",
+                            help="Base URL of a running server (e.g. uvicorn accounting_project.asgi:application) "
+                                 "to load instead of the in-process handlers.")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            long_ledger, short_ledger = seed(options["seed"])
+        else:
+            long_ledger = Party.objects.filter(name=LONG_LEDGER).first()
+            short_ledger = Party.objects.filter(name=SHORT_LEDGER).first()
+            if long_ledger is None or short_ledger is None:
+                self.stderr.write("No load test ledgers yet: run with --seed <rows> against a scratch database.")
+                return
+
+        # WSGI buffers the async streams (and warns once per request); that
+        # is part of what is being measured
+        warnings.filterwarnings("ignore", "StreamingHttpResponse must consume asynchronous iterators")
+
+        cookie = session_cookie(options["user"])
+        connections.close_all()
+
+        slow = [reverse("ledger-export", args=["party", long_ledger.pk])] * options["slow"]
+        fast = [reverse("ledger-rows", args=["party", short_ledger.pk]) + "?limit=50"] * options["fast"]
+
+        if options["url"]:
+            results = [("server", self.run_threads(lambda path: http_get(options["url"], path, cookie),
+                                                   slow, fast, len(slow) + len(fast), options["interval"]))]
+        else:
+            handler = WSGIHandler()
+            results = [
+                (f"WSGI, {options['workers']} workers",
+                 self.run_threads(lambda path: wsgi_get(handler, path, cookie),
+                                  slow, fast, options["workers"], options["interval"])),
+                ("ASGI, async views", asyncio.run(self.run_async(ASGIHandler(), cookie, slow, fast, options["interval"]))),
+            ]
+
+        self.stdout.write(f"{len(slow)} exports of {long_ledger.name!r} + {len(fast)} row requests of {short_ledger.name!r}")
+        self.stdout.write(f"{'':22} {'fast p50':>10} {'fast p95':>10} {'fast max':>10} {'slow mean':>10} {'wall':>8}")
+
+        for label, (fast_times, slow_times, wall) in results:
+            p95 = statistics.quantiles(fast_times, n=20)[-1] if len(fast_times) > 1 else fast_times[0]
+            self.stdout.write(
+                f"{label:22} {statistics.median(fast_times) * 1000:8.1f}ms {p95 * 1000:8.1f}ms "
+                f"{max(fast_times) * 1000:8.1f}ms {statistics.mean(slow_times) * 1000:8.1f}ms {wall:7.2f}s"
+            )
+
+        if len(results) == 2:
+            (_, (wsgi_fast, _, _)), (_, (asgi_fast, _, _)) = results
+            self.stdout.write(self.style.SUCCESS(
+                f"fast requests: median x{statistics.median(wsgi_fast) / statistics.median(asgi_fast):.1f} "
+                f"quicker under ASGI while the exports run"
+            ))
+
+    # -------------------------------------------------
+
+    def run_threads(self, get, slow, fast, workers, interval):
+        # Waiting for a free worker counts: timed from submission
+        def timed(path, submitted):
+            status, _ = get(path)
+            if status != 200:
+                raise RuntimeError(f"{path}: HTTP {status}")
+            return time.perf_counter() - submitted
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            slow_futures = [pool.submit(timed, path, time.perf_counter()) for path in slow]
+            fast_futures = []
+            for path in fast:
+                time.sleep(interval)
+                fast_futures.append(pool.submit(timed, path, time.perf_counter()))
+
+            fast_times = [future.result() for future in fast_futures]
+            slow_times = [future.result() for future in slow_futures]
+
+        return fast_times, slow_times, time.perf_counter() - started
+
+    async def run_async(self, handler, cookie, slow, fast, interval):
+        async def timed(path):
+            started = time.perf_counter()
+            status, _ = await asgi_get(handler, path, cookie)
+            if status != 200:
+                raise RuntimeError(f"{path}: HTTP {status}")
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        slow_tasks = [asyncio.create_task(timed(path)) for path in slow]
+        fast_tasks = []
+        for path in fast:
+            await asyncio.sleep(interval)
+            fast_tasks.append(asyncio.create_task(timed(path)))
+
+        fast_times = await asyncio.gather(*fast_tasks)
+        slow_times = await asyncio.gather(*slow_tasks)
+        return list(fast_times), list(slow_times), time.perf_counter() - started
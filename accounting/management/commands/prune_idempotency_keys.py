@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounting.idempotency import prune_expired
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than settings.IDEMPOTENCY_KEY_TTL."
+
+    def handle(self, *args, **options):
+        deleted = prune_expired()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} idempotency keys."))
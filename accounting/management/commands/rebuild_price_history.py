@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounting import pricing
+
+
+class Command(BaseCommand):
+    help = "Recompute the last-rate price history from every posted sale / purchase."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=None, help="Database alias (defaults to the routed one).")
+
+    def handle(self, *args, **options):
+        rows = pricing.rebuild(options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Price history rebuilt ({rows} rows)."))
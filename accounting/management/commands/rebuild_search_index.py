@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounting import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the party / inventory FTS search tables from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=None, help="Database alias (defaults to the routed one).")
+
+    def handle(self, *args, **options):
+        search.rebuild_index(options["database"])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
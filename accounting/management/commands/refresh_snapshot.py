@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import reporting, tenancy
+
+
+class Command(BaseCommand):
+    help = "Refresh the read-only reporting snapshot with SQLite's online backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=None, help="Live database alias (defaults to the routed one).")
+        parser.add_argument("--every", type=int, default=0, help="Keep running, refreshing every N seconds.")
+
+    def handle(self, *args, **options):
+        alias = options["database"] or tenancy.current()
+
+        while True:
+            try:
+                path = reporting.refresh(alias)
+            except Exception as error:
+                if not options["every"]:
+                    raise CommandError(f"Snapshot of {alias} failed: {error}")
+                # A scheduled refresh retries on the next tick
+                self.stderr.write(f"Snapshot of {alias} failed: {error}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Snapshot of {alias} written to {path}."))
+
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
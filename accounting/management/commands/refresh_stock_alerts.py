@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounting import stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Daily upkeep of the low-stock alerts: re-check current alerts as the "
+        "consumption window moves on and prune old day buckets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Recompute buckets and alerts from the postings (after bulk loads).")
+        parser.add_argument("--database", default=None, help="Database alias (defaults to the routed one).")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            alerts = stock.rebuild(using=options["database"])
+        else:
+            alerts = stock.refresh(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"{alerts} product(s) need reordering."))
@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from accounting import jobs, tenancy
+
+
+class Command(BaseCommand):
+    help = "Run background jobs in this process (instead of, or as well as, the web process)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Worker threads (default settings.JOBS_WORKERS).")
+        parser.add_argument("--once", action="store_true", help="Run the queued jobs one after another, then exit.")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            count = 0
+            for alias in tenancy.aliases():
+                with tenancy.activate(alias):
+                    for job in jobs.run_pending():
+                        self.stdout.write(f"[{alias}] {job}")
+                        count += 1
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} job(s)."))
+            return
+
+        runner = jobs.start(workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(f"Job runner started ({runner.workers} workers). Ctrl+C to stop."))
+
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+
+        try:
+            stopped.wait()
+        except KeyboardInterrupt:
+            pass
+
+        runner.stop()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import get_commands, load_command_class
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import tenancy
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a management command for every company database in parallel, "
+        "e.g. `manage.py tenants migrate` or `manage.py tenants --only acme close_fiscal_year 2024-25`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parallel", type=int, default=os.cpu_count() or 1, help="Tenants run at once.")
+        parser.add_argument("--only", action="append", default=[], help="Limit to these tenant aliases.")
+        parser.add_argument("command_name")
+        parser.add_argument("command_args", nargs=argparse.REMAINDER)
+
+    def takes_database_option(self, name):
+        try:
+            app = get_commands()[name]
+        except KeyError:
+            raise CommandError(f"Unknown command: {name}")
+
+        parser = load_command_class(app, name).create_parser("manage.py", name)
+        return any("--database" in action.option_strings for action in parser._actions)
+
+    def run_for(self, alias, argv):
+        # Each tenant runs in its own process: no shared connections,
+        # and the router picks the tenant up from the environment
+        env = {**os.environ, tenancy.ENVIRONMENT_VARIABLE: alias}
+        result = subprocess.run(argv, env=env, capture_output=True, text=True)
+        return alias, result
+
+    def handle(self, *args, **options):
+        aliases = tenancy.aliases()
+        if options["only"]:
+            unknown = set(options["only"]) - set(aliases)
+            if unknown:
+                raise CommandError(f"Unknown tenants: {', '.join(sorted(unknown))}")
+            aliases = [alias for alias in aliases if alias in options["only"]]
+
+        name = options["command_name"]
+        database_option = self.takes_database_option(name)
+        base = [sys.executable, str(settings.BASE_DIR / "manage.py"), name, *options["command_args"]]
+
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=max(1, options["parallel"])) as pool:
+            jobs = [
+                pool.submit(self.run_for, alias, base + ([f"--database={alias}"] if database_option else []))
+                for alias in aliases
+            ]
+
+            for job in jobs:
+                alias, result = job.result()
+
+                for line in (result.stdout + result.stderr).splitlines():
+                    self.stdout.write(f"[{alias}] {line}")
+
+                if result.returncode:
+                    failed.append(alias)
+
+        if failed:
+            raise CommandError(f"{name} failed for: {', '.join(failed)}")
+
+        self.stdout.write(self.style.SUCCESS(f"{name} finished for {len(aliases)} tenant(s)."))
@@ -0,0 +1,298 @@
+# accounting/master_import.py
+
+"""
+Bulk import of parties, accounts and inventory from CSV or XLSX.
+
+The first row names the columns, in any order:
+
+    party:      name*, party_type*, phone, opening_balance
+    account:    name*, account_type*, opening_balance
+    inventory:  name*, unit, default_price, quantity, reorder_level,
+                min_cover_days
+
+Rows are matched to existing records by natural key (Account.name,
+Inventory.name, Party name + phone) and created or updated. Blank
+cells keep the current value, or the default for new records.
+
+The whole file is validated first: one pass over the rows with the
+model fields' own rules and one query for the existing keys. If any
+row is bad, ImportFailed lists every problem and nothing is written;
+otherwise the changes go in with bulk_create / bulk_update in one
+transaction.
+
+Opening balances: a new party / account starts with its running
+balance equal to the opening. Changing an existing opening shifts the
+running balance by the difference, so postings already made stay
+counted; once a fiscal year is closed, openings belong to the close
+and cannot be changed here. Inventory quantity is the opening stock:
+it is set on new items and on items nothing has been posted against;
+others keep their posted stock.
+"""
+
+import csv
+import io
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import F
+
+from . import search, stock
+from .models import Account, Party, Inventory, SalePurchase, FiscalYear
+
+
+# Records per bulk_create / bulk_update batch
+BATCH_SIZE = 500
+
+Kind = namedtuple("Kind", "model key columns required balance")
+
+KINDS = {
+    "party": Kind(
+        Party,
+        key=("name", "phone"),
+        columns=("name", "party_type", "phone", "opening_balance"),
+        required=("name", "party_type"),
+        balance="credit_balance",
+    ),
+    "account": Kind(
+        Account,
+        key=("name",),
+        columns=("name", "account_type", "opening_balance"),
+        required=("name", "account_type"),
+        balance="balance",
+    ),
+    "inventory": Kind(
+        Inventory,
+        key=("name",),
+        columns=("name", "unit", "default_price", "quantity", "reorder_level", "min_cover_days"),
+        required=("name",),
+        balance=None,
+    ),
+}
+
+
+class ImportFailed(Exception):
+    """
+    Carries every problem found as [(line number, message), ...].
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} problem(s) in the file")
+
+
+# =====================================================
+# READING
+# =====================================================
+
+def read_table(handle, filename):
+    """
+    Rows of a CSV or XLSX file (opened in binary mode) as lists of
+    cells, header row first.
+    """
+    if filename.lower().endswith(".xlsx"):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportFailed([(0, "Reading .xlsx needs the openpyxl package; upload a CSV instead.")])
+
+        book = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+        try:
+            return [list(row) for row in book.worksheets[0].iter_rows(values_only=True)]
+        finally:
+            book.close()
+
+    try:
+        return list(csv.reader(io.TextIOWrapper(handle, encoding="utf-8-sig", newline="")))
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise ImportFailed([(0, f"Not a readable UTF-8 CSV file: {error}")])
+
+
+def _cell(value):
+    """
+    Cell as stripped text, or None when blank.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        # Spreadsheets hand phone numbers and whole amounts over as floats
+        value = repr(value).removesuffix(".0")
+    return str(value).strip() or None
+
+
+def _choice(field, text):
+    # Accept the stored value or its label, in any case
+    for value, label in field.flatchoices:
+        if text.lower() in (str(value).lower(), str(label).lower()):
+            return value
+    return text
+
+
+def _key(kind, values):
+    return tuple(values.get(name) or "" for name in kind.key)
+
+
+# =====================================================
+# VALIDATION
+# =====================================================
+
+def validate(name, table):
+    """
+    (records, errors) for a kind's table: records are
+    (line, {field: cleaned value}) for the non-blank cells of each good
+    row; errors are (line, message) for every bad one.
+    """
+    kind = KINDS[name]
+    fields = {column: kind.model._meta.get_field(column) for column in kind.columns}
+
+    if not table:
+        return [], [(1, "The file is empty.")]
+
+    header = [(_cell(title) or "").lower().replace(" ", "_") for title in table[0]]
+    errors = []
+
+    unknown = [title for title in header if title and title not in fields]
+    if unknown:
+        errors.append((1, f"Unknown column(s) {', '.join(unknown)}; expected {', '.join(kind.columns)}."))
+
+    missing = [column for column in kind.required if column not in header]
+    if missing:
+        errors.append((1, f"Missing column(s) {', '.join(missing)}."))
+
+    if errors:
+        return [], errors
+
+    records = []
+    first_seen = {}
+
+    for line, row in enumerate(table[1:], start=2):
+        cells = {column: _cell(value) for column, value in zip(header, row) if column}
+        if not any(cells.values()):
+            continue
+
+        values = {}
+        problems = []
+
+        for column, text in cells.items():
+            if text is None:
+                if column in kind.required:
+                    problems.append(f"{column} is required")
+                continue
+
+            field = fields[column]
+            if field.choices:
+                text = _choice(field, text)
+
+            try:
+                values[column] = field.clean(text, None)
+            except ValidationError as error:
+                problems.append(f"{column}: {' '.join(message.rstrip('.') for message in error.messages)}")
+
+        if not problems:
+            key = _key(kind, values)
+            if key in first_seen:
+                problems.append(f"same {' + '.join(kind.key)} as line {first_seen[key]}")
+            else:
+                first_seen[key] = line
+
+        if problems:
+            errors.append((line, "; ".join(problems)))
+        else:
+            records.append((line, values))
+
+    return records, errors
+
+
+# =====================================================
+# UPSERT
+# =====================================================
+
+def import_masters(name, table, dry_run=False):
+    """
+    Validate and apply one table. Returns counts of created, updated
+    and unchanged records; raises ImportFailed listing every bad row.
+    """
+    kind = KINDS[name]
+    records, errors = validate(name, table)
+    if errors:
+        raise ImportFailed(errors)
+
+    with db_transaction.atomic():
+
+        existing = {}
+        ambiguous = set()
+        for obj in kind.model.objects.filter(name__in={values["name"] for _, values in records}):
+            key = tuple(getattr(obj, column) for column in kind.key)
+            if key in existing:
+                ambiguous.add(key)
+            existing[key] = obj
+
+        openings_locked = kind.balance is not None and FiscalYear.objects.filter(is_closed=True).exists()
+
+        posted = set()
+        if kind.model is Inventory and existing:
+            posted = set(
+                SalePurchase.objects.filter(inventory__in=list(existing.values()))
+                .values_list("inventory_id", flat=True).distinct()
+            )
+
+        creates = []
+        updates = []
+        changed_fields = set()
+        stock_kept = 0
+
+        for line, values in records:
+            key = _key(kind, values)
+
+            if key in ambiguous:
+                errors.append((line, f"several existing records share this {' + '.join(kind.key)}"))
+                continue
+
+            obj = existing.get(key)
+            if obj is None:
+                obj = kind.model(**values)
+                if kind.balance:
+                    setattr(obj, kind.balance, obj.opening_balance)
+                creates.append(obj)
+                continue
+
+            changes = {column: value for column, value in values.items() if getattr(obj, column) != value}
+
+            if "opening_balance" in changes:
+                if openings_locked:
+                    errors.append((line, "opening_balance is carried forward by the fiscal-year close and cannot change"))
+                    continue
+                # Shift, not overwrite: postings since then stay counted
+                changes[kind.balance] = F(kind.balance) + (changes["opening_balance"] - obj.opening_balance)
+
+            if "quantity" in changes and obj.pk in posted:
+                del changes["quantity"]
+                stock_kept += 1
+
+            if changes:
+                for column, value in changes.items():
+                    setattr(obj, column, value)
+                updates.append(obj)
+                changed_fields.update(changes)
+
+        if errors:
+            raise ImportFailed(errors)
+
+        if not dry_run:
+            kind.model.objects.bulk_create(creates, batch_size=BATCH_SIZE)
+            if updates:
+                kind.model.objects.bulk_update(updates, sorted(changed_fields), batch_size=BATCH_SIZE)
+
+            # bulk writes skip the signals that keep the search index
+            # and the cash-flow cache
+            if kind.model in (Party, Inventory):
+                search.index_many(kind.model, creates + updates)
+            if kind.model is Inventory:
+                stock.evaluate([obj.pk for obj in creates + updates])
+
+    return {
+        "created": len(creates),
+        "updated": len(updates),
+        "unchanged": len(records) - len(creates) - len(updates),
+        "stock_kept": stock_kept,
+    }
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_remove_inventory_sku_party_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='party',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='party',
+            name='phone',
+            field=models.CharField(blank=True, db_index=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='cashbanktransaction',
+            index=models.Index(fields=['transaction_type', 'date'], name='accounting__transac_16461d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepurchase',
+            index=models.Index(fields=['purpose', 'date'], name='accounting__purpose_c84016_idx'),
+        ),
+    ]
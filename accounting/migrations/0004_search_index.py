@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:55
+
+from django.db import migrations
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS accounting_party_search "
+            "USING fts5(name, phone, tokenize='trigram')"
+        )
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS accounting_inventory_search "
+            "USING fts5(name, tokenize='trigram')"
+        )
+        cursor.execute(
+            "INSERT INTO accounting_party_search (rowid, name, phone) "
+            "SELECT id, name, phone FROM accounting_party"
+        )
+        cursor.execute(
+            "INSERT INTO accounting_inventory_search (rowid, name) "
+            "SELECT id, name FROM accounting_inventory"
+        )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS accounting_party_search")
+        cursor.execute("DROP TABLE IF EXISTS accounting_inventory_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_admin_search_and_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashbanktransaction',
+            index=models.Index(fields=['party', 'date'], name='accounting__party_i_e96dd8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashbanktransaction',
+            index=models.Index(fields=['account', 'date'], name='accounting__account_578d97_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepurchase',
+            index=models.Index(fields=['party', 'date'], name='accounting__party_i_6ede72_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepurchase',
+            index=models.Index(fields=['account', 'date'], name='accounting__account_53b9b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepurchase',
+            index=models.Index(fields=['inventory', 'date'], name='accounting__invento_0e8ef2_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_ledger_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase')], max_length=10)),
+                ('payment_mode', models.CharField(choices=[('cash', 'Cash'), ('credit', 'Credit')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12)),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(blank=True, help_text='Required only for cash transactions', null=True, on_delete=django.db.models.deletion.PROTECT, to='accounting.account')),
+                ('party', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounting.party')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='salepurchase',
+            name='invoice',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lines', to='accounting.invoice'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['party', 'date'], name='accounting__party_i_7d308c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['account', 'date'], name='accounting__account_ee03c7_idx'),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0007_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FiscalYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g. 2025-26', max_length=20, unique=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('is_closed', models.BooleanField(default=False, editable=False)),
+                ('closed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedInvoice',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase')], max_length=10)),
+                ('payment_mode', models.CharField(choices=[('cash', 'Cash'), ('credit', 'Credit')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateTimeField()),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account')),
+                ('party', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.party')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounting.fiscalyear')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedCashBankTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_type', models.CharField(choices=[('receive', 'Receive'), ('pay', 'Pay')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateTimeField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account')),
+                ('party', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.party')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounting.fiscalyear')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='YearBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('opening', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('closing', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='accounting.fiscalyear')),
+                ('inventory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.inventory')),
+                ('party', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.party')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSalePurchase',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase')], max_length=10)),
+                ('payment_mode', models.CharField(choices=[('cash', 'Cash'), ('credit', 'Credit')], max_length=10)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_per_unit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateTimeField()),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account')),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.inventory')),
+                ('invoice', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lines', to='accounting.archivedinvoice')),
+                ('party', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.party')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounting.fiscalyear')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fiscal_year', 'party', 'date'], name='accounting__fiscal__48ccc1_idx'), models.Index(fields=['fiscal_year', 'account', 'date'], name='accounting__fiscal__0d345a_idx'), models.Index(fields=['fiscal_year', 'inventory', 'date'], name='accounting__fiscal__ddb1a4_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedinvoice',
+            index=models.Index(fields=['fiscal_year', 'party', 'date'], name='accounting__fiscal__1be752_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedinvoice',
+            index=models.Index(fields=['fiscal_year', 'account', 'date'], name='accounting__fiscal__3e2995_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcashbanktransaction',
+            index=models.Index(fields=['fiscal_year', 'party', 'date'], name='accounting__fiscal__a209a7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcashbanktransaction',
+            index=models.Index(fields=['fiscal_year', 'account', 'date'], name='accounting__fiscal__a4c247_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='yearbalance',
+            index=models.Index(fields=['fiscal_year', 'party'], name='accounting__fiscal__3a1ca6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='yearbalance',
+            index=models.Index(fields=['fiscal_year', 'account'], name='accounting__fiscal__ec0b48_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='yearbalance',
+            index=models.Index(fields=['fiscal_year', 'inventory'], name='accounting__fiscal__928ab1_idx'),
+        ),
+    ]
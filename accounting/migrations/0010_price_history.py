@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:02
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase')], max_length=10)),
+                ('rates', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounting.inventory')),
+                ('party', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounting.party')),
+            ],
+            options={
+                'verbose_name_plural': 'Price histories',
+                'constraints': [models.UniqueConstraint(fields=('inventory', 'party', 'purpose'), name='unique_price_history_per_party'), models.UniqueConstraint(condition=models.Q(('party__isnull', True)), fields=('inventory', 'purpose'), name='unique_price_history_per_product')],
+            },
+        ),
+    ]
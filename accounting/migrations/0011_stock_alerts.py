@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0010_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='min_cover_days',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Alert when stock lasts fewer days than this at the recent sales rate (0: off).'),
+        ),
+        migrations.AddField(
+            model_name='inventory',
+            name='reorder_level',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Alert when stock falls to this quantity or below (0: off).', max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('daily_usage', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('days_of_cover', models.DecimalField(blank=True, decimal_places=1, max_digits=10, null=True)),
+                ('below_reorder_level', models.BooleanField(default=False)),
+                ('below_cover', models.BooleanField(default=False)),
+                ('since', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('inventory', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alert', to='accounting.inventory')),
+            ],
+            options={
+                'ordering': ['days_of_cover', 'quantity'],
+                'indexes': [models.Index(fields=['days_of_cover', 'quantity'], name='accounting__days_of_ebb0e2_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sold', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounting.inventory')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('inventory', 'day'), name='unique_stock_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_price_history(apps, schema_editor):
+    # Filled here rather than in 0010: the rebuild skips voided rows
+    from accounting import pricing
+
+    pricing.rebuild(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0011_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcashbanktransaction',
+            name='reversal_of',
+            field=models.OneToOneField(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reversal', to='accounting.archivedcashbanktransaction'),
+        ),
+        migrations.AddField(
+            model_name='archivedinvoice',
+            name='reversal_of',
+            field=models.OneToOneField(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reversal', to='accounting.archivedinvoice'),
+        ),
+        migrations.AddField(
+            model_name='archivedsalepurchase',
+            name='reversal_of',
+            field=models.OneToOneField(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reversal', to='accounting.archivedsalepurchase'),
+        ),
+        migrations.AddField(
+            model_name='cashbanktransaction',
+            name='reversal_of',
+            field=models.OneToOneField(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reversal', to='accounting.cashbanktransaction'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='reversal_of',
+            field=models.OneToOneField(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reversal', to='accounting.invoice'),
+        ),
+        migrations.AddField(
+            model_name='salepurchase',
+            name='reversal_of',
+            field=models.OneToOneField(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reversal', to='accounting.salepurchase'),
+        ),
+        migrations.RunPython(fill_price_history, migrations.RunPython.noop),
+    ]
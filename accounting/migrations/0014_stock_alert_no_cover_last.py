@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:44
+
+from django.db import migrations, models
+
+
+def fill_stock_alerts(apps, schema_editor):
+    # Filled here rather than in 0011: the rebuild reads reversal_of
+    from accounting import stock
+
+    stock.rebuild(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0013_request_profiles'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='stockalert',
+            options={'ordering': [models.OrderBy(models.ExpressionWrapper(models.Q(('days_of_cover__isnull', True)), output_field=models.BooleanField())), 'days_of_cover', 'quantity']},
+        ),
+        migrations.RemoveIndex(
+            model_name='stockalert',
+            name='accounting__days_of_ebb0e2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(models.ExpressionWrapper(models.Q(('days_of_cover__isnull', True)), output_field=models.BooleanField()), models.F('days_of_cover'), models.F('quantity'), name='stock_alert_urgency'),
+        ),
+        migrations.RunPython(fill_stock_alerts, migrations.RunPython.noop),
+    ]
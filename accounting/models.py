@@ -5,6 +5,9 @@ from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.db import transaction as db_transaction
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
 
 # =====================================================
@@ -74,9 +77,9 @@ class Party(models.Model):
         ('supplier', 'Supplier'),
     )
 
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, db_index=True)
     party_type = models.CharField(max_length=20, choices=PARTY_TYPES)
-    phone = models.CharField(max_length=20, blank=True)
+    phone = models.CharField(max_length=20, blank=True, db_index=True)
 
     # Opening balance at time of creation
     opening_balance = models.DecimalField(
@@ -143,6 +146,19 @@ class Inventory(models.Model):
         default=0
     )
 
+    # Low-stock alerts (accounting.stock); 0 switches a check off
+    reorder_level = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Alert when stock falls to this quantity or below (0: off)."
+    )
+
+    min_cover_days = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Alert when stock lasts fewer days than this at the recent sales rate (0: off)."
+    )
+
     def __str__(self):
         return f"{self.name} ({self.quantity} {self.unit})"
 
@@ -199,8 +215,41 @@ class SalePurchase(models.Model):
         editable=False
     )
 
+    # Set when the row is a line of a multi-line invoice
+    invoice = models.ForeignKey(
+        'Invoice',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='lines'
+    )
+
+    # Set on the compensating entry posted by accounting.voiding; the
+    # voided row stays. No FK constraint: the original may already be
+    # archived by a year close while its reversal is still live.
+    reversal_of = models.OneToOneField(
+        'self',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='reversal'
+    )
+
     date = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Proxy admins filter on purpose and sort / drill down by date
+            models.Index(fields=['purpose', 'date']),
+            # Ledgers read one party / account / product in date order
+            models.Index(fields=['party', 'date']),
+            models.Index(fields=['account', 'date']),
+            models.Index(fields=['inventory', 'date']),
+        ]
+
     # -------------------------------------------------
 
     def clean(self):
@@ -222,6 +271,8 @@ class SalePurchase(models.Model):
             if self.pk:
                 raise ValidationError("Editing not allowed.")
 
+            FiscalYear.check_open(self.date)
+
             self.amount = self.quantity * self.price_per_unit
 
             # ================= SALE =================
@@ -261,6 +312,10 @@ class SalePurchase(models.Model):
 
             super().save(*args, **kwargs)
 
+            from . import pricing, stock
+            pricing.record([self])
+            stock.record([self])
+
     def __str__(self):
         return f"{self.purpose.upper()} - {self.party.name} - {self.amount}"
 
@@ -281,6 +336,189 @@ class Purchase(SalePurchase):
         proxy = True
         verbose_name = "Purchase"
         verbose_name_plural = "Purchases"
+
+
+# =====================================================
+# INVOICE MODEL (Multi-line Sale / Purchase)
+# =====================================================
+
+class Invoice(models.Model):
+    """
+    Header of a multi-line sale / purchase. Its lines are ordinary
+    SalePurchase rows pointing back here, so stock and account
+    ledgers keep working per line.
+    """
+
+    purpose = models.CharField(max_length=10, choices=SalePurchase.PURPOSE)
+    payment_mode = models.CharField(max_length=10, choices=SalePurchase.PAYMENT_MODE)
+
+    party = models.ForeignKey(Party, on_delete=models.PROTECT)
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        help_text="Required only for cash transactions"
+    )
+
+    amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+
+    # Set on the compensating entry posted by accounting.voiding; the
+    # voided invoice stays. No FK constraint: the original may already be
+    # archived by a year close while its reversal is still live.
+    reversal_of = models.OneToOneField(
+        'self',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='reversal'
+    )
+
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['party', 'date']),
+            models.Index(fields=['account', 'date']),
+        ]
+
+    # -------------------------------------------------
+
+    def clean(self):
+
+        if self.payment_mode == 'cash' and not self.account_id:
+            raise ValidationError("Cash transaction requires account.")
+
+        if self.payment_mode == 'credit' and self.account_id:
+            raise ValidationError("Credit transaction should not have account.")
+
+        # Also run by the admin form, where a field may already have failed
+        if self.date:
+            FiscalYear.check_open(self.date)
+
+        if self.party_id:
+
+            if self.purpose == "sale" and self.party.party_type != "customer":
+                raise ValidationError("Sale must be to customer.")
+
+            if self.purpose == "purchase" and self.party.party_type != "supplier":
+                raise ValidationError("Purchase must be from supplier.")
+
+    def check_stock(self, needed, stock):
+        """
+        Reject a sale of more than is on hand. ``needed`` maps inventory
+        ids to the quantity the lines take, ``stock`` maps them to the
+        Inventory rows.
+        """
+        if len(stock) != len(needed):
+            raise ValidationError("Unknown inventory item.")
+
+        if self.purpose != "sale":
+            return
+
+        for inventory_id, quantity in needed.items():
+            item = stock[inventory_id]
+            if item.quantity < quantity:
+                raise ValidationError(f"Not enough stock for {item.name}.")
+
+    # -------------------------------------------------
+
+    def post(self, lines):
+        """
+        Save the invoice and all its lines in one transaction.
+
+        ``lines`` are unsaved SalePurchase objects carrying inventory,
+        quantity and price_per_unit. Each touched Inventory row is
+        locked and updated once, the party / account balance gets one
+        net change and the lines are inserted in one batch.
+        """
+
+        with db_transaction.atomic():
+
+            if self.pk:
+                raise ValidationError("Editing not allowed.")
+
+            if not lines:
+                raise ValidationError("Invoice needs at least one line.")
+
+            # Closed year and party type are checked in clean()
+            self.full_clean()
+
+            # ---------- lines ----------
+            needed = {}
+            total = Decimal("0")
+
+            for line in lines:
+                line.purpose = self.purpose
+                line.payment_mode = self.payment_mode
+                line.party = self.party
+                line.account = self.account
+                line.date = self.date
+
+                # Header already validated party / account: no per-line FK lookups
+                line.clean_fields(exclude=["party", "inventory", "account", "invoice", "amount"])
+
+                line.amount = (line.quantity * line.price_per_unit).quantize(Decimal("0.01"))
+                total += line.amount
+
+                needed[line.inventory_id] = needed.get(line.inventory_id, Decimal("0")) + line.quantity
+
+            # ---------- stock (one locked read, one batched write) ----------
+            stock = Inventory.objects.select_for_update().in_bulk(list(needed))
+            self.check_stock(needed, stock)
+
+            for inventory_id, quantity in needed.items():
+                item = stock[inventory_id]
+
+                if self.purpose == "sale":
+                    item.quantity -= quantity
+                else:
+                    item.quantity += quantity
+
+            Inventory.objects.bulk_update(stock.values(), ["quantity"])
+
+            # ---------- one net balance change ----------
+            sign = 1 if self.purpose == "sale" else -1
+
+            if self.payment_mode == "cash":
+                self.account.balance += sign * total
+                self.account.save(update_fields=["balance"])
+            else:
+                self.party.credit_balance += sign * total
+                self.party.save(update_fields=["credit_balance"])
+
+            # ---------- header + lines ----------
+            self.amount = total
+            super().save()
+
+            for line in lines:
+                line.invoice = self
+
+            SalePurchase.objects.bulk_create(lines)
+
+            from . import pricing, stock
+            pricing.record(lines)
+            stock.record(lines)
+
+        return self
+
+    def save(self, *args, **kwargs):
+
+        if self.pk:
+            raise ValidationError("Editing not allowed.")
+
+        raise ValidationError("Use Invoice.post(lines) to create an invoice.")
+
+    def __str__(self):
+        return f"INVOICE #{self.pk} {self.purpose.upper()} - {self.party.name} - {self.amount}"
 # =====================================================
 # CASH / BANK TRANSACTION MODEL (Main Table)
 # =====================================================
@@ -307,8 +545,30 @@ class CashBankTransaction(models.Model):
         validators=[MinValueValidator(0.01)]
     )
 
+    # Set on the compensating entry posted by accounting.voiding; the
+    # voided row stays. No FK constraint: the original may already be
+    # archived by a year close while its reversal is still live.
+    reversal_of = models.OneToOneField(
+        'self',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='reversal'
+    )
+
     date = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Proxy admins filter on transaction_type and sort by date
+            models.Index(fields=['transaction_type', 'date']),
+            # Ledgers read one party / account in date order
+            models.Index(fields=['party', 'date']),
+            models.Index(fields=['account', 'date']),
+        ]
+
     # --------------------------------------------
 
     def save(self, *args, **kwargs):
@@ -318,6 +578,8 @@ class CashBankTransaction(models.Model):
             if self.pk:
                 raise ValidationError("Editing not allowed.")
 
+            FiscalYear.check_open(self.date)
+
             # ===== RECEIVE MONEY =====
             if self.transaction_type == "receive":
 
@@ -359,4 +621,428 @@ class PayMoney(CashBankTransaction):
     class Meta:
         proxy = True
         verbose_name = "Pay Money"
-        verbose_name_plural = "Pay Money"    
\ No newline at end of file
+        verbose_name_plural = "Pay Money"    
+
+
+# =====================================================
+# IDEMPOTENCY KEYS (Safe API Retries)
+# =====================================================
+
+class IdempotencyKey(models.Model):
+    """
+    Response recorded for a client-supplied Idempotency-Key, so a
+    retried POST replays it instead of posting the transaction again.
+    Rows older than settings.IDEMPOTENCY_KEY_TTL are pruned.
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+
+    # Hash of user, path and body: the same key with a different
+    # request is rejected instead of replayed
+    fingerprint = models.CharField(max_length=64)
+
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
+
+
+# =====================================================
+# FISCAL YEARS (Period Lock + Year Close)
+# =====================================================
+
+class FiscalYear(models.Model):
+    """
+    An accounting year. Closing it (accounting.closing.close_year)
+    locks every date up to its end, records each party / account /
+    product's opening and closing figures in YearBalance, carries the
+    closing figures forward as opening balances and moves the year's
+    rows out of the live tables into the Archived* tables.
+    """
+
+    name = models.CharField(max_length=20, unique=True, help_text="e.g. 2025-26")
+
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    is_closed = models.BooleanField(default=False, editable=False)
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-start_date']
+
+    # -------------------------------------------------
+
+    def clean(self):
+
+        if self.start_date and self.end_date:
+
+            if self.end_date < self.start_date:
+                raise ValidationError("End date must be after start date.")
+
+            overlapping = FiscalYear.objects.filter(
+                start_date__lte=self.end_date,
+                end_date__gte=self.start_date,
+            ).exclude(pk=self.pk)
+
+            if overlapping.exists():
+                raise ValidationError("Fiscal years cannot overlap.")
+
+    @property
+    def cutoff(self):
+        """
+        First moment after the year: rows dated before it belong to
+        this year (or an earlier one).
+        """
+        moment = datetime.combine(self.end_date + timedelta(days=1), time.min)
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+    # -------------------------------------------------
+
+    @classmethod
+    def locked_until(cls):
+        last = cls.objects.filter(is_closed=True).order_by('-end_date').first()
+        return last.cutoff if last else None
+
+    @classmethod
+    def check_open(cls, when):
+        """
+        Reject postings dated inside a closed year.
+        """
+        cutoff = cls.locked_until()
+
+        if cutoff is not None and when < cutoff:
+            raise ValidationError("This date falls in a closed fiscal year.")
+
+    def opening_of(self, obj):
+        """
+        Opening figure of a Party, Account or Inventory item for this
+        (closed) year.
+        """
+        opening = (
+            YearBalance.objects
+            .filter(fiscal_year=self, **{obj._meta.model_name: obj})
+            .values_list('opening', flat=True)
+            .first()
+        )
+        return opening if opening is not None else Decimal("0")
+
+    def __str__(self):
+        return f"FY {self.name}" + (" (closed)" if self.is_closed else "")
+
+
+class YearBalance(models.Model):
+    """
+    Opening and closing figure of one party, account or product for a
+    closed year: balances for parties / accounts, stock quantity for
+    products. Exactly one of the three links is set.
+    """
+
+    fiscal_year = models.ForeignKey(FiscalYear, on_delete=models.CASCADE, related_name='balances')
+
+    party = models.ForeignKey(Party, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    inventory = models.ForeignKey(Inventory, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+
+    opening = models.DecimalField(max_digits=14, decimal_places=2)
+    closing = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fiscal_year', 'party']),
+            models.Index(fields=['fiscal_year', 'account']),
+            models.Index(fields=['fiscal_year', 'inventory']),
+        ]
+
+    def __str__(self):
+        return f"{self.fiscal_year.name}: {self.opening} → {self.closing}"
+
+
+# =====================================================
+# ARCHIVE TABLES (Rows of Closed Years)
+# =====================================================
+# Same columns (and ids) as the live tables plus the fiscal year.
+# Written only by closing.close_year; read by the ledgers on demand.
+
+class ArchivedInvoice(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    fiscal_year = models.ForeignKey(FiscalYear, on_delete=models.PROTECT)
+
+    purpose = models.CharField(max_length=10, choices=SalePurchase.PURPOSE)
+    payment_mode = models.CharField(max_length=10, choices=SalePurchase.PAYMENT_MODE)
+    party = models.ForeignKey(Party, on_delete=models.PROTECT, related_name='+')
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, null=True, related_name='+')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reversal_of = models.OneToOneField('self', on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='reversal')
+    date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fiscal_year', 'party', 'date']),
+            models.Index(fields=['fiscal_year', 'account', 'date']),
+        ]
+
+
+class ArchivedSalePurchase(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    fiscal_year = models.ForeignKey(FiscalYear, on_delete=models.PROTECT)
+
+    purpose = models.CharField(max_length=10, choices=SalePurchase.PURPOSE)
+    payment_mode = models.CharField(max_length=10, choices=SalePurchase.PAYMENT_MODE)
+    party = models.ForeignKey(Party, on_delete=models.PROTECT, related_name='+')
+    inventory = models.ForeignKey(Inventory, on_delete=models.PROTECT, related_name='+')
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, null=True, related_name='+')
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    invoice = models.ForeignKey(ArchivedInvoice, on_delete=models.PROTECT, null=True, related_name='lines')
+    reversal_of = models.OneToOneField('self', on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='reversal')
+    date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fiscal_year', 'party', 'date']),
+            models.Index(fields=['fiscal_year', 'account', 'date']),
+            models.Index(fields=['fiscal_year', 'inventory', 'date']),
+        ]
+
+
+class ArchivedCashBankTransaction(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    fiscal_year = models.ForeignKey(FiscalYear, on_delete=models.PROTECT)
+
+    transaction_type = models.CharField(max_length=10, choices=CashBankTransaction.TRANSACTION_TYPE)
+    party = models.ForeignKey(Party, on_delete=models.PROTECT, related_name='+')
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='+')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reversal_of = models.OneToOneField('self', on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='reversal')
+    date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fiscal_year', 'party', 'date']),
+            models.Index(fields=['fiscal_year', 'account', 'date']),
+        ]
+
+
+# =====================================================
+# PRICE HISTORY (Last Rates)
+# =====================================================
+
+class PriceHistory(models.Model):
+    """
+    Latest rates of a product for one purpose (sale / purchase): with
+    a party, the rates that party got; without, the rates anyone got.
+    ``rates`` holds the newest pricing.DEPTH postings, newest first.
+    Derived data, kept by accounting.pricing as rows post.
+    """
+
+    purpose = models.CharField(max_length=10, choices=SalePurchase.PURPOSE)
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='+')
+    party = models.ForeignKey(Party, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    rates = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        verbose_name_plural = "Price histories"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['inventory', 'party', 'purpose'],
+                name='unique_price_history_per_party',
+            ),
+            models.UniqueConstraint(
+                fields=['inventory', 'purpose'],
+                condition=models.Q(party__isnull=True),
+                name='unique_price_history_per_product',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.purpose} {self.inventory_id} / {self.party_id or 'all'}: {len(self.rates)} rates"
+
+
+# =====================================================
+# STOCK ALERTS (Reorder Levels)
+# =====================================================
+
+class StockDay(models.Model):
+    """
+    Quantity of one product sold on one day: the buckets the rolling
+    consumption rate is summed from (accounting.stock). Days older
+    than the window are pruned.
+    """
+
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    sold = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['inventory', 'day'], name='unique_stock_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_id} {self.day}: {self.sold}"
+
+
+NO_COVER = models.ExpressionWrapper(models.Q(days_of_cover__isnull=True), output_field=models.BooleanField())
+
+
+class StockAlert(models.Model):
+    """
+    A product at or below its reorder level, or with fewer days of
+    cover than its threshold. Only at-risk products have a row; rows
+    are added and removed as accounting.stock re-evaluates them.
+    """
+
+    inventory = models.OneToOneField(Inventory, on_delete=models.CASCADE, related_name='stock_alert')
+
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    daily_usage = models.DecimalField(max_digits=12, decimal_places=3)
+    # None when nothing sold recently
+    days_of_cover = models.DecimalField(max_digits=10, decimal_places=1, null=True, blank=True)
+
+    below_reorder_level = models.BooleanField(default=False)
+    below_cover = models.BooleanField(default=False)
+
+    since = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Most urgent first, alerts without a cover figure (nothing sold
+        # recently) after the rest. SQLite indexes cannot say NULLS
+        # LAST, so the "no cover" flag leads both ordering and index.
+        ordering = [NO_COVER.asc(), 'days_of_cover', 'quantity']
+        indexes = [
+            models.Index(NO_COVER, 'days_of_cover', 'quantity', name='stock_alert_urgency'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_id}: {self.quantity} left, {self.days_of_cover} days"
+
+
+# =====================================================
+# BACKGROUND JOBS
+# =====================================================
+
+class Job(models.Model):
+    """
+    One unit of background work (see accounting.jobs). Tasks receive
+    their Job and call ``set_progress`` / ``raise_if_cancelled`` as
+    they go; the return value is stored in ``result``.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    STATUS = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    )
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    status = models.CharField(max_length=10, choices=STATUS, default=QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    # host:pid of the process running it
+    worker = models.CharField(max_length=100, blank=True)
+
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The runner polls for the oldest queued job
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    # -------------------------------------------------
+
+    # Seconds between progress writes, so a tight loop does not hold
+    # the SQLite write lock
+    PROGRESS_INTERVAL = 1.0
+
+    def set_progress(self, done, total, message=""):
+        """
+        Record progress (done of total) and pick up cancellation.
+        """
+        now = timezone.now()
+        last = getattr(self, '_progress_written', None)
+
+        if last is not None and (now - last).total_seconds() < self.PROGRESS_INTERVAL and done < total:
+            return
+
+        self._progress_written = now
+        self.progress = min(100, int(done * 100 / total)) if total else 0
+        self.message = message[:255]
+
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, message=self.message)
+        self.raise_if_cancelled()
+
+    def raise_if_cancelled(self):
+        from .jobs import Cancelled
+
+        if Job.objects.filter(pk=self.pk, cancel_requested=True).exists():
+            raise Cancelled()
+
+    def cancel(self):
+        """
+        Queued jobs are cancelled at once; running ones stop at their
+        next progress report.
+        """
+        if Job.objects.filter(pk=self.pk, status=Job.QUEUED).update(
+            status=Job.CANCELLED, cancel_requested=True, finished_at=timezone.now()
+        ):
+            return
+        Job.objects.filter(pk=self.pk, status=Job.RUNNING).update(cancel_requested=True)
+
+    @property
+    def finished(self):
+        return self.status in (Job.SUCCEEDED, Job.FAILED, Job.CANCELLED)
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.status})"
+
+
+# =====================================================
+# REQUEST PROFILES
+# =====================================================
+
+class RequestProfile(models.Model):
+    """
+    No table: profiles are files (accounting.profiling). The model
+    only gives them a place and permissions in the admin.
+    """
+
+    class Meta:
+        managed = False
+        verbose_name = "request profile"
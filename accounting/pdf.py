@@ -0,0 +1,52 @@
+# accounting/pdf.py
+
+"""
+PDF statements.
+
+reportlab takes longer to import than the rest of the app together
+(its paragraph and font machinery), and only a PDF download needs it.
+It is imported here, on the first PDF, instead of at module load, so
+worker start-up and every ``manage.py`` command skip it. Callers use
+the functions below and never import reportlab themselves.
+"""
+
+import io
+from html import escape
+
+
+def _reportlab():
+    # Imported on first use; later calls hit the sys.modules cache
+    from reportlab import platypus
+    from reportlab.lib import colors, pagesizes, styles
+
+    return platypus, colors, pagesizes, styles
+
+
+def table_pdf(title, lines, headers, rows, right=()):
+    """
+    A landscape A4 document: ``title``, one paragraph per item of
+    ``lines``, then a table of ``rows`` (lists of text) under
+    ``headers``, repeated on every page, with the columns numbered in
+    ``right`` right-aligned. Returns the PDF bytes.
+    """
+    platypus, colors, pagesizes, styles = _reportlab()
+
+    sheet = styles.getSampleStyleSheet()
+    buffer = io.BytesIO()
+
+    document = platypus.SimpleDocTemplate(buffer, pagesize=pagesizes.landscape(pagesizes.A4), title=title)
+
+    table = platypus.Table([list(headers)] + [list(row) for row in rows], repeatRows=1)
+    table.setStyle(platypus.TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ] + [("ALIGN", (column, 1), (column, -1), "RIGHT") for column in right]))
+
+    # Paragraphs read markup: names like "A & B" must be escaped
+    document.build(
+        [platypus.Paragraph(escape(title, quote=False), sheet["Title"])]
+        + [platypus.Paragraph(escape(line, quote=False), sheet["Normal"]) for line in lines]
+        + [platypus.Spacer(1, 12), table]
+    )
+    return buffer.getvalue()
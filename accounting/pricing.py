@@ -0,0 +1,203 @@
+# accounting/pricing.py
+
+"""
+Last-rate lookup for billing.
+
+PriceHistory holds, per purpose (sale / purchase) and product, the
+newest DEPTH rates each party got and the newest DEPTH rates overall,
+as small JSON lists. record() merges posted lines into those rows in
+the posting's own transaction (one read and one write per touched
+row), so the sale / purchase forms and /api/rates/ find a party's last
+rate with one indexed point read instead of a ledger scan.
+
+Voided postings are dropped from their rows by forget() (leaving
+fewer than DEPTH rates until the next posting or rebuild); reversal
+entries are never rates. Rows inserted with bulk_create and restored
+books are not seen by record(): ``manage.py rebuild_price_history``
+(or rebuild()) recomputes every row from the live and archived
+postings.
+"""
+
+from collections import deque
+from datetime import timezone as dt_timezone
+
+from django.db import router, transaction as db_transaction
+from django.db.models import Q
+
+from .models import SalePurchase, ArchivedSalePurchase, PriceHistory
+
+
+# Rates kept per party and per product
+DEPTH = 5
+
+# Rows per bulk_create on rebuild
+BATCH_SIZE = 1000
+
+
+def _entry(pk, date, price, quantity, party_id, party_name):
+    return {
+        "id": pk,
+        # Fixed-width UTC timestamps sort as text
+        "date": date.astimezone(dt_timezone.utc).isoformat(timespec="microseconds"),
+        "price": f"{price:.2f}",
+        "quantity": f"{quantity:.2f}",
+        "party": party_id,
+        "party_name": party_name,
+    }
+
+
+def _newest(entries):
+    return sorted(entries, key=lambda entry: (entry["date"], entry["id"]), reverse=True)[:DEPTH]
+
+
+# =====================================================
+# MAINTENANCE
+# =====================================================
+
+def record(lines):
+    """
+    Merge saved SalePurchase rows into their party and product
+    histories. Called from SalePurchase.save() and Invoice.post().
+    """
+    fresh = {}
+
+    for line in lines:
+        entry = _entry(line.pk, line.date, line.price_per_unit, line.quantity, line.party_id, line.party.name)
+        for party_id in (line.party_id, None):
+            fresh.setdefault((line.purpose, line.inventory_id, party_id), []).append(entry)
+
+    keys = Q()
+    for purpose, inventory_id, party_id in fresh:
+        keys |= Q(purpose=purpose, inventory_id=inventory_id, party_id=party_id)
+
+    existing = {
+        (history.purpose, history.inventory_id, history.party_id): history
+        for history in PriceHistory.objects.select_for_update().filter(keys)
+    }
+
+    creates = []
+    updates = []
+
+    for (purpose, inventory_id, party_id), entries in fresh.items():
+        history = existing.get((purpose, inventory_id, party_id))
+
+        if history is None:
+            creates.append(PriceHistory(
+                purpose=purpose, inventory_id=inventory_id, party_id=party_id, rates=_newest(entries),
+            ))
+        else:
+            history.rates = _newest(history.rates + entries)
+            updates.append(history)
+
+    PriceHistory.objects.bulk_create(creates)
+    if updates:
+        PriceHistory.objects.bulk_update(updates, ["rates"])
+
+
+def forget(lines):
+    """
+    Remove voided SalePurchase rows from their histories.
+    """
+    voided = {line.pk for line in lines}
+    keys = {
+        (line.purpose, line.inventory_id, party_id)
+        for line in lines
+        for party_id in (line.party_id, None)
+    }
+
+    histories = []
+    keys = sorted(keys, key=str)
+    for start in range(0, len(keys), BATCH_SIZE):
+        query = Q()
+        for purpose, inventory_id, party_id in keys[start:start + BATCH_SIZE]:
+            query |= Q(purpose=purpose, inventory_id=inventory_id, party_id=party_id)
+
+        for history in PriceHistory.objects.select_for_update().filter(query):
+            history.rates = [rate for rate in history.rates if rate["id"] not in voided]
+            histories.append(history)
+
+    PriceHistory.objects.bulk_update(histories, ["rates"], batch_size=BATCH_SIZE)
+
+
+def rebuild(using=None):
+    """
+    Recompute every history from the postings (archived years first,
+    then the live table, each in date order), leaving out voided rows
+    and their reversals. Returns the row count.
+    """
+    using = using or router.db_for_write(PriceHistory)
+    histories = {}
+
+    # A sale voided after its year ended is archived while its reversal
+    # is still live: the reverse relation only sees the same table
+    voided_live = SalePurchase.objects.using(using).filter(reversal_of__isnull=False).values("reversal_of_id")
+
+    for model in (ArchivedSalePurchase, SalePurchase):
+        rows = model.objects.using(using).filter(reversal_of__isnull=True, reversal__isnull=True)
+        if model is ArchivedSalePurchase:
+            rows = rows.exclude(pk__in=voided_live)
+
+        rows = (
+            rows
+            .order_by("date", "id")
+            .values_list("id", "purpose", "inventory_id", "party_id", "party__name",
+                         "date", "price_per_unit", "quantity")
+        )
+
+        for pk, purpose, inventory_id, party_id, party_name, date, price, quantity in rows.iterator(chunk_size=2000):
+            entry = _entry(pk, date, price, quantity, party_id, party_name)
+            for key in ((purpose, inventory_id, party_id), (purpose, inventory_id, None)):
+                if key not in histories:
+                    histories[key] = deque(maxlen=DEPTH)
+                histories[key].append(entry)
+
+    with db_transaction.atomic(using=using):
+        PriceHistory.objects.using(using).all().delete()
+        PriceHistory.objects.using(using).bulk_create(
+            [
+                PriceHistory(purpose=purpose, inventory_id=inventory_id, party_id=party_id, rates=list(reversed(entries)))
+                for (purpose, inventory_id, party_id), entries in histories.items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    return len(histories)
+
+
+# =====================================================
+# LOOKUP
+# =====================================================
+
+def last_rates(inventory, party=None, purpose="sale"):
+    """
+    Newest rates of ``inventory`` for ``purpose``: the ones ``party``
+    got (when given), the ones anyone got, and the suggested price for
+    a new line (party's last, else anyone's last, else default_price).
+    """
+    if purpose not in dict(SalePurchase.PURPOSE):
+        raise ValueError("purpose must be sale or purchase.")
+
+    found = dict(
+        PriceHistory.objects
+        .filter(purpose=purpose, inventory=inventory)
+        .filter(Q(party=party) | Q(party__isnull=True) if party is not None else Q(party__isnull=True))
+        .values_list("party_id", "rates")
+    )
+
+    party_rates = found.get(party.pk, []) if party is not None else []
+    overall = found.get(None, [])
+
+    if party_rates or overall:
+        suggested = (party_rates or overall)[0]["price"]
+    else:
+        suggested = f"{inventory.default_price:.2f}"
+
+    return {
+        "inventory": inventory.pk,
+        "party": party.pk if party is not None else None,
+        "purpose": purpose,
+        "default_price": f"{inventory.default_price:.2f}",
+        "suggested": suggested,
+        "party_rates": party_rates,
+        "rates": overall,
+    }
@@ -0,0 +1,383 @@
+# accounting/profiling.py
+
+"""
+Opt-in profiles of slow requests.
+
+ProfilingMiddleware profiles requests whose path matches one of
+settings.PROFILE_PATHS (regular expressions, searched in the path) and
+keeps a profile only when the request took longer than
+settings.PROFILE_SLOWER_THAN_MS. Either setting alone switches it on:
+paths without a threshold keep every matching request, a threshold
+without paths watches every request. With neither set the middleware
+removes itself at startup and costs nothing.
+
+Two modes (settings.PROFILE_MODE):
+
+    sample     one background thread reads the request thread's stack
+               every PROFILE_SAMPLE_INTERVAL_MS (sys._current_frames);
+               the request itself runs untouched, so the overhead is
+               small enough to leave on in production
+    cprofile   cProfile on the request thread: exact call counts and
+               times, but requests run noticeably slower
+
+A kept profile is one JSON file in a directory per company under
+settings.PROFILE_DIR, with the request, its duration, a top-functions
+table and (sample mode) the stacks in the folded format flamegraph.pl,
+speedscope and inferno read. Only the newest PROFILE_KEEP files of each
+company are kept. Staff browse their own company's profiles under
+Accounting > Request profiles in the admin.
+
+The middleware is async-capable, so under ASGI the async ledger views
+keep running on the event loop. A request served there is always
+sampled (cProfile hooks the whole thread and cannot tell concurrent
+requests apart): the samples show its async code, along with anything
+else the loop runs meanwhile. Under WSGI, or for the part of a sync
+view running in a worker thread, the sampler sees the thread serving
+the request: the ORM, the ledger loops and template rendering.
+"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+
+from . import tenancy
+
+
+logger = logging.getLogger(__name__)
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+
+# Rows in the top-functions table
+TOP_FUNCTIONS = 40
+
+# Deepest stack recorded per sample
+MAX_DEPTH = 200
+
+_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+
+# Frame labels per code object: the sampler builds many stacks a second
+_labels = {}
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        for root in sorted(sys.path, key=len, reverse=True):
+            if root and path.startswith(root + os.sep):
+                path = path[len(root) + 1:]
+                break
+        label = _labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        stack.append(_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+# =====================================================
+# SAMPLER
+# =====================================================
+
+class Sampler:
+    """
+    One daemon thread sampling the threads of the requests being
+    profiled; it runs only while there are some. Requests are tracked
+    by a key of their own: concurrent async requests share a thread.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = {}
+        self.keys = itertools.count()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            key = next(self.keys)
+            self.active[key] = (thread_id, Counter())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="request-sampler", daemon=True)
+                self.thread.start()
+            return key
+
+    def stop(self, key):
+        with self.lock:
+            return self.active.pop(key)[1]
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+
+                frames = sys._current_frames()
+                for thread_id, stacks in self.active.values():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_stack(frame)] += 1
+
+
+def sampled_top(stacks, interval_ms, limit=TOP_FUNCTIONS):
+    """
+    Top functions by time on the stack, from sampled stacks.
+    """
+    own = Counter()
+    total = Counter()
+
+    for stack, count in stacks.items():
+        if stack:
+            own[stack[-1]] += count
+        for label in set(stack):
+            total[label] += count
+
+    # Ties (callers of one callee) list the one doing the work first
+    labels = sorted(total, key=lambda label: (total[label], own[label]), reverse=True)[:limit]
+
+    return [
+        {"function": label, "calls": None, "self_ms": own[label] * interval_ms, "total_ms": total[label] * interval_ms}
+        for label in labels
+    ]
+
+
+def cprofile_top(profile, limit=TOP_FUNCTIONS):
+    """
+    Top functions by cumulative time, from a cProfile run.
+    """
+    import pstats
+
+    rows = []
+    for (filename, line, name), (_, calls, own, total, _) in pstats.Stats(profile).stats.items():
+        rows.append({
+            "function": f"{name} ({filename}:{line})",
+            "calls": calls,
+            "self_ms": round(own * 1000, 3),
+            "total_ms": round(total * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows[:limit]
+
+
+# =====================================================
+# STORE
+# =====================================================
+
+def directory(tenant=None):
+    """
+    Profiles of one company (the active one by default): companies
+    never see each other's requests.
+    """
+    return os.path.join(str(settings.PROFILE_DIR), tenant or tenancy.current())
+
+
+def save(profile, keep=None):
+    """
+    Write a profile in its tenant's directory and drop the oldest
+    beyond PROFILE_KEEP there. Returns its id.
+    """
+    keep = keep or settings.PROFILE_KEEP
+    folder = directory(profile["tenant"])
+    os.makedirs(folder, exist_ok=True)
+
+    started = datetime.fromtimestamp(profile["started_at"], dt_timezone.utc)
+    profile["id"] = f"{started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(folder, f"{profile['id']}.json")
+
+    # Written aside and renamed: readers never see half a file
+    with open(path + ".tmp", "w") as handle:
+        json.dump(profile, handle)
+    os.replace(path + ".tmp", path)
+
+    names = sorted(name for name in os.listdir(folder) if name.endswith(".json"))
+    for name in names[:-keep]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+
+    return profile["id"]
+
+
+def load(profile_id):
+    """
+    A stored profile of the active company, or None.
+    """
+    if not _ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory(), f"{profile_id}.json")) as handle:
+            profile = json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+    profile["started"] = datetime.fromtimestamp(profile["started_at"], dt_timezone.utc)
+    return profile
+
+
+def stored():
+    """
+    Summaries of the active company's stored profiles, newest first.
+    """
+    if not os.path.isdir(directory()):
+        return []
+
+    summaries = []
+    for name in sorted(os.listdir(directory()), reverse=True):
+        if name.endswith(".json"):
+            profile = load(name[:-len(".json")])
+            if profile is not None:
+                profile.pop("stacks", None)
+                profile.pop("top", None)
+                summaries.append(profile)
+    return summaries
+
+
+def folded(profile):
+    """
+    Sampled stacks as folded text ("frame;frame;frame count" per line),
+    the input of flamegraph tools.
+    """
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in profile.get("stacks", []))
+
+
+# =====================================================
+# MIDDLEWARE
+# =====================================================
+
+class ProfilingMiddleware:
+    """
+    Goes first in MIDDLEWARE, so the other middleware's time is
+    profiled too. Removed at startup unless PROFILE_PATHS or
+    PROFILE_SLOWER_THAN_MS is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        paths = settings.PROFILE_PATHS
+        threshold = settings.PROFILE_SLOWER_THAN_MS
+
+        if not paths and threshold is None:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        self.paths = [re.compile(pattern) for pattern in paths] or [re.compile("")]
+        self.threshold = (threshold or 0) / 1000
+        self.mode = settings.PROFILE_MODE
+        if self.mode not in (SAMPLE, CPROFILE):
+            raise ImproperlyConfigured(f"PROFILE_MODE must be {SAMPLE!r} or {CPROFILE!r}.")
+
+        # Also serves the async requests in cprofile mode
+        self.interval_ms = settings.PROFILE_SAMPLE_INTERVAL_MS
+        self.sampler = Sampler(self.interval_ms / 1000)
+
+        if self.mode == CPROFILE:
+            # Imported only in this mode, like pstats in cprofile_top()
+            import cProfile
+            self.profiler = cProfile.Profile
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not any(pattern.search(request.path) for pattern in self.paths):
+            return self.get_response(request)
+
+        started_at = time.time()
+        started = time.perf_counter()
+
+        if self.mode == SAMPLE:
+            key = self.sampler.start(threading.get_ident())
+            try:
+                response = self.get_response(request)
+            finally:
+                stacks = self.sampler.stop(key)
+            self.keep(request, response, started_at, time.perf_counter() - started, stacks=stacks)
+        else:
+            profile = self.profiler()
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            self.keep(request, response, started_at, time.perf_counter() - started, profile=profile)
+
+        return response
+
+    async def __acall__(self, request):
+        if not any(pattern.search(request.path) for pattern in self.paths):
+            return await self.get_response(request)
+
+        started_at = time.time()
+        started = time.perf_counter()
+
+        # The event loop's thread, sampled while this request is in flight
+        key = self.sampler.start(threading.get_ident())
+        try:
+            response = await self.get_response(request)
+        finally:
+            stacks = self.sampler.stop(key)
+
+        self.keep(request, response, started_at, time.perf_counter() - started, stacks=stacks)
+        return response
+
+    def keep(self, request, response, started_at, elapsed, stacks=None, profile=None):
+        """
+        Store the profile when the request was slow enough.
+        """
+        if elapsed < self.threshold:
+            return
+
+        record = {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": getattr(getattr(request, "resolver_match", None), "view_name", None),
+            "status": response.status_code,
+            # Set by TenantMiddleware; requests that never reached it
+            # (rejected by SecurityMiddleware) go to the default one
+            "tenant": getattr(request, "tenant", None) or tenancy.current(),
+            "started_at": started_at,
+            "duration_ms": round(elapsed * 1000, 1),
+            "mode": CPROFILE if profile is not None else SAMPLE,
+        }
+
+        if profile is None:
+            record["interval_ms"] = self.interval_ms
+            record["samples"] = sum(stacks.values())
+            record["top"] = sampled_top(stacks, self.interval_ms)
+            record["stacks"] = [[list(stack), count] for stack, count in stacks.most_common()]
+        else:
+            record["top"] = cprofile_top(profile)
+
+        try:
+            save(record)
+        except OSError:
+            # A full or read-only disk must not fail the request
+            logger.exception("Could not store the profile of %s", record["path"])
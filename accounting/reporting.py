@@ -0,0 +1,216 @@
+# accounting/reporting.py
+
+"""
+Reporting snapshot: heavy reads served from a copy of the database.
+
+With settings.REPORTING_SNAPSHOT on, every database alias gets a
+read-only twin "<alias>_snapshot" pointing at "<file>.snapshot".
+``manage.py refresh_snapshot`` copies the live file there with SQLite's
+online backup API (into a temp file, then an atomic rename, so readers
+never see a half-written copy). Run it from cron, or keep it running
+with ``--every``.
+
+Views wrapped in ``reporting_view`` (ledgers, their row / totals
+endpoints, exports, analytics; sync or async) read through ReportingRouter, which
+sends reads to the snapshot while it exists. Writes are never routed
+there, so every save() still goes to the live database. Report pages
+show how old the snapshot is via ``status()``.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import Http404
+from django.template.response import SimpleTemplateResponse
+
+from . import tenancy
+
+
+SUFFIX = "_snapshot"
+
+# Alias reads are sent to while a reporting view runs (None = live)
+_reading = ContextVar("accounting_reporting", default=None)
+
+
+def snapshot_alias(alias=None):
+    return (alias or tenancy.current()) + SUFFIX
+
+
+def snapshot_path(alias=None):
+    name = settings.DATABASES[alias or tenancy.current()]["NAME"]
+    return f"{name}.snapshot"
+
+
+def available(alias=None):
+    alias = alias or tenancy.current()
+    return (
+        settings.REPORTING_SNAPSHOT
+        and snapshot_alias(alias) in settings.DATABASES
+        and os.path.exists(snapshot_path(alias))
+    )
+
+
+def taken_at(alias=None, path=None):
+    """
+    When the snapshot was written (aware datetime), or None.
+    """
+    try:
+        modified = os.path.getmtime(path or snapshot_path(alias))
+    except OSError:
+        return None
+    return datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+
+
+def status(alias=None):
+    """
+    Freshness of the data a report is reading, for the page header.
+    None while reading live data.
+    """
+    if _reading.get() is None:
+        return None
+
+    when = taken_at(alias)
+    age = time.time() - when.timestamp() if when else None
+
+    return {
+        "taken_at": when,
+        "age": age,
+        "stale": age is None or age > settings.REPORTING_SNAPSHOT_MAX_AGE,
+    }
+
+
+# =====================================================
+# READ ROUTING
+# =====================================================
+
+@contextmanager
+def reads():
+    """
+    Send reads inside the block to the snapshot, when there is one.
+    """
+    token = _reading.set(snapshot_alias() if available() else None)
+    try:
+        yield _reading.get()
+    finally:
+        _reading.reset(token)
+
+
+def reporting_view(view):
+    """
+    Run a view (and render its template) against the snapshot. Objects
+    created after the last refresh are not in it yet; those requests
+    fall back to the live database instead of a 404.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                with reads():
+                    return await view(*args, **kwargs)
+            except Http404:
+                if _reading.get() is not None or not available():
+                    raise
+                return await view(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            with reads():
+                response = view(*args, **kwargs)
+                if isinstance(response, SimpleTemplateResponse):
+                    response.render()
+                return response
+        except Http404:
+            if _reading.get() is not None or not available():
+                raise
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def stream(iterator):
+    """
+    Wrap the async iterator of a streaming response so it keeps reading
+    from the tenant and snapshot active now: the body is only iterated
+    after the view (and TenantMiddleware) have returned.
+    """
+    alias, reading = tenancy.current(), _reading.get()
+
+    async def content():
+        # set(), not reset(): the server may close the generator from
+        # another context when the client goes away
+        tenant = tenancy._current.get()
+        previous = _reading.get()
+        tenancy._current.set(alias)
+        _reading.set(reading)
+        try:
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            tenancy._current.set(tenant)
+            _reading.set(previous)
+
+    return content()
+
+
+class ReportingRouter:
+    """
+    Goes before TenantRouter. Only reads inside ``reads()`` are routed;
+    writes fall through to the live database.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _reading.get()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Snapshot and live copies of the same database
+        if obj1._state.db and obj2._state.db:
+            if obj1._state.db.removesuffix(SUFFIX) == obj2._state.db.removesuffix(SUFFIX):
+                return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db.endswith(SUFFIX):
+            return False
+        return None
+
+
+# =====================================================
+# REFRESH
+# =====================================================
+
+def refresh(alias=None, path=None):
+    """
+    Copy the live database to its snapshot file with the SQLite online
+    backup API. Returns the snapshot path.
+    """
+    alias = alias or tenancy.current()
+    path = path or snapshot_path(alias)
+    partial = f"{path}.partial"
+
+    connection = connections[alias]
+    if connection.in_atomic_block:
+        # The backup would wait forever on our own uncommitted writes
+        raise RuntimeError("Snapshots cannot be taken inside a transaction.")
+
+    connection.ensure_connection()
+
+    target = sqlite3.connect(partial)
+    try:
+        # One pass: a consistent copy even while postings continue
+        connection.connection.backup(target)
+    finally:
+        target.close()
+
+    os.replace(partial, path)
+    return path
@@ -0,0 +1,335 @@
+# accounting/search.py
+
+"""
+Fast party / product lookup backed by SQLite FTS5 trigram tables.
+
+Two contentless-style side tables mirror the searchable columns:
+
+    accounting_party_search      rowid = Party.id      (name, phone)
+    accounting_inventory_search  rowid = Inventory.id  (name)
+
+They are kept in sync by post_save / post_delete signals (connected in
+AccountingConfig.ready). Rows written with bulk_create / queryset.update
+bypass signals — pass them to ``index_many()``, or run
+``manage.py rebuild_search_index`` after those.
+
+Lookups are ranked: prefix matches first, then substring matches, then
+typo-tolerant matches (rows sharing the most trigrams with the term).
+On databases other than SQLite the lookups fall back to the ORM.
+Every statement runs on the routed (per-company) database.
+"""
+
+from django.db import connections, router
+from django.db.models import Case, When, IntegerField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Party, Inventory
+
+
+PARTY_TABLE = "accounting_party_search"
+INVENTORY_TABLE = "accounting_inventory_search"
+
+DEFAULT_LIMIT = 10
+
+# Matches considered for ranking per query
+CANDIDATE_LIMIT = 500
+
+
+def _connection(model, using=None):
+    return connections[using or router.db_for_write(model)]
+
+
+# =====================================================
+# SCHEMA
+# =====================================================
+
+def create_tables(schema_connection=None):
+    schema_connection = schema_connection or _connection(Party)
+    if schema_connection.vendor != "sqlite":
+        return
+
+    with schema_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {PARTY_TABLE} "
+            f"USING fts5(name, phone, tokenize='trigram')"
+        )
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INVENTORY_TABLE} "
+            f"USING fts5(name, tokenize='trigram')"
+        )
+
+
+def rebuild_index(using=None):
+    """
+    Refill both search tables from the master tables in one pass.
+    """
+    connection = _connection(Party, using)
+    if connection.vendor != "sqlite":
+        return
+
+    create_tables(connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PARTY_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {PARTY_TABLE} (rowid, name, phone) "
+            f"SELECT id, name, phone FROM {Party._meta.db_table}"
+        )
+        cursor.execute(f"DELETE FROM {INVENTORY_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {INVENTORY_TABLE} (rowid, name) "
+            f"SELECT id, name FROM {Inventory._meta.db_table}"
+        )
+
+
+# =====================================================
+# SYNC (SIGNAL HANDLERS)
+# =====================================================
+
+def index_party(sender, instance, **kwargs):
+    connection = _connection(Party, kwargs.get("using"))
+    if connection.vendor != "sqlite" or kwargs.get("raw"):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PARTY_TABLE} WHERE rowid = %s", [instance.pk])
+        cursor.execute(
+            f"INSERT INTO {PARTY_TABLE} (rowid, name, phone) VALUES (%s, %s, %s)",
+            [instance.pk, instance.name, instance.phone],
+        )
+
+
+def unindex_party(sender, instance, **kwargs):
+    connection = _connection(Party, kwargs.get("using"))
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PARTY_TABLE} WHERE rowid = %s", [instance.pk])
+
+
+def index_inventory(sender, instance, **kwargs):
+    connection = _connection(Inventory, kwargs.get("using"))
+    if connection.vendor != "sqlite" or kwargs.get("raw"):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INVENTORY_TABLE} WHERE rowid = %s", [instance.pk])
+        cursor.execute(
+            f"INSERT INTO {INVENTORY_TABLE} (rowid, name) VALUES (%s, %s)",
+            [instance.pk, instance.name],
+        )
+
+
+def index_many(model, objects, using=None):
+    """
+    (Re)index Party or Inventory rows written in bulk.
+    """
+    connection = _connection(model, using)
+    if connection.vendor != "sqlite" or not objects:
+        return
+
+    if model is Party:
+        table, rows = PARTY_TABLE, [[obj.pk, obj.name, obj.phone] for obj in objects]
+        insert = f"INSERT INTO {PARTY_TABLE} (rowid, name, phone) VALUES (%s, %s, %s)"
+    else:
+        table, rows = INVENTORY_TABLE, [[obj.pk, obj.name] for obj in objects]
+        insert = f"INSERT INTO {INVENTORY_TABLE} (rowid, name) VALUES (%s, %s)"
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [[row[0]] for row in rows])
+        cursor.executemany(insert, rows)
+
+
+def unindex_inventory(sender, instance, **kwargs):
+    connection = _connection(Inventory, kwargs.get("using"))
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INVENTORY_TABLE} WHERE rowid = %s", [instance.pk])
+
+
+# =====================================================
+# LOOKUP
+# =====================================================
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _typo_query(term):
+    """
+    FTS query tolerating one typo per word: a word also matches when
+    the text around any single wrong / missing character is present.
+    Words shorter than 3 characters cannot be matched by trigrams and
+    are ignored.
+    """
+    clauses = []
+
+    for word in term.lower().split():
+        if len(word) < 3:
+            continue
+
+        variants = {_quote(word)}
+        for i in range(len(word)):
+            parts = [p for p in (word[:i], word[i + 1:]) if len(p) >= 3]
+            if parts:
+                variants.add("(" + " AND ".join(_quote(p) for p in parts) + ")")
+
+        clauses.append("(" + " OR ".join(sorted(variants)) + ")")
+
+    return " AND ".join(clauses)
+
+
+def _within(queryset):
+    """
+    SQL restricting rowids to the rows of ``queryset`` (filtered admin
+    or autocomplete querysets), or None when it is the whole table.
+    """
+    if queryset is None or not queryset.query.where:
+        return None
+    ids = queryset.order_by().values("pk")
+    sql, params = ids.query.get_compiler(ids.db).as_sql()
+    return f" AND rowid IN ({sql})", list(params)
+
+
+def _ranked_ids(connection, table, columns, term, limit, within=None):
+    """
+    Return up to ``limit`` rowids from an FTS table, best match first,
+    only among the rows allowed by ``within`` (see _within()).
+
+    Ranking only looks at the first CANDIDATE_LIMIT matches so a very
+    common term costs the same as a rare one.
+    """
+    term = term.strip()
+    if not term:
+        return []
+
+    restrict, restrict_params = within or ("", [])
+    prefix_column = columns[0]
+    candidates = (
+        f"SELECT rowid, {prefix_column}, rank FROM {table} "
+        f"WHERE {table} MATCH %s{restrict} LIMIT {CANDIDATE_LIMIT}"
+    )
+    ids = []
+
+    with connection.cursor() as cursor:
+
+        if len(term) >= 3:
+            # Substring match (every trigram present), prefix hits first
+            cursor.execute(
+                f"SELECT rowid FROM ({candidates}) "
+                f"ORDER BY ({prefix_column} LIKE %s) DESC, rank LIMIT %s",
+                [_quote(term), *restrict_params, term.replace("%", "").replace("_", "") + "%", limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+            # Typo tolerance for whatever is left
+            query = _typo_query(term)
+            if len(ids) < limit and query:
+                cursor.execute(
+                    f"SELECT rowid FROM ({candidates}) ORDER BY rank LIMIT %s",
+                    [query, *restrict_params, limit + len(ids)],
+                )
+                seen = set(ids)
+                for (rowid,) in cursor.fetchall():
+                    if rowid not in seen and len(ids) < limit:
+                        ids.append(rowid)
+                        seen.add(rowid)
+
+        else:
+            # Too short for trigrams: plain prefix scan, bounded by LIMIT
+            where = " OR ".join(f"{c} LIKE %s" for c in columns)
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE ({where}){restrict} LIMIT %s",
+                [term + "%"] * len(columns) + restrict_params + [limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+    return ids
+
+
+def _matching(queryset, table, columns, term):
+    """
+    Every row of ``queryset`` matching ``term``, unlimited, for paged
+    lists: prefix matches, then substring matches, then typo-tolerant
+    ones, each group in the queryset's own order. Filtered and ordered
+    in SQL, so a common term costs one paged query, not a list of ids.
+    """
+    term = term.strip()
+    if not term:
+        return queryset.none()
+
+    if len(term) < 3:
+        prefix = Q()
+        for column in columns:
+            prefix |= Q(**{f"{column}__startswith": term})
+        return queryset.filter(prefix)
+
+    match = f"SELECT rowid FROM {table} WHERE {table} MATCH %s"
+    substring = Q(pk__in=RawSQL(match, [_quote(term)]))
+    found = substring
+
+    query = _typo_query(term)
+    if query:
+        found |= Q(pk__in=RawSQL(match, [query]))
+
+    ranking = Case(
+        When(substring & Q(**{f"{columns[0]}__startswith": term}), then=0),
+        When(substring, then=1),
+        default=2,
+        output_field=IntegerField(),
+    )
+    return queryset.filter(found).order_by(ranking, *queryset.query.order_by)
+
+
+def order_by_ids(queryset, ids):
+    """
+    Restrict ``queryset`` to ``ids`` keeping the ranking order.
+    """
+    if not ids:
+        return queryset.none()
+
+    ranking = Case(
+        *[When(pk=pk, then=pos) for pos, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ids).order_by(ranking)
+
+
+def search_parties(term, queryset=None, limit=DEFAULT_LIMIT):
+    """
+    Parties of ``queryset`` matching ``term``, best first: the top
+    ``limit``, or every match when ``limit`` is None.
+    """
+    queryset = Party.objects.all() if queryset is None else queryset
+    connection = connections[queryset.db]
+
+    if connection.vendor != "sqlite":
+        return queryset.filter(
+            Q(name__icontains=term) | Q(phone__startswith=term)
+        )
+
+    if limit is None:
+        return _matching(queryset, PARTY_TABLE, ("name", "phone"), term)
+
+    ids = _ranked_ids(connection, PARTY_TABLE, ("name", "phone"), term, limit, _within(queryset))
+    return order_by_ids(queryset, ids)
+
+
+def search_inventory(term, queryset=None, limit=DEFAULT_LIMIT):
+    """
+    Products of ``queryset`` matching ``term``, like search_parties().
+    """
+    queryset = Inventory.objects.all() if queryset is None else queryset
+    connection = connections[queryset.db]
+
+    if connection.vendor != "sqlite":
+        return queryset.filter(name__icontains=term)
+
+    if limit is None:
+        return _matching(queryset, INVENTORY_TABLE, ("name",), term)
+
+    ids = _ranked_ids(connection, INVENTORY_TABLE, ("name",), term, limit, _within(queryset))
+    return order_by_ids(queryset, ids)
@@ -1,5 +1,6 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import SalePurchase, CashBankTransaction
+from .models import SalePurchase, CashBankTransaction, Invoice
 
 
 class SalePurchaseSerializer(serializers.ModelSerializer):
@@ -11,4 +12,27 @@ class SalePurchaseSerializer(serializers.ModelSerializer):
 class CashBankTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = CashBankTransaction
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class InvoiceLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SalePurchase
+        fields = ('id', 'inventory', 'quantity', 'price_per_unit', 'amount')
+        read_only_fields = ('id', 'amount')
+
+
+class InvoiceSerializer(serializers.ModelSerializer):
+    lines = InvoiceLineSerializer(many=True)
+
+    class Meta:
+        model = Invoice
+        fields = '__all__'
+
+    def create(self, validated_data):
+        lines = [SalePurchase(**line) for line in validated_data.pop('lines')]
+
+        try:
+            return Invoice(**validated_data).post(lines)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
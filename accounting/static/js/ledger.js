@@ -0,0 +1,209 @@
+// Virtual-scrolled ledger table.
+//
+// The page ships only the shell: a .ledger-stream element carrying
+// data-url (JSON rows endpoint), data-count and data-chunk. Rows are
+// fetched in chunks as they scroll into view and only the visible
+// window is kept in the DOM, so a 50k-row ledger costs the same to
+// open as a 50-row one. Running balances come from the server, which
+// computes the carry into every chunk, so any chunk is correct on its own.
+
+document.addEventListener("DOMContentLoaded", function () {
+
+    const ROW_HEIGHT = 34;
+    const OVERSCAN = 10;
+
+    document.querySelectorAll(".ledger-stream").forEach(function (root) {
+
+        const url = root.dataset.url;
+        // The rows URL may already carry ?year= for an archived period
+        const join = url.indexOf("?") === -1 ? "?" : "&";
+        const chunkSize = parseInt(root.dataset.chunk, 10) || 200;
+        let count = parseInt(root.dataset.count, 10) || 0;
+
+        const signedColumn = root.dataset.signedColumn || "";
+        const headers = Array.from(root.querySelectorAll("thead th"));
+
+        const viewport = root.querySelector(".ledger-viewport");
+        const spacer = root.querySelector(".ledger-spacer");
+        const table = viewport.querySelector("table");
+        const body = table.tBodies[0];
+        const status = root.querySelector(".ledger-status");
+
+        const detail = root.querySelector(".ledger-detail");
+
+        const chunks = new Map();     // chunk index -> rows
+        const details = new Map();    // chunk index -> { row index: invoice lines }
+        const pending = new Map();    // chunk index -> Promise
+        let columns = headers.map(function (th) { return th.dataset.key; });
+
+        spacer.style.height = (count * ROW_HEIGHT) + "px";
+
+        // A 4xx/5xx still resolves fetch(), so check the status before
+        // trusting the body
+        function getJSON(query) {
+            return fetch(url + join + query, {
+                credentials: "same-origin",
+                headers: { "Accept": "application/json" },
+            }).then(function (response) {
+                if (!response.ok) {
+                    throw new Error("HTTP " + response.status);
+                }
+                return response.json();
+            });
+        }
+
+        function retryButton(label, retry) {
+            const button = document.createElement("button");
+            button.type = "button";
+            button.textContent = label;
+            button.addEventListener("click", retry);
+            return button;
+        }
+
+        function fetchChunk(index) {
+            if (chunks.has(index)) {
+                return Promise.resolve(chunks.get(index));
+            }
+            if (pending.has(index)) {
+                return pending.get(index);
+            }
+
+            const request = getJSON("offset=" + (index * chunkSize) + "&limit=" + chunkSize)
+                .then(function (data) {
+                    pending.delete(index);
+                    columns = data.columns;
+                    chunks.set(index, data.rows);
+                    details.set(index, data.details || {});
+
+                    if (data.count !== count) {
+                        count = data.count;
+                        spacer.style.height = (count * ROW_HEIGHT) + "px";
+                    }
+                    return data.rows;
+                }, function (error) {
+                    // Forget the failed request so the next render asks again
+                    pending.delete(index);
+                    throw error;
+                });
+
+            pending.set(index, request);
+            return request;
+        }
+
+        function showLines(lines) {
+            detail.replaceChildren();
+            lines.forEach(function (line) {
+                const div = document.createElement("div");
+                div.textContent = line[0] + ": " + line[1] + " × " + line[2] + " = " + line[3];
+                detail.appendChild(div);
+            });
+            detail.hidden = false;
+        }
+
+        function renderRow(values, lines) {
+            const tr = document.createElement("tr");
+            tr.style.height = ROW_HEIGHT + "px";
+
+            // Invoice rows expand into their lines below the table
+            if (lines) {
+                tr.className = "ledger-invoice";
+                tr.title = "Show invoice lines";
+                tr.addEventListener("click", function () { showLines(lines); });
+            }
+
+            values.forEach(function (value, i) {
+                const td = document.createElement("td");
+                td.textContent = value;
+
+                if (columns[i] === signedColumn) {
+                    const number = parseFloat(value);
+                    if (number > 0) {
+                        td.className = "balance-positive";
+                    } else if (number < 0) {
+                        td.className = "balance-negative";
+                    }
+                }
+                tr.appendChild(td);
+            });
+            return tr;
+        }
+
+        function render() {
+            const first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            const visible = Math.ceil(viewport.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN;
+            const last = Math.min(count, first + visible);
+
+            const firstChunk = Math.floor(first / chunkSize);
+            const lastChunk = Math.floor(Math.max(last - 1, 0) / chunkSize);
+            const wanted = [];
+            for (let c = firstChunk; c <= lastChunk; c++) {
+                wanted.push(fetchChunk(c));
+            }
+
+            Promise.all(wanted).then(function () {
+                const fragment = document.createDocumentFragment();
+
+                for (let i = first; i < last; i++) {
+                    const c = Math.floor(i / chunkSize);
+                    const rows = chunks.get(c);
+                    const values = rows && rows[i % chunkSize];
+                    if (values) {
+                        fragment.appendChild(renderRow(values, details.get(c)[i % chunkSize]));
+                    }
+                }
+
+                table.style.transform = "translateY(" + (first * ROW_HEIGHT) + "px)";
+                body.replaceChildren(fragment);
+
+                if (status) {
+                    status.textContent = count
+                        ? "Rows " + (first + 1) + "–" + last + " of " + count
+                        : "No transactions";
+                    status.classList.remove("ledger-error");
+                }
+            }).catch(function () {
+                if (status) {
+                    status.textContent = "Could not load rows. ";
+                    status.classList.add("ledger-error");
+                    status.appendChild(retryButton("Retry", render));
+                }
+            });
+        }
+
+        let scheduled = false;
+        viewport.addEventListener("scroll", function () {
+            if (!scheduled) {
+                scheduled = true;
+                window.requestAnimationFrame(function () {
+                    scheduled = false;
+                    render();
+                });
+            }
+        });
+
+        render();
+
+        // Totals need a pass over the whole ledger, so they arrive
+        // after the first rows instead of delaying the page
+        function loadTotals() {
+            const targets = document.querySelectorAll("[data-total]");
+
+            targets.forEach(function (el) { el.textContent = "…"; });
+
+            getJSON("totals=1").then(function (totals) {
+                targets.forEach(function (el) {
+                    if (totals[el.dataset.total] !== undefined) {
+                        el.textContent = totals[el.dataset.total];
+                    }
+                });
+            }).catch(function () {
+                targets.forEach(function (el) {
+                    el.replaceChildren(retryButton("unavailable – retry", loadTotals));
+                });
+            });
+        }
+
+        loadTotals();
+    });
+
+});
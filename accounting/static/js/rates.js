@@ -0,0 +1,104 @@
+// Last-rate autofill for the sale / purchase / invoice forms.
+//
+// Price fields rendered by LastRateMixin carry data-rates-url and
+// data-purpose (blank on invoice lines: the header's purpose select
+// decides). When the party or a line's product changes, the rates
+// endpoint is asked for the last rates: an empty (or still autofilled)
+// price gets the suggested one and the recent rates are listed under
+// the field.
+
+(function () {
+
+    function priceFields() {
+        return document.querySelectorAll("input[data-rates-url]");
+    }
+
+    function related(price, name) {
+        // id_price_per_unit -> id_inventory, id_lines-0-price_per_unit -> id_lines-0-inventory
+        return document.getElementById(price.id.replace(/price_per_unit$/, name));
+    }
+
+    function purposeOf(price) {
+        if (price.dataset.purpose) {
+            return price.dataset.purpose;
+        }
+        const select = document.getElementById("id_purpose");
+        return select && select.value ? select.value : "sale";
+    }
+
+    function hintFor(price) {
+        let hint = price.parentNode.querySelector(".last-rates");
+        if (!hint) {
+            hint = document.createElement("div");
+            hint.className = "help last-rates";
+            price.parentNode.appendChild(hint);
+        }
+        return hint;
+    }
+
+    function describe(rate) {
+        return rate.price + " (" + rate.date.slice(0, 10) + ")";
+    }
+
+    function refresh(price) {
+        const inventory = related(price, "inventory");
+        const party = document.getElementById("id_party");
+        if (!inventory || !inventory.value) {
+            return;
+        }
+
+        const params = new URLSearchParams({ inventory: inventory.value, purpose: purposeOf(price) });
+        if (party && party.value) {
+            params.set("party", party.value);
+        }
+
+        fetch(price.dataset.ratesUrl + "?" + params, {
+            credentials: "same-origin",
+            headers: { "Accept": "application/json" },
+        })
+            .then(function (response) { return response.ok ? response.json() : null; })
+            .then(function (data) {
+                if (!data) {
+                    return;
+                }
+
+                // Never overwrite a price the clerk typed
+                if (!price.value || price.dataset.autofilled === price.value) {
+                    price.value = data.suggested;
+                    price.dataset.autofilled = data.suggested;
+                    price.dispatchEvent(new Event("input", { bubbles: true }));
+                }
+
+                let text = "No earlier rates; default price " + data.default_price;
+                if (data.party_rates.length) {
+                    text = "This party: " + data.party_rates.map(describe).join(", ");
+                } else if (data.rates.length) {
+                    text = "All parties: " + data.rates.map(describe).join(", ");
+                }
+                hintFor(price).textContent = text;
+            });
+    }
+
+    function onChange(event) {
+        const target = event.target;
+
+        if (target.id === "id_party" || target.id === "id_purpose") {
+            priceFields().forEach(refresh);
+        } else if (/inventory$/.test(target.id)) {
+            const price = document.getElementById(target.id.replace(/inventory$/, "price_per_unit"));
+            if (price && price.dataset.ratesUrl) {
+                refresh(price);
+            }
+        }
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        // Autocomplete (select2) widgets announce changes through jQuery only
+        if (window.django && window.django.jQuery) {
+            window.django.jQuery(document).on("change", "select", onChange);
+        } else {
+            document.addEventListener("change", onChange);
+        }
+    });
+
+})();
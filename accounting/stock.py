@@ -0,0 +1,226 @@
+# accounting/stock.py
+
+"""
+Low-stock and reorder alerts.
+
+Each product may set a reorder level (alert at or below that quantity)
+and a days-of-cover threshold (alert when stock would run out sooner
+at the recent sales rate). The sales rate is the quantity sold over
+the last settings.STOCK_USAGE_DAYS days, divided by that many days,
+summed from StockDay buckets (one row per product and day).
+
+Both are maintained as postings happen: record() adds a posting's
+sales to its day buckets and evaluate() re-checks just the products
+touched, adding or removing their StockAlert row. The alert table is
+therefore the at-risk list itself, read without computing anything.
+
+Time passing only lowers a sales rate, which can clear an alert but
+never raise one, so the daily ``manage.py refresh_stock_alerts``
+re-checks the current alerts only (and prunes old buckets). rebuild()
+recomputes buckets and alerts from the postings after bulk loads and
+restores.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import router, transaction as db_transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Inventory, SalePurchase, ArchivedSalePurchase, StockDay, StockAlert
+
+
+def window(today=None):
+    """
+    (first day, last day) of the consumption window.
+    """
+    today = today or timezone.localdate()
+    return today - timedelta(days=settings.STOCK_USAGE_DAYS - 1), today
+
+
+# =====================================================
+# EVALUATION
+# =====================================================
+
+# Products re-checked per query batch
+BATCH_SIZE = 500
+
+
+def _evaluate_batch(inventory_ids, first, last, using):
+    days = Decimal(settings.STOCK_USAGE_DAYS)
+
+    sold = dict(
+        StockDay.objects.using(using)
+        .filter(inventory_id__in=inventory_ids, day__gte=first, day__lte=last)
+        .values("inventory_id")
+        .annotate(total=Sum("sold"))
+        .values_list("inventory_id", "total")
+    )
+
+    items = (
+        Inventory.objects.using(using)
+        .filter(pk__in=inventory_ids)
+        .values_list("pk", "quantity", "reorder_level", "min_cover_days")
+    )
+
+    alerts = []
+    cleared = set(inventory_ids)
+
+    for pk, quantity, reorder_level, min_cover_days in items:
+        usage = (sold.get(pk) or Decimal("0")) / days
+        cover = (quantity / usage).quantize(Decimal("0.1")) if usage > 0 else None
+
+        below_reorder_level = reorder_level > 0 and quantity <= reorder_level
+        below_cover = min_cover_days > 0 and cover is not None and cover < min_cover_days
+
+        if below_reorder_level or below_cover:
+            cleared.discard(pk)
+            alerts.append(StockAlert(
+                inventory_id=pk,
+                quantity=quantity,
+                daily_usage=usage.quantize(Decimal("0.001")),
+                days_of_cover=cover,
+                below_reorder_level=below_reorder_level,
+                below_cover=below_cover,
+            ))
+
+    # Upsert: an existing alert keeps its ``since``
+    StockAlert.objects.using(using).bulk_create(
+        alerts,
+        update_conflicts=True,
+        unique_fields=["inventory"],
+        update_fields=["quantity", "daily_usage", "days_of_cover", "below_reorder_level", "below_cover", "updated_at"],
+    )
+    if cleared:
+        StockAlert.objects.using(using).filter(inventory_id__in=cleared).delete()
+
+
+def evaluate(inventory_ids, today=None, using=None):
+    """
+    Re-check products and add, update or drop their alerts: a few
+    queries per BATCH_SIZE products, none per product.
+    """
+    using = using or router.db_for_write(StockAlert)
+    first, last = window(today)
+
+    inventory_ids = sorted(set(inventory_ids))
+    for start in range(0, len(inventory_ids), BATCH_SIZE):
+        _evaluate_batch(inventory_ids[start:start + BATCH_SIZE], first, last, using)
+
+
+def record(lines):
+    """
+    Add saved SalePurchase rows' sales to their day buckets and re-check
+    their products. Called from SalePurchase.save(), Invoice.post() and
+    voiding.void(): a void's reversal (negative quantity) comes off the
+    original sale's day, or nothing when that day has left the window.
+    """
+    first, _ = window()
+
+    sold = {}
+    for line in lines:
+        if line.purpose == "sale":
+            day = timezone.localdate((line.reversal_of if line.reversal_of_id else line).date)
+            if day < first:
+                continue
+            key = (line.inventory_id, day)
+            sold[key] = sold.get(key, Decimal("0")) + line.quantity
+
+    if sold:
+        keys = Q()
+        for inventory_id, day in sold:
+            keys |= Q(inventory_id=inventory_id, day=day)
+
+        buckets = {
+            (bucket.inventory_id, bucket.day): bucket
+            for bucket in StockDay.objects.select_for_update().filter(keys)
+        }
+
+        creates = []
+        for (inventory_id, day), quantity in sold.items():
+            bucket = buckets.get((inventory_id, day))
+            if bucket is None:
+                creates.append(StockDay(inventory_id=inventory_id, day=day, sold=quantity))
+            else:
+                bucket.sold += quantity
+
+        StockDay.objects.bulk_create(creates)
+        if buckets:
+            StockDay.objects.bulk_update(buckets.values(), ["sold"])
+
+    evaluate({line.inventory_id for line in lines})
+
+
+# =====================================================
+# UPKEEP
+# =====================================================
+
+def refresh(today=None, using=None):
+    """
+    Daily upkeep: re-check the current alerts as the window moves on
+    and drop buckets that have left it. Returns the alert count.
+    """
+    using = using or router.db_for_write(StockAlert)
+    first, _ = window(today)
+
+    with db_transaction.atomic(using=using):
+        StockDay.objects.using(using).filter(day__lt=first).delete()
+        evaluate(StockAlert.objects.using(using).values_list("inventory_id", flat=True), today, using)
+
+    return StockAlert.objects.using(using).count()
+
+
+def rebuild(today=None, using=None):
+    """
+    Recompute the window's buckets from the live and archived sales and
+    re-check every product. Returns the alert count.
+    """
+    using = using or router.db_for_write(StockAlert)
+    first, last = window(today)
+
+    totals = {}
+    reversals = []
+    for model in (ArchivedSalePurchase, SalePurchase):
+        sales = model.objects.using(using).filter(purpose="sale")
+        rows = (
+            sales.filter(reversal_of__isnull=True, date__date__gte=first, date__date__lte=last)
+            .annotate(day=TruncDate("date"))
+            .values("inventory_id", "day")
+            .annotate(total=Sum("quantity"))
+            .values_list("inventory_id", "day", "total")
+        )
+        for inventory_id, day, total in rows:
+            totals[inventory_id, day] = totals.get((inventory_id, day), Decimal("0")) + total
+
+        # Voided after the window opened: may reverse a sale inside it
+        reversals += sales.filter(reversal_of__isnull=False, date__date__gte=first).values_list(
+            "inventory_id", "reversal_of_id", "quantity"
+        )
+
+    # Reversals come off their original's day, as in record()
+    original_days = {}
+    original_ids = [original_id for _, original_id, _ in reversals]
+    for model in (ArchivedSalePurchase, SalePurchase):
+        for start in range(0, len(original_ids), BATCH_SIZE):
+            originals = model.objects.using(using).filter(pk__in=original_ids[start:start + BATCH_SIZE])
+            for pk, date in originals.values_list("pk", "date"):
+                original_days[pk] = timezone.localdate(date)
+
+    for inventory_id, original_id, quantity in reversals:
+        day = original_days.get(original_id)
+        if day is not None and first <= day <= last:
+            totals[inventory_id, day] = totals.get((inventory_id, day), Decimal("0")) + quantity
+
+    with db_transaction.atomic(using=using):
+        StockDay.objects.using(using).all().delete()
+        StockAlert.objects.using(using).all().delete()
+        StockDay.objects.using(using).bulk_create(
+            [StockDay(inventory_id=inventory_id, day=day, sold=total) for (inventory_id, day), total in totals.items()],
+            batch_size=1000,
+        )
+        evaluate(Inventory.objects.using(using).values_list("pk", flat=True), today, using)
+
+    return StockAlert.objects.using(using).count()
@@ -0,0 +1,141 @@
+# accounting/tasks.py
+
+"""
+Background tasks (run by accounting.jobs). Each takes its Job first,
+reports progress through it and returns a JSON-serialisable result.
+"""
+
+import csv
+import os
+
+from django.conf import settings
+from django.db import router, transaction as db_transaction
+
+from . import pdf, reporting, search, stock, tenancy
+from .closing import close_year
+from .jobs import task
+from .ledger import LEDGERS, PartyLedger
+from .models import FiscalYear, Party
+
+
+# Rows fetched per query while exporting a ledger
+EXPORT_BATCH = 1000
+
+
+def result_path(filename):
+    os.makedirs(settings.JOBS_RESULTS_DIR, exist_ok=True)
+    return os.path.join(settings.JOBS_RESULTS_DIR, filename)
+
+
+@task("close_fiscal_years")
+def close_fiscal_years(job, year_ids):
+    """
+    Close years oldest first; each close needs the earlier ones closed.
+    """
+    years = list(FiscalYear.objects.filter(pk__in=year_ids).order_by("start_date"))
+    closed = []
+
+    for done, year in enumerate(years):
+        job.set_progress(done, len(years), f"Closing {year.name}")
+        result = close_year(year)
+        closed.append({"year": year.name, "archived": result["archived"]})
+
+    return {"closed": closed}
+
+
+@task("export_ledgers")
+def export_ledgers(job, kind, ids):
+    """
+    Full-history ledgers of the chosen parties / accounts / products
+    as one CSV file (a leading column names the ledger), all as they
+    stood when the export started: postings made meanwhile never shift
+    or split a ledger.
+    """
+    model, ledger_class = LEDGERS[kind]
+
+    filename = f"{kind}-ledgers-{tenancy.current()}-{job.pk}.csv"
+    rows = 0
+
+    with open(result_path(filename), "w", newline="") as handle, reporting.reads():
+        # Objects (stock quantities, opening balances) and the cut-off
+        # ids in one short read; the export itself holds no transaction,
+        # so posting and the job's progress writes carry on
+        with db_transaction.atomic(using=router.db_for_read(model)):
+            objects = list(model.objects.filter(pk__in=ids).order_by("name"))
+            until = ledger_class.high_water()
+
+        writer = csv.writer(handle)
+        writer.writerow(["ledger", *ledger_class.HEADERS])
+
+        for done, obj in enumerate(objects):
+            source = ledger_class(obj, until=until)
+            count = source.count()
+            written = 0
+
+            # One ordered pass, the balance carried from batch to batch
+            for entries in source.batches(EXPORT_BATCH):
+                job.set_progress(done, len(objects), f"{obj.name}: row {written} of {count}")
+
+                writer.writerows([obj.name, *source.render_row(entry)] for entry in entries)
+                written += len(entries)
+
+            rows += written
+
+    return {"file": filename, "ledgers": len(objects), "rows": rows}
+
+
+@task("party_ledger_pdf")
+def party_ledger_pdf(job, party_id, year_id=None):
+    """
+    One party's ledger statement (the live books, or a closed year) as
+    a PDF. Laying out a long ledger takes reportlab seconds, so it is
+    never done in the request.
+    """
+    party = Party.objects.get(pk=party_id)
+    year = FiscalYear.objects.get(pk=year_id) if year_id else None
+
+    with reporting.reads():
+        source = PartyLedger(party, year=year)
+        count = source.count()
+        totals = source.totals()
+
+        rows = []
+        for entries in source.batches(EXPORT_BATCH):
+            job.set_progress(len(rows), count * 2, f"Reading row {len(rows)} of {count}")
+            rows += [source.render_row(entry) for entry in entries]
+
+    job.set_progress(count, count * 2, f"Laying out {count} rows")
+    document = pdf.table_pdf(
+        f"{tenancy.company()['name']}: Ledger Statement",
+        [
+            f"Party: {party.name} ({party.phone})",
+            f"Opening: {totals['opening']}   Debit: {totals['credit']}   "
+            f"Credit: {totals['debit']}   Closing: {totals['closing']}",
+        ],
+        source.HEADERS,
+        rows,
+        right=range(4, len(source.COLUMNS)),
+    )
+
+    filename = f"ledger-{party.pk}-{tenancy.current()}-{job.pk}.pdf"
+    with open(result_path(filename), "wb") as handle:
+        handle.write(document)
+
+    return {"file": filename, "rows": count}
+
+
+@task("rebuild_search_index")
+def rebuild_search_index(job):
+    search.rebuild_index()
+    return {"rebuilt": True}
+
+
+@task("refresh_stock_alerts")
+def refresh_stock_alerts(job, rebuild=False):
+    alerts = stock.rebuild() if rebuild else stock.refresh()
+    return {"alerts": alerts}
+
+
+@task("refresh_snapshot")
+def refresh_snapshot(job):
+    return {"file": os.path.basename(reporting.refresh())}
@@ -0,0 +1,152 @@
+# accounting/tenancy.py
+
+"""
+One deployment, several group companies.
+
+Every company ("tenant") in settings.TENANTS has its own SQLite file,
+registered by settings.py as DATABASES[<alias>]. TenantMiddleware binds
+each request to a tenant (X-Company header, else the request host) and
+TenantRouter sends all of that request's queries to the tenant's
+database, so one company's write lock never blocks another's.
+
+Django keeps one connection per alias per thread and reuses it across
+requests for CONN_MAX_AGE seconds, so switching tenants does not
+reopen database files.
+
+Outside a request (management commands, shell) the tenant comes from
+the ACCOUNTING_TENANT environment variable; ``manage.py tenants`` sets
+it while running a command for every tenant in parallel.
+
+With TENANTS empty the project is a single company on 'default', with
+branding from settings.COMPANY.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+
+HEADER = "X-Company"
+ENVIRONMENT_VARIABLE = "ACCOUNTING_TENANT"
+
+_current = ContextVar("accounting_tenant", default=None)
+
+
+def aliases():
+    """
+    Database alias of every tenant.
+    """
+    return list(settings.TENANTS) or [DEFAULT_DB_ALIAS]
+
+
+def current():
+    """
+    Database alias of the active tenant.
+    """
+    return _current.get() or os.environ.get(ENVIRONMENT_VARIABLE) or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def activate(alias):
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+def company(alias=None):
+    """
+    Branding of a tenant (the active one by default): settings.COMPANY
+    overridden by the tenant's own "company" entry.
+    """
+    tenant = settings.TENANTS.get(alias or current(), {})
+    return {**settings.COMPANY, **tenant.get("company", {})}
+
+
+def resolve(request):
+    """
+    Tenant alias for a request; unknown companies are a 404.
+    """
+    if not settings.TENANTS:
+        return DEFAULT_DB_ALIAS
+
+    alias = request.headers.get(HEADER)
+    if alias:
+        if alias in settings.TENANTS:
+            return alias
+        raise Http404("Unknown company.")
+
+    host = request.get_host().split(":")[0].lower()
+    for alias, tenant in settings.TENANTS.items():
+        if host in tenant.get("hosts", ()):
+            return alias
+
+    raise Http404("Unknown company.")
+
+
+# =====================================================
+# MIDDLEWARE / ROUTER / TEMPLATES
+# =====================================================
+
+class TenantMiddleware:
+    """
+    Must come before session and auth middleware: users and sessions
+    live in each tenant's own database.
+
+    Async-capable, so async views under ASGI run without a thread hop.
+    A streaming body is sent after this returns; streams that query
+    the database re-activate ``request.tenant`` themselves.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request.tenant = resolve(request)
+
+        with activate(request.tenant):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.tenant = resolve(request)
+
+        with activate(request.tenant):
+            return await self.get_response(request)
+
+
+class TenantRouter:
+    """
+    Every model of every app lives in the active tenant's database.
+    """
+
+    def db_for_read(self, model, **hints):
+        return current()
+
+    def db_for_write(self, model, **hints):
+        return current()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db and obj2._state.db:
+            return obj1._state.db == obj2._state.db
+        return None
+
+
+def branding(request):
+    """
+    Template context processor: {{ company.name }}, .gst, .address.
+    """
+    return {"company": company(getattr(request, "tenant", None))}
@@ -1,3 +1,1863 @@
-from django.test import TestCase
+import json
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Account, Party, Inventory, SalePurchase, CashBankTransaction
+
+
+# =====================================================
+# HELPERS
+# =====================================================
+
+def make_masters():
+    account = Account.objects.create(name="Cash", account_type="cash")
+    customer = Party.objects.create(name="Ravi Traders", party_type="customer", phone="9810000001")
+    supplier = Party.objects.create(name="Shree Polymers", party_type="supplier", phone="9810000002")
+    product = Inventory.objects.create(name="HDPE Granules", quantity=Decimal("1000"), default_price=Decimal("90"))
+    return account, customer, supplier, product
+
+
+def bulk_transactions(count, account, customer, supplier, product):
+    """
+    Synthetic rows inserted with bulk_create (bypasses save(), so
+    balances are not touched — only the changelists are exercised).
+    """
+    now = timezone.now()
+
+    SalePurchase.objects.bulk_create(
+        [
+            SalePurchase(
+                purpose="sale" if i % 2 else "purchase",
+                payment_mode="credit",
+                party=customer if i % 2 else supplier,
+                inventory=product,
+                quantity=Decimal("1"),
+                price_per_unit=Decimal("90"),
+                amount=Decimal("90"),
+                date=now - timezone.timedelta(hours=i),
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+
+    CashBankTransaction.objects.bulk_create(
+        [
+            CashBankTransaction(
+                transaction_type="receive" if i % 2 else "pay",
+                party=customer if i % 2 else supplier,
+                account=account,
+                amount=Decimal("50"),
+                date=now - timezone.timedelta(hours=i),
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+
+
+# =====================================================
+# TRANSACTION ADMIN CHANGELISTS
+# =====================================================
+
+class TransactionChangelistTests(TestCase):
+
+    CHANGELISTS = (
+        "admin:accounting_sale_changelist",
+        "admin:accounting_purchase_changelist",
+        "admin:accounting_receivemoney_changelist",
+        "admin:accounting_paymoney_changelist",
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.masters = make_masters()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def changelist_queries(self, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        bulk_transactions(10, *self.masters)
+        small = {name: self.changelist_queries(name) for name in self.CHANGELISTS}
+
+        bulk_transactions(400, *self.masters)
+        large = {name: self.changelist_queries(name) for name in self.CHANGELISTS}
+
+        self.assertEqual(small, large)
+
+    def test_large_dataset_changelist_time(self):
+        bulk_transactions(20000, *self.masters)
+
+        for name in self.CHANGELISTS:
+            started = time.perf_counter()
+            self.changelist_queries(name)
+            self.assertLess(time.perf_counter() - started, 2.0, name)
+
+    def test_estimated_count_above_limit(self):
+        from .admin import EstimatedCountPaginator
+
+        bulk_transactions(30, *self.masters)
+        queryset = SalePurchase.objects.order_by("-date")
+
+        paginator = EstimatedCountPaginator(queryset, 10)
+        self.assertEqual(paginator.count, 30)
+
+        paginator = EstimatedCountPaginator(queryset, 10)
+        paginator.exact_count_limit = 5
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertGreater(paginator.count, 5)
+
+    def test_filtered_count_above_limit_is_capped(self):
+        from .admin import EstimatedCountPaginator
+
+        bulk_transactions(30, *self.masters)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        # sqlite_stat1 counts purchases too: the sale list must not use it
+        paginator = EstimatedCountPaginator(SalePurchase.objects.filter(purpose="sale").order_by("-date"), 2)
+        paginator.exact_count_limit = 5
+        self.assertEqual(paginator.count, 6)
+        self.assertTrue(paginator.capped)
+        self.assertEqual(len(paginator.page(paginator.num_pages).object_list), 2)
+
+        # The proxy filter alone is counted on its index; more filters cap
+        sales = SalePurchase.objects.filter(purpose="sale").count()
+        with mock.patch.object(EstimatedCountPaginator, "exact_count_limit", 5):
+            response = self.client.get(reverse("admin:accounting_sale_changelist"))
+            self.assertContains(response, f"{sales} Sales")
+            self.assertFalse(response.context["cl"].paginator.capped)
+
+            response = self.client.get(reverse("admin:accounting_sale_changelist"), {"payment_mode__exact": "credit"})
+            self.assertContains(response, "5+ Sales")
+
+    def test_party_autocomplete_filters_by_party_type(self):
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "",
+                "app_label": "accounting",
+                "model_name": "sale",
+                "field_name": "party",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        names = [r["text"] for r in response.json()["results"]]
+        self.assertEqual(len(names), 1)
+        self.assertIn("Ravi Traders", names[0])
+
+
+# =====================================================
+# PARTY / PRODUCT SEARCH INDEX
+# =====================================================
+
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.ravi = Party.objects.create(name="Ravi Traders", party_type="customer", phone="9810000001")
+        cls.ravindra = Party.objects.create(name="Ravindra Plastics", party_type="customer", phone="9820000002")
+        cls.shree = Party.objects.create(name="Shree Polymers", party_type="supplier", phone="9830000003")
+        cls.hdpe = Inventory.objects.create(name="HDPE Granules")
+        cls.ldpe = Inventory.objects.create(name="LDPE Film Roll")
+
+    def test_prefix_matches_rank_first(self):
+        from . import search
+
+        results = list(search.search_parties("ravi"))
+        self.assertEqual(results[:2], [self.ravi, self.ravindra])
+
+    def test_phone_and_substring_lookup(self):
+        from . import search
+
+        self.assertEqual(list(search.search_parties("98300")), [self.shree])
+        self.assertEqual(list(search.search_inventory("film")), [self.ldpe])
+
+    def test_typo_tolerant_match(self):
+        from . import search
+
+        self.assertEqual(list(search.search_parties("polimers"))[0], self.shree)
+
+    def test_index_follows_save_and_delete(self):
+        from . import search
+
+        self.hdpe.name = "HDPE Virgin Granules"
+        self.hdpe.save()
+        self.assertEqual(list(search.search_inventory("virgin")), [self.hdpe])
+
+        party = Party.objects.create(name="Zeta Exports", party_type="customer")
+        self.assertEqual(list(search.search_parties("zeta")), [party])
+        party.delete()
+        self.assertEqual(list(search.search_parties("zeta")), [])
+
+    def test_search_api(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/search/", {"q": "shree"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["parties"][0]["id"], self.shree.pk)
+        self.assertIn("inventory", response.json())
+
+    def test_admin_search_ranks_within_the_filtered_queryset(self):
+        # Enough suppliers to fill the autocomplete limit on their own
+        suppliers = Party.objects.bulk_create(
+            [Party(name=f"Ravi Supplier {i:03d}", party_type="supplier") for i in range(60)]
+        )
+        from . import search
+        search.index_many(Party, suppliers)
+        self.client.force_login(self.user)
+
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {"term": "ravi", "app_label": "accounting", "model_name": "sale", "field_name": "party"},
+        )
+        ids = [r["id"] for r in response.json()["results"]]
+        self.assertEqual(ids, [str(self.ravi.pk), str(self.ravindra.pk)])
+
+        response = self.client.get(
+            reverse("admin:accounting_party_changelist"), {"q": "ravi", "party_type": "customer"}
+        )
+        self.assertEqual(list(response.context["cl"].result_list), [self.ravi, self.ravindra])
+
+        # Every match, not the autocomplete limit; prefix matches first
+        response = self.client.get(reverse("admin:accounting_party_changelist"), {"q": "ravi", "all": ""})
+        self.assertEqual(response.context["cl"].result_count, 62)
+        response = self.client.get(reverse("admin:accounting_party_changelist"), {"q": "polimers"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.shree])
+
+    def test_lookup_latency_at_100k_parties(self):
+        from . import search
+
+        Party.objects.bulk_create(
+            [
+                Party(name=f"Party {i:06d} Enterprises", party_type="customer", phone=f"9{i:09d}")
+                for i in range(100000)
+            ],
+            batch_size=5000,
+        )
+        search.rebuild_index()
+
+        timings = []
+        for term in ("party 0421", "9000012", "Enterprizes 09", "ravi", "polymers"):
+            started = time.perf_counter()
+            list(search.search_parties(term))
+            timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        self.assertLess(timings[len(timings) // 2], 0.010)
+
+
+# =====================================================
+# LEDGERS (CLASSIC AND STREAMING)
+# =====================================================
+
+class LedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+        cls.account.opening_balance = Decimal("500")
+        cls.account.save()
+        Account.objects.filter(pk=cls.account.pk).update(balance=Decimal("500"))
+        cls.account.refresh_from_db()
+
+        SalePurchase(purpose="sale", payment_mode="credit", party=cls.customer,
+                     inventory=cls.product, quantity=Decimal("10"), price_per_unit=Decimal("90.25")).save()
+        SalePurchase(purpose="sale", payment_mode="cash", party=cls.customer, account=cls.account,
+                     inventory=cls.product, quantity=Decimal("2"), price_per_unit=Decimal("95")).save()
+        SalePurchase(purpose="purchase", payment_mode="credit", party=cls.supplier,
+                     inventory=cls.product, quantity=Decimal("50"), price_per_unit=Decimal("80.10")).save()
+        CashBankTransaction(transaction_type="receive", party=cls.customer,
+                            account=cls.account, amount=Decimal("300.50")).save()
+        CashBankTransaction(transaction_type="pay", party=cls.supplier,
+                            account=cls.account, amount=Decimal("1000")).save()
+
+        for model in (Account, Party, Inventory):
+            for obj in model.objects.all():
+                obj.refresh_from_db()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_closing_balances_match_stored_balances(self):
+        from .ledger import AccountLedger, PartyLedger, StockLedger
+
+        self.customer.refresh_from_db()
+        self.supplier.refresh_from_db()
+        self.account.refresh_from_db()
+        self.product.refresh_from_db()
+
+        self.assertEqual(PartyLedger(self.customer).rows()[-1]["balance"], self.customer.credit_balance)
+        self.assertEqual(PartyLedger(self.supplier).rows()[-1]["balance"], self.supplier.credit_balance)
+        self.assertEqual(AccountLedger(self.account).rows()[-1]["balance"], self.account.balance)
+        self.assertEqual(StockLedger(self.product).rows()[-1]["stock"], self.product.quantity)
+        self.assertEqual(StockLedger(self.product).rows()[0]["stock"], Decimal("990"))
+
+    def test_chunks_agree_with_full_ledger(self):
+        from .ledger import PartyLedger
+
+        source = PartyLedger(self.customer)
+        full = source.rows()
+        windows = source.rows(0, 1) + source.rows(1, 1) + source.rows(2, 5)
+        self.assertEqual(full, windows)
+
+    def test_rows_endpoint(self):
+        url = reverse("admin:party-ledger-rows", args=[self.customer.pk])
+        data = self.client.get(url, {"offset": 1, "limit": 10}).json()
+
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(len(data["rows"]), 2)
+        self.assertEqual(data["rows"][-1][-1], "602.00")
+
+    def test_stream_mode_renders_shell_only(self):
+        url = reverse("admin:account-ledger", args=[self.account.pk])
+
+        response = self.client.get(url, {"view": "stream"})
+        self.assertContains(response, "ledger-stream")
+        self.assertEqual(response.context["ledger"], [])
+
+        response = self.client.get(url)
+        self.assertNotContains(response, "ledger-stream")
+        self.assertEqual(len(response.context["ledger"]), 3)
+
+    def test_zero_totals_are_shown(self):
+        idle = Account.objects.create(name="Idle", account_type="cash")
+        response = self.client.get(reverse("admin:account-ledger", args=[idle.pk]))
+
+        self.assertEqual(response.context["totals"]["debit"], 0)
+        self.assertNotContains(response, "…</span>")
+
+    def test_time_to_first_row_on_long_ledger(self):
+        from .ledger import PartyLedger
+
+        bulk_transactions(50000, self.account, self.customer, self.supplier, self.product)
+
+        started = time.perf_counter()
+        shell = self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]))
+        first = self.client.get(reverse("admin:party-ledger-rows", args=[self.customer.pk]))
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(shell.context["stream"])
+        self.assertEqual(len(first.json()["rows"]), 200)
+        self.assertLess(elapsed, 0.200)
+
+        totals = self.client.get(
+            reverse("admin:party-ledger-rows", args=[self.customer.pk]), {"totals": 1}
+        ).json()
+        self.assertEqual(totals["closing"], str(PartyLedger(self.customer).closing()))
+
+    async def test_async_ledger_endpoints(self):
+        from .ledger import PartyLedger
+
+        args = ["party", self.customer.pk]
+        response = await self.async_client.get(reverse("ledger-rows", args=args))
+        self.assertEqual(response.status_code, 403)
+
+        await self.async_client.aforce_login(self.user)
+
+        data = (await self.async_client.get(reverse("ledger-rows", args=args), {"offset": 1, "limit": 10})).json()
+        self.assertEqual(data, await PartyLedger(self.customer).achunk(1, 10))
+        self.assertEqual(data["rows"][-1][-1], "602.00")
+
+        totals = (await self.async_client.get(reverse("ledger-totals", args=args))).json()
+        self.assertEqual(totals["closing"], "602.00")
+
+        response = await self.async_client.get(reverse("ledger-monthly", args=args))
+        months = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual(months[-1]["closing"], "602.00")
+
+        response = await self.async_client.get(reverse("ledger-export", args=["account", self.account.pk]))
+        lines = b"".join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(lines[0], "Date,Type,Party,Debit,Credit,Balance")
+        self.assertEqual(lines[-1].rsplit(",", 1)[1], str(self.account.balance))
+
+        response = await self.async_client.get(reverse("ledger-rows", args=["nope", 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_stream_matches_rows_across_batches(self):
+        from .ledger import StockLedger
+
+        source = StockLedger(self.product)
+        streamed = [entry async for entry in source.astream(batch_size=2)]
+        self.assertEqual(streamed, await source.arows())
+
+
+# =====================================================
+# INTEGER LEDGER CORE
+# =====================================================
+
+class LedgerCoreTests(TestCase):
+
+    def test_agrees_with_decimal_arithmetic(self):
+        import random
+        from .ledger_core import LedgerCore, to_decimal, to_minor
+
+        rng = random.Random(3)
+        amounts = [Decimal(rng.randint(-10**8, 10**8)) / 100 for _ in range(5000)]
+        days = sorted(rng.randrange(738000, 738400) for _ in amounts)
+        opening = Decimal("1234.56")
+
+        core = LedgerCore([to_minor(a) for a in amounts], days, opening=to_minor(opening))
+        running = core.running()
+        credits, debits = core.splits()
+
+        balance = opening
+        for i, amount in enumerate(amounts):
+            balance += amount
+            self.assertEqual(to_decimal(running[i]), balance)
+            self.assertEqual(to_decimal(credits[i]), max(amount, 0))
+            self.assertEqual(to_decimal(debits[i]), max(-amount, 0))
+
+        totals = core.totals()
+        self.assertEqual(to_decimal(totals["closing"]), balance)
+        self.assertEqual(to_decimal(totals["credit"]), sum(a for a in amounts if a > 0))
+        self.assertEqual(to_decimal(totals["debit"]), -sum(a for a in amounts if a < 0))
+
+        boundaries = [738000, 738100, 738200, 738300]
+        periods = core.period_totals(boundaries)
+        for period, start, end in zip(periods, boundaries, boundaries[1:] + [10**9]):
+            in_period = [a for a, d in zip(amounts, days) if start <= d < end]
+            self.assertEqual(period["closing"] - period["opening"], to_minor(sum(in_period, Decimal(0))))
+        self.assertEqual(periods[-1]["closing"], totals["closing"])
+
+    def test_source_totals(self):
+        from .ledger import PartyLedger
+
+        _, customer, _, product = make_masters()
+        SalePurchase(purpose="sale", payment_mode="credit", party=customer,
+                     inventory=product, quantity=Decimal("3"), price_per_unit=Decimal("33.33")).save()
+        CashBankTransaction(transaction_type="receive", party=customer,
+                            account=Account.objects.get(), amount=Decimal("50.01")).save()
+
+        source = PartyLedger(customer)
+        self.assertEqual(source.totals()["credit"], Decimal("99.99"))
+        self.assertEqual(source.totals()["debit"], Decimal("50.01"))
+        self.assertEqual(source.closing(), Decimal("49.98"))
+        self.assertEqual(source.monthly_totals()[-1][1]["closing"], Decimal("49.98"))
+
+
+# =====================================================
+# MULTI-LINE INVOICES
+# =====================================================
+
+class InvoiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+        cls.film = Inventory.objects.create(name="LDPE Film", quantity=Decimal("200"))
+
+    def lines(self, count=20):
+        return [
+            SalePurchase(
+                inventory=self.product if i % 2 else self.film,
+                quantity=Decimal("1.5"),
+                price_per_unit=Decimal("10.10"),
+            )
+            for i in range(count)
+        ]
+
+    def test_post_applies_one_net_change(self):
+        from .models import Invoice
+
+        with CaptureQueriesContext(connection) as ctx:
+            invoice = Invoice(purpose="sale", payment_mode="credit", party=self.customer).post(self.lines())
+
+        # Query count does not depend on the number of lines (price
+        # history and stock alert upkeep add a fixed handful)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+        self.assertEqual(invoice.amount, Decimal("303.00"))
+        self.assertEqual(invoice.lines.count(), 20)
+
+        self.customer.refresh_from_db()
+        self.product.refresh_from_db()
+        self.film.refresh_from_db()
+        self.assertEqual(self.customer.credit_balance, Decimal("303.00"))
+        self.assertEqual(self.product.quantity, Decimal("985"))
+        self.assertEqual(self.film.quantity, Decimal("185"))
+
+    def test_post_is_atomic(self):
+        from django.core.exceptions import ValidationError
+        from .models import Invoice
+
+        lines = self.lines(2) + [SalePurchase(inventory=self.film, quantity=Decimal("500"), price_per_unit=Decimal("1"))]
+        with self.assertRaises(ValidationError):
+            Invoice(purpose="sale", payment_mode="credit", party=self.customer).post(lines)
+
+        self.assertFalse(Invoice.objects.exists())
+        self.film.refresh_from_db()
+        self.assertEqual(self.film.quantity, Decimal("200"))
+
+    def test_ledgers_show_invoice_with_lines(self):
+        from .ledger import PartyLedger, StockLedger
+        from .models import Invoice
+
+        Invoice(purpose="sale", payment_mode="credit", party=self.customer).post(self.lines(3))
+        SalePurchase(purpose="sale", payment_mode="credit", party=self.customer,
+                     inventory=self.film, quantity=Decimal("1"), price_per_unit=Decimal("5")).save()
+
+        ledger = PartyLedger(self.customer).rows()
+        self.assertEqual(len(ledger), 2)
+        self.assertEqual(len(ledger[0]["lines"]), 3)
+        self.assertEqual(ledger[-1]["balance"], Decimal("50.45"))
+
+        self.assertEqual(len(StockLedger(self.film).rows()), 3)
+
+        self.client.force_login(self.user)
+        data = self.client.get(reverse("admin:party-ledger-rows", args=[self.customer.pk])).json()
+        self.assertEqual(len(data["details"]["0"]), 3)
+
+    def test_invoice_api(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/invoices/",
+            {
+                "purpose": "purchase",
+                "payment_mode": "cash",
+                "party": self.supplier.pk,
+                "account": self.account.pk,
+                "lines": [
+                    {"inventory": self.product.pk, "quantity": "10", "price_per_unit": "80"},
+                    {"inventory": self.film.pk, "quantity": "5", "price_per_unit": "20"},
+                ],
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["amount"], "900.00")
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("-900.00"))
+
+    def test_admin_add_invoice(self):
+        from .models import Invoice
+
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("admin:accounting_invoice_add"),
+            {
+                "purpose": "sale",
+                "payment_mode": "credit",
+                "party": self.customer.pk,
+                "date_0": "2026-01-05",
+                "date_1": "10:00:00",
+                "lines-TOTAL_FORMS": "2",
+                "lines-INITIAL_FORMS": "0",
+                "lines-0-inventory": self.product.pk,
+                "lines-0-quantity": "2",
+                "lines-0-price_per_unit": "90",
+                "lines-1-inventory": self.film.pk,
+                "lines-1-quantity": "1",
+                "lines-1-price_per_unit": "15",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Invoice.objects.get().amount, Decimal("195.00"))
+
+    def test_admin_invoice_errors_return_to_the_form(self):
+        from .models import Invoice
+
+        self.client.force_login(self.user)
+        self.product.refresh_from_db()
+
+        def post(party, quantity):
+            return self.client.post(reverse("admin:accounting_invoice_add"), {
+                "purpose": "sale",
+                "payment_mode": "credit",
+                "party": party.pk,
+                "date_0": "2026-01-05",
+                "date_1": "10:00:00",
+                "lines-TOTAL_FORMS": "1",
+                "lines-INITIAL_FORMS": "0",
+                "lines-0-inventory": self.product.pk,
+                "lines-0-quantity": quantity,
+                "lines-0-price_per_unit": "90",
+            })
+
+        response = post(self.customer, str(self.product.quantity + 1))
+        self.assertContains(response, f"Not enough stock for {self.product.name}.")
+
+        response = post(self.supplier, "1")
+        self.assertContains(response, "Sale must be to customer.")
+
+        self.assertFalse(Invoice.objects.exists())
+
+
+# =====================================================
+# IDEMPOTENT POSTING
+# =====================================================
+
+class IdempotencyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_invoice(self, key, quantity="2"):
+        return self.client.post(
+            "/api/invoices/",
+            {
+                "purpose": "sale",
+                "payment_mode": "credit",
+                "party": self.customer.pk,
+                "lines": [{"inventory": self.product.pk, "quantity": quantity, "price_per_unit": "90"}],
+            },
+            content_type="application/json",
+            headers={"Idempotency-Key": key} if key else {},
+        )
+
+    def test_retry_replays_original_response(self):
+        from .models import Invoice
+
+        first = self.post_invoice("terminal-7-0001")
+        retry = self.post_invoice("terminal-7-0001")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+
+        self.assertEqual(Invoice.objects.count(), 1)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.credit_balance, Decimal("180.00"))
+
+    def test_key_reused_for_different_request(self):
+        self.post_invoice("terminal-7-0002")
+        response = self.post_invoice("terminal-7-0002", quantity="3")
+        self.assertEqual(response.status_code, 422)
+
+    def test_requests_without_key_are_unchanged(self):
+        from .models import Invoice
+
+        self.post_invoice(None)
+        self.post_invoice(None)
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_expired_keys_are_pruned_and_not_replayed(self):
+        from .idempotency import prune_expired
+        from .models import IdempotencyKey, Invoice
+
+        self.post_invoice("terminal-7-0003")
+        IdempotencyKey.objects.update(created_at=timezone.now() - timezone.timedelta(days=2))
+
+        self.post_invoice("terminal-7-0003")
+        self.assertEqual(Invoice.objects.count(), 2)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timezone.timedelta(days=2))
+        self.assertEqual(prune_expired(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+# =====================================================
+# FISCAL YEAR CLOSE / ARCHIVE
+# =====================================================
+
+class FiscalYearCloseTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+    def setUp(self):
+        from datetime import date
+        from .models import FiscalYear, Invoice
+
+        self.year = FiscalYear.objects.create(name="2024-25", start_date=date(2024, 4, 1), end_date=date(2025, 3, 31))
+
+        def at(*args):
+            return timezone.make_aware(timezone.datetime(*args))
+
+        # Closed-year activity
+        SalePurchase(purpose="sale", payment_mode="credit", party=self.customer, inventory=self.product,
+                     quantity=Decimal("10"), price_per_unit=Decimal("90"), date=at(2025, 1, 10)).save()
+        SalePurchase(purpose="purchase", payment_mode="cash", party=self.supplier, inventory=self.product,
+                     account=self.account, quantity=Decimal("20"), price_per_unit=Decimal("50"), date=at(2025, 2, 1)).save()
+        CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account,
+                            amount=Decimal("400"), date=at(2025, 3, 1)).save()
+        Invoice(purpose="sale", payment_mode="credit", party=self.customer, date=at(2025, 3, 15)).post([
+            SalePurchase(inventory=self.product, quantity=Decimal("2"), price_per_unit=Decimal("45.50")),
+        ])
+
+        # Next-year activity stays live (save() writes the whole row,
+        # so pick up the stock the invoice changed first)
+        self.product.refresh_from_db()
+        SalePurchase(purpose="sale", payment_mode="credit", party=self.customer, inventory=self.product,
+                     quantity=Decimal("1"), price_per_unit=Decimal("100"), date=at(2025, 6, 1)).save()
+
+    def test_close_carries_balances_forward_and_archives(self):
+        from .closing import close_year
+        from .ledger import PartyLedger, AccountLedger, StockLedger
+        from .models import ArchivedSalePurchase, ArchivedInvoice, ArchivedCashBankTransaction, YearBalance
+
+        result = close_year(self.year)
+        self.assertEqual(result["archived"], 5)
+
+        # Only next-year rows remain live
+        self.assertEqual(SalePurchase.objects.count(), 1)
+        self.assertFalse(CashBankTransaction.objects.exists())
+        self.assertEqual(ArchivedSalePurchase.objects.count(), 3)
+        self.assertEqual(ArchivedInvoice.objects.count(), 1)
+        self.assertEqual(ArchivedCashBankTransaction.objects.count(), 1)
+
+        # 900 + 91 - 400 owed at the year end becomes the new opening
+        self.customer.refresh_from_db()
+        self.account.refresh_from_db()
+        self.assertEqual(self.customer.opening_balance, Decimal("591.00"))
+        self.assertEqual(self.account.opening_balance, Decimal("-600.00"))
+
+        stock = YearBalance.objects.get(fiscal_year=self.year, inventory=self.product)
+        self.assertEqual((stock.opening, stock.closing), (Decimal("1000.00"), Decimal("1008.00")))
+
+        # Live ledgers still end on the stored balances
+        self.assertEqual(PartyLedger(self.customer).closing(), self.customer.credit_balance)
+        self.assertEqual(AccountLedger(self.account).closing(), self.account.balance)
+        self.assertEqual(StockLedger(self.product).totals()["opening"], Decimal("1008.00"))
+
+        # Archived year read on demand, with its invoice lines
+        archived = PartyLedger(self.customer, year=self.year)
+        rows = archived.rows()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1]["lines"][0]["product"], "HDPE Granules")
+        self.assertEqual(archived.totals()["opening"], Decimal("0.00"))
+        self.assertEqual(archived.closing(), Decimal("591.00"))
+
+    def test_closed_period_is_locked(self):
+        from django.core.exceptions import ValidationError
+        from .closing import close_year
+
+        close_year(self.year)
+
+        with self.assertRaises(ValidationError):
+            CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account,
+                                amount=Decimal("5"), date=timezone.make_aware(timezone.datetime(2025, 3, 31, 23))).save()
+
+        with self.assertRaises(ValidationError):
+            close_year(self.year)
+
+    def test_years_close_in_order(self):
+        from datetime import date
+        from django.core.exceptions import ValidationError
+        from .closing import close_year
+        from .models import FiscalYear
+
+        later = FiscalYear.objects.create(name="2025-26", start_date=date(2025, 4, 1), end_date=date(2026, 3, 31))
+        with self.assertRaises(ValidationError):
+            close_year(later)
+
+        current = FiscalYear.objects.create(name="2026-27", start_date=date(2026, 4, 1), end_date=date(2027, 3, 31))
+        close_year(self.year)
+        close_year(later)
+        with self.assertRaises(ValidationError):
+            close_year(current)
+
+    def test_admin_archived_ledger(self):
+        from .closing import close_year
+
+        close_year(self.year)
+        self.client.force_login(self.user)
+
+        url = reverse("admin:party-ledger", args=[self.customer.pk])
+        response = self.client.get(url, {"year": self.year.pk})
+        self.assertContains(response, "Showing closed year 2024-25")
+        self.assertEqual(len(response.context["ledger"]), 3)
+        # Apply / PDF stay on the closed year
+        self.assertContains(response, f'<input type="hidden" name="year" value="{self.year.pk}">')
+
+        rows = self.client.get(reverse("admin:party-ledger-rows", args=[self.customer.pk]),
+                               {"year": self.year.pk, "offset": 0, "limit": 10}).json()
+        self.assertEqual(rows["count"], 3)
+
+        # The year links to its balances, paged and filtered by kind
+        balances = reverse("admin:accounting_yearbalance_changelist")
+        response = self.client.get(reverse("admin:accounting_fiscalyear_change", args=[self.year.pk]))
+        self.assertContains(response, f"{balances}?fiscal_year__id__exact={self.year.pk}&amp;kind=party")
+        self.assertNotContains(response, "591.00")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(balances, {"fiscal_year__id__exact": self.year.pk, "kind": "party"})
+        self.assertContains(response, "591.00")
+        self.assertEqual({row.account_id for row in response.context["cl"].result_list}, {None})
+        self.assertLess(len(queries), 15)
+
+
+# =====================================================
+# MULTI-COMPANY ROUTING
+# =====================================================
+
+TEST_TENANTS = {
+    "acme": {"hosts": ["acme.example.com"], "company": {"name": "Acme Polymers", "short_name": "Acme"}},
+    "zen": {"hosts": ["zen.example.com"]},
+}
+
+
+class TenancyTests(TestCase):
+
+    def test_resolve_by_header_then_host(self):
+        from django.http import Http404
+        from django.test import RequestFactory, override_settings
+        from . import tenancy
+
+        factory = RequestFactory()
+
+        with override_settings(TENANTS=TEST_TENANTS, ALLOWED_HOSTS=["*"]):
+            self.assertEqual(tenancy.resolve(factory.get("/", HTTP_HOST="zen.example.com")), "zen")
+            self.assertEqual(tenancy.resolve(factory.get("/", HTTP_HOST="zen.example.com", HTTP_X_COMPANY="acme")), "acme")
+
+            with self.assertRaises(Http404):
+                tenancy.resolve(factory.get("/", HTTP_HOST="other.example.com"))
+            with self.assertRaises(Http404):
+                tenancy.resolve(factory.get("/", HTTP_X_COMPANY="nobody"))
+
+        # Single-company deployments always use 'default'
+        self.assertEqual(tenancy.resolve(factory.get("/")), "default")
+
+    def test_router_follows_active_tenant(self):
+        from .tenancy import TenantRouter, activate
+
+        router = TenantRouter()
+        self.assertEqual(router.db_for_write(Party), "default")
+
+        with activate("acme"):
+            self.assertEqual(router.db_for_read(Party), "acme")
+            self.assertEqual(router.db_for_write(SalePurchase), "acme")
+
+        self.assertEqual(router.db_for_read(Party), "default")
+
+    def test_branding_per_tenant(self):
+        from django.test import override_settings
+        from .tenancy import company
+
+        with override_settings(TENANTS=TEST_TENANTS):
+            self.assertEqual(company("acme")["name"], "Acme Polymers")
+            # Falls back to settings.COMPANY for anything not overridden
+            self.assertEqual(company("zen")["name"], "Bhavikha Plastic Pvt Ltd")
+
+        user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(user)
+
+        with override_settings(COMPANY={"name": "Test Co", "short_name": "Test", "gst": "-", "address": "-"}):
+            account = Account.objects.create(name="Cash", account_type="cash")
+            response = self.client.get(reverse("admin:account-ledger", args=[account.pk]))
+            self.assertContains(response, "<h2>Test Co</h2>", html=True)
+
+
+# =====================================================
+# REPORTING SNAPSHOT
+# =====================================================
+
+class ReportingSnapshotTests(TransactionTestCase):
+
+    def test_refresh_copies_database_with_backup_api(self):
+        import os
+        import sqlite3
+        import tempfile
+        from . import reporting
+
+        make_masters()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = reporting.refresh("default", os.path.join(directory, "books.snapshot"))
+
+            copy = sqlite3.connect(path)
+            try:
+                names = [row[0] for row in copy.execute("SELECT name FROM accounting_party ORDER BY name")]
+            finally:
+                copy.close()
+
+            self.assertEqual(names, ["Ravi Traders", "Shree Polymers"])
+            self.assertIsNotNone(reporting.taken_at(path=path))
+            self.assertFalse(os.path.exists(path + ".partial"))
+
+    def test_reads_stay_live_without_snapshot(self):
+        from . import reporting
+
+        router = reporting.ReportingRouter()
+
+        with reporting.reads() as alias:
+            self.assertIsNone(alias)
+            self.assertIsNone(router.db_for_read(Party))
+            self.assertIsNone(reporting.status())
+
+        # Writes are never routed to the snapshot, and it is never migrated
+        self.assertFalse(hasattr(router, "db_for_write"))
+        self.assertFalse(router.allow_migrate("default_snapshot", "accounting"))
+
+
+# =====================================================
+# BACKGROUND JOBS
+# =====================================================
+
+class JobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        results = override_settings(JOBS_RESULTS_DIR=directory.name)
+        results.enable()
+        self.addCleanup(results.disable)
+
+    def test_admin_action_queues_export_and_download(self):
+        from . import jobs
+        from .models import Job
+
+        CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account, amount=Decimal("25")).save()
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse("admin:accounting_party_changelist"), {
+            "action": "export_party_ledgers",
+            "_selected_action": [self.customer.pk, self.supplier.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+
+        # Returned before doing the work
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.status, job.created_by), ("export_ledgers", Job.QUEUED, self.user))
+
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), (Job.SUCCEEDED, 100))
+        self.assertEqual(job.result["rows"], 1)
+
+        response = self.client.get(reverse("admin:job-download", args=[job.pk]))
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("Ravi Traders,", content)
+        self.assertIn("-25.00", content)
+
+        self.assertContains(self.client.get(reverse("admin:accounting_job_changelist")), "Download")
+
+        # Staff without the Job view permission cannot fetch the file
+        clerk = User.objects.create_user("clerk", password="pass", is_staff=True)
+        self.client.force_login(clerk)
+        self.assertEqual(self.client.get(reverse("admin:job-download", args=[job.pk])).status_code, 403)
+
+    def test_export_reads_ledgers_as_they_stood_at_the_start(self):
+        import csv
+        import os
+        from django.conf import settings
+        from . import jobs, tasks
+        from .ledger import PartyLedger
+        from .models import Job
+
+        for amount in range(1, 6):
+            CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account,
+                                amount=Decimal(amount)).save()
+        source = PartyLedger(self.customer)
+        expected = [["Ravi Traders", *source.render_row(entry)] for entry in source.rows()]
+
+        set_progress = Job.set_progress
+
+        def post_meanwhile(job, *args, **kwargs):
+            # A backdated receipt lands between two batches
+            CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account,
+                                amount=Decimal("1000"), date=timezone.now() - timezone.timedelta(days=1)).save()
+            return set_progress(job, *args, **kwargs)
+
+        job = jobs.enqueue("export_ledgers", kind="party", ids=[self.customer.pk])
+        with mock.patch.object(tasks, "EXPORT_BATCH", 2), mock.patch.object(Job, "set_progress", post_meanwhile):
+            jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result["rows"]), (Job.SUCCEEDED, 5))
+        with open(os.path.join(settings.JOBS_RESULTS_DIR, job.result["file"]), newline="") as handle:
+            self.assertEqual(list(csv.reader(handle))[1:], expected)
+
+    def test_cancel_and_failure(self):
+        from . import jobs
+        from .models import Job
+
+        @jobs.task("test_slow")
+        def slow(job, steps):
+            for step in range(steps):
+                if step == 1:
+                    job.cancel()
+                job.set_progress(step, steps)
+            return "finished"
+
+        @jobs.task("test_broken")
+        def broken(job):
+            raise RuntimeError("boom")
+
+        queued = jobs.enqueue("test_slow", steps=3)
+        queued.cancel()
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, Job.CANCELLED)
+
+        running = jobs.enqueue("test_slow", steps=3)
+        failing = jobs.enqueue("test_broken")
+
+        # Check for cancellation on every progress call
+        with mock.patch.object(Job, "PROGRESS_INTERVAL", 0), self.assertLogs("accounting.jobs", "ERROR"):
+            jobs.run_pending()
+
+        running.refresh_from_db()
+        failing.refresh_from_db()
+        self.assertEqual(running.status, Job.CANCELLED)
+        self.assertEqual(failing.status, Job.FAILED)
+        self.assertIn("RuntimeError: boom", failing.error)
+
+        with self.assertRaises(KeyError):
+            jobs.enqueue("no_such_task")
+
+
+class JobRunnerTests(TransactionTestCase):
+
+    def test_thread_pool_runs_queued_jobs(self):
+        from . import jobs
+        from .models import Job
+
+        make_masters()
+
+        runner = jobs.JobRunner(workers=2, poll_interval=0.05).start()
+        self.addCleanup(runner.stop)
+
+        queued = [jobs.enqueue("rebuild_search_index") for _ in range(3)]
+        runner.wake()
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if not Job.objects.filter(status__in=(Job.QUEUED, Job.RUNNING)).exists():
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(
+            list(Job.objects.filter(pk__in=[job.pk for job in queued]).values_list("status", flat=True)),
+            [Job.SUCCEEDED] * 3,
+        )
+
+
+# =====================================================
+# BOOKS BACKUP / RESTORE
+# =====================================================
+
+class BackupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        account, customer, supplier, product = make_masters()
+
+        SalePurchase(purpose="sale", payment_mode="credit", party=customer,
+                     inventory=product, quantity=Decimal("3"), price_per_unit=Decimal("90.25")).save()
+        CashBankTransaction(transaction_type="receive", party=customer,
+                            account=account, amount=Decimal("100.10")).save()
+
+    def test_round_trip_restores_identical_rows(self):
+        import os
+        import tempfile
+        from . import backup
+
+        before = {
+            model: list(model.objects.order_by("pk").values_list())
+            for model in backup.MODELS
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = backup.export_books(directory, chunk_rows=1)
+            self.assertEqual(len(manifest["tables"][1]["files"]), 2)   # two parties, one per file
+            self.assertEqual(manifest["figures"]["party"]["mismatched"], 0)
+
+            with self.assertRaises(backup.BackupError):
+                backup.import_books(directory)
+
+            restored = backup.import_books(directory, replace=True)
+
+            self.assertEqual(restored, manifest["figures"])
+            for model, rows in before.items():
+                self.assertEqual(list(model.objects.order_by("pk").values_list()), rows, model)
+
+            # a damaged chunk is refused before anything is written
+            name = manifest["tables"][0]["files"][0]["name"]
+            with open(os.path.join(directory, name), "ab") as handle:
+                handle.write(b"x")
+
+            with self.assertRaisesMessage(backup.BackupError, "checksum"):
+                backup.import_books(directory, replace=True)
+
+
+# =====================================================
+# MASTER DATA IMPORT
+# =====================================================
+
+class MasterImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def load(self, kind, text):
+        import io
+        from .master_import import import_masters, read_table
+
+        return import_masters(kind, read_table(io.BytesIO(text.encode()), f"{kind}.csv"))
+
+    def test_upsert_sets_and_shifts_balances(self):
+        result = self.load("party", (
+            "Name,Party Type,Phone,Opening Balance\n"
+            "Ravi Traders,Customer,9810000001,1500.50\n"
+            "Shree Polymers,supplier,,-200\n"
+        ))
+        self.assertEqual(result["created"], 2)
+
+        ravi = Party.objects.get(name="Ravi Traders")
+        self.assertEqual(ravi.credit_balance, Decimal("1500.50"))
+
+        product = Inventory.objects.create(name="HDPE Granules", quantity=Decimal("1000"))
+        SalePurchase(purpose="sale", payment_mode="credit", party=ravi,
+                     inventory=product, quantity=Decimal("1"), price_per_unit=Decimal("100")).save()
+
+        # corrected opening: the posting above stays counted
+        result = self.load("party", "name,party_type,phone,opening_balance\nRavi Traders,customer,9810000001,1000\n")
+        self.assertEqual((result["created"], result["updated"]), (0, 1))
+
+        ravi.refresh_from_db()
+        self.assertEqual(ravi.opening_balance, Decimal("1000"))
+        self.assertEqual(ravi.credit_balance, Decimal("1100.00"))
+
+        from . import search
+        self.assertEqual(list(search.search_parties("shree")), [Party.objects.get(name="Shree Polymers", phone="")])
+
+        result = self.load("inventory", "name,unit,quantity\nHDPE Granules,kg,5\nLDPE Film,pcs,40\n")
+        self.assertEqual(result["stock_kept"], 1)
+        self.assertEqual(Inventory.objects.get(name="HDPE Granules").quantity, Decimal("999"))
+        self.assertEqual(Inventory.objects.get(name="LDPE Film").quantity, Decimal("40"))
+
+    def test_every_bad_row_is_reported_and_nothing_written(self):
+        from .master_import import ImportFailed
+
+        with self.assertRaises(ImportFailed) as caught:
+            self.load("account", (
+                "name,account_type,opening_balance\n"
+                "Cash,cash,100\n"
+                ",bank,5\n"
+                "HDFC,savings,abc\n"
+                "Cash,bank,0\n"
+            ))
+
+        lines = [line for line, _ in caught.exception.errors]
+        self.assertEqual(lines, [3, 4, 5])
+        self.assertIn("account_type", caught.exception.errors[1][1])
+        self.assertIn("opening_balance", caught.exception.errors[1][1])
+        self.assertFalse(Account.objects.exists())
+
+    def test_admin_import_page(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_login(self.user)
+        url = reverse("admin:accounting_inventory_import")
+
+        self.assertContains(self.client.get(reverse("admin:accounting_inventory_changelist")), url)
+
+        upload = SimpleUploadedFile("items.csv", b"name,unit,default_price\nPP Sheet,kg,oops\n")
+        response = self.client.post(url, {"file": upload})
+        self.assertContains(response, "default_price")
+        self.assertFalse(Inventory.objects.exists())
+
+        upload = SimpleUploadedFile("items.csv", b"name,unit,default_price\nPP Sheet,kg,120.5\n")
+        response = self.client.post(url, {"file": upload})
+        self.assertRedirects(response, reverse("admin:accounting_inventory_changelist"))
+        self.assertEqual(Inventory.objects.get().default_price, Decimal("120.50"))
+
+
+# =====================================================
+# CASH-FLOW SERIES
+# =====================================================
+
+class CashFlowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+        cls.bank = Account.objects.create(name="HDFC", account_type="bank", opening_balance=Decimal("1000"))
+
+        day = timezone.make_aware(timezone.datetime(2026, 3, 30, 10))  # a Monday
+        for offset, kind, amount in ((0, "receive", "100.50"), (1, "pay", "40"), (8, "receive", "10"), (33, "pay", "5.25")):
+            party = cls.customer if kind == "receive" else cls.supplier
+            CashBankTransaction(transaction_type=kind, party=party, account=cls.account,
+                                amount=Decimal(amount), date=day + timezone.timedelta(days=offset)).save()
+        SalePurchase(purpose="sale", payment_mode="cash", party=cls.customer, account=cls.account,
+                     inventory=cls.product, quantity=Decimal("2"), price_per_unit=Decimal("95"),
+                     date=day + timezone.timedelta(days=2)).save()
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def series(self, granularity, **params):
+        response = self.client.get(reverse("cash-flow"), {"granularity": granularity, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_buckets_match_the_ledger(self):
+        from .ledger import AccountLedger
+
+        data = self.series("week", start="2026-03-30", end="2026-05-10")
+        self.assertEqual(data["periods"][:3], ["2026-03-30", "2026-04-06", "2026-04-13"])
+
+        cash = next(series for series in data["accounts"] if series["id"] == self.account.pk)
+        self.assertEqual(cash["opening"], "0.00")
+        self.assertEqual(cash["inflow"][:2], ["290.50", "10.00"])
+        self.assertEqual(cash["outflow"][:2], ["40.00", "0.00"])
+        self.assertEqual(cash["balance"][-1], str(AccountLedger(self.account).closing()))
+
+        bank = next(series for series in data["accounts"] if series["id"] == self.bank.pk)
+        self.assertEqual(set(bank["balance"]), {"1000.00"})
+
+        # a later start carries everything before it in the opening
+        data = self.series("month", start="2026-04-15", end="2026-05-31", account=str(self.account.pk))
+        self.assertEqual(data["periods"], ["2026-04-01", "2026-05-01"])
+        self.assertEqual(data["accounts"][0]["opening"], "60.50")
+        self.assertEqual(data["accounts"][0]["balance"], ["260.50", "255.25"])
+
+        days = self.series("day", start="2026-03-30", end="2026-04-02")
+        self.assertEqual(len(days["periods"]), 4)
+
+    def test_cached_until_a_posting(self):
+        params = {"start": "2026-03-30", "end": "2026-05-31", "account": str(self.account.pk)}
+        before = self.series("month", **params)["accounts"][0]["balance"]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.series("month", **params)["accounts"][0]["balance"], before)
+        self.assertFalse([query for query in queries if "julianday" in query["sql"]])
+
+        CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account,
+                            amount=Decimal("1"), date=timezone.make_aware(timezone.datetime(2026, 5, 2))).save()
+        after = self.series("month", **params)["accounts"][0]["balance"]
+        self.assertEqual(Decimal(after[-1]) - Decimal(before[-1]), Decimal("1"))
+
+    def test_key_follows_the_data_not_this_process(self):
+        from django.db import transaction
+        from . import timeseries
+
+        params = {"start": "2026-03-30", "end": "2026-05-31", "account": str(self.account.pk)}
+        before = self.series("month", **params)["accounts"][0]["balance"]
+
+        # A rolled-back posting leaves the cached series in place
+        state = timeseries.fingerprint()
+        with self.assertRaises(ValueError), transaction.atomic():
+            CashBankTransaction(transaction_type="receive", party=self.customer, account=self.account,
+                                amount=Decimal("7"), date=timezone.make_aware(timezone.datetime(2026, 5, 2))).save()
+            raise ValueError
+        self.assertEqual(timeseries.fingerprint(), state)
+
+        # A write that sends no signals (another worker, raw bulk insert)
+        CashBankTransaction.objects.bulk_create([CashBankTransaction(
+            transaction_type="receive", party=self.customer, account=self.account,
+            amount=Decimal("3"), date=timezone.make_aware(timezone.datetime(2026, 5, 3)),
+        )])
+        after = self.series("month", **params)["accounts"][0]["balance"]
+        self.assertEqual(Decimal(after[-1]) - Decimal(before[-1]), Decimal("3"))
+
+    def test_history_survives_a_year_close(self):
+        from datetime import date
+        from .closing import close_year
+        from .models import FiscalYear
+
+        Account.objects.filter(pk=self.account.pk).update(opening_balance=Decimal("25"))
+        self.account.refresh_from_db()
+
+        params = {"start": "2026-03-23", "end": "2026-05-10"}
+        before = self.series("week", **params)
+
+        # Archives the rows of 30 and 31 March
+        close_year(FiscalYear.objects.create(name="2025-26", start_date=date(2025, 4, 1), end_date=date(2026, 3, 31)))
+        self.assertEqual(self.series("week", **params), before)
+
+        cash = next(series for series in before["accounts"] if series["id"] == self.account.pk)
+        self.assertEqual(cash["balance"][:2], ["25.00", "275.50"])
+        self.assertEqual(cash["inflow"][1], "290.50")
+
+    def test_bad_parameters(self):
+        for params in ({"granularity": "year"}, {"start": "yesterday"}, {"start": "2026-05-01", "end": "2026-04-01"}):
+            response = self.client.get(reverse("cash-flow"), params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.json())
+
+    def test_years_of_daily_buckets_for_every_account(self):
+        bulk_transactions(50000, self.account, self.customer, self.supplier, self.product)
+        for number in range(10):
+            account = Account.objects.create(name=f"Bank {number}", account_type="bank")
+            bulk_transactions(2000, account, self.customer, self.supplier, self.product)
+
+        started = time.perf_counter()
+        data = self.series("day")
+        elapsed = time.perf_counter() - started
+
+        self.assertGreater(len(data["periods"]), 2000)
+        self.assertEqual(len(data["accounts"]), 12)
+        self.assertLess(elapsed, 1.0)
+
+
+# =====================================================
+# LAST RATES
+# =====================================================
+
+class PriceHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+        cls.other = Party.objects.create(name="Mehta Plastics", party_type="customer")
+
+    def sell(self, party, price, days_ago=0):
+        SalePurchase(purpose="sale", payment_mode="credit", party=party, inventory=self.product,
+                     quantity=Decimal("1"), price_per_unit=Decimal(price),
+                     date=timezone.now() - timezone.timedelta(days=days_ago)).save()
+
+    def test_postings_keep_newest_rates(self):
+        from .pricing import DEPTH, last_rates
+
+        self.assertEqual(last_rates(self.product, self.customer)["suggested"], "90.00")
+
+        for day, price in enumerate(["91", "92", "93", "94", "95", "96"]):
+            self.sell(self.customer, price, days_ago=10 - day)
+        self.sell(self.other, "99.5", days_ago=1)
+        # back-dated: older than everything above, so not among the newest
+        self.sell(self.customer, "50", days_ago=30)
+
+        rates = last_rates(self.product, self.customer)
+        self.assertEqual([rate["price"] for rate in rates["party_rates"]], ["96.00", "95.00", "94.00", "93.00", "92.00"])
+        self.assertEqual(rates["suggested"], "96.00")
+        self.assertEqual(rates["rates"][0]["party_name"], "Mehta Plastics")
+        self.assertEqual(len(rates["rates"]), DEPTH)
+
+        # a party with no history gets the latest rate anyone got
+        walk_in = Party.objects.create(name="Walk-in", party_type="customer")
+        self.assertEqual(last_rates(self.product, walk_in)["suggested"], "99.50")
+        self.assertEqual(last_rates(self.product, self.supplier, "purchase")["rates"], [])
+
+    def test_invoice_lines_and_rebuild(self):
+        from .models import Invoice, PriceHistory
+        from .pricing import last_rates, rebuild
+
+        self.sell(self.customer, "90", days_ago=2)
+        Invoice(purpose="sale", payment_mode="credit", party=self.other).post([
+            SalePurchase(inventory=self.product, quantity=Decimal("2"), price_per_unit=Decimal("88.40")),
+        ])
+        SalePurchase(purpose="purchase", payment_mode="credit", party=self.supplier, inventory=self.product,
+                     quantity=Decimal("5"), price_per_unit=Decimal("70")).save()
+
+        self.assertEqual(last_rates(self.product, self.other)["suggested"], "88.40")
+        self.assertEqual(last_rates(self.product, self.customer)["rates"][0]["price"], "88.40")
+        self.assertEqual(last_rates(self.product, self.supplier, "purchase")["suggested"], "70.00")
+
+        incremental = sorted(PriceHistory.objects.values_list("purpose", "inventory", "party", "rates"), key=str)
+        self.assertEqual(rebuild(), 5)
+        self.assertEqual(sorted(PriceHistory.objects.values_list("purpose", "inventory", "party", "rates"), key=str), incremental)
+
+    def test_api_and_admin_form(self):
+        self.sell(self.customer, "91.25")
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("last-rates"), {"inventory": self.product.pk, "party": self.customer.pk})
+        self.assertEqual(response.json()["suggested"], "91.25")
+        self.assertEqual(len([query for query in queries if "pricehistory" in query["sql"]]), 1)
+
+        response = self.client.get(reverse("last-rates"), {"inventory": self.product.pk, "purpose": "refund"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse("last-rates"), {"inventory": 0}).status_code, 404)
+
+        response = self.client.get(reverse("admin:accounting_sale_add"))
+        self.assertContains(response, "js/rates.js")
+        self.assertContains(response, 'data-purpose="sale"')
+
+
+# =====================================================
+# STOCK ALERTS
+# =====================================================
+
+class StockAlertTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+        cls.film = Inventory.objects.create(name="LDPE Film", quantity=Decimal("100"), min_cover_days=150)
+
+    def post(self, purpose, product, quantity, days_ago=0):
+        party = self.customer if purpose == "sale" else self.supplier
+        SalePurchase(purpose=purpose, payment_mode="credit", party=party, inventory=product,
+                     quantity=Decimal(quantity), price_per_unit=Decimal("10"),
+                     date=timezone.now() - timezone.timedelta(days=days_ago)).save()
+
+    def test_reorder_level_alert_comes_and_goes(self):
+        from .models import StockAlert
+
+        self.product.reorder_level = Decimal("995")
+        self.product.save()
+        self.post("sale", self.product, "2")
+        self.assertFalse(StockAlert.objects.filter(inventory=self.product).exists())
+
+        self.post("sale", self.product, "3")
+        alert = StockAlert.objects.get(inventory=self.product)
+        self.assertEqual(alert.quantity, Decimal("995"))
+        self.assertTrue(alert.below_reorder_level)
+        self.assertFalse(alert.below_cover)
+
+        since = alert.since
+        self.post("sale", self.product, "1")
+        self.assertEqual(StockAlert.objects.get(inventory=self.product).since, since)
+
+        self.post("purchase", self.product, "50")
+        self.assertFalse(StockAlert.objects.exists())
+
+    def test_days_of_cover_uses_rolling_sales(self):
+        from .models import Invoice, StockAlert, StockDay
+        from .stock import rebuild, refresh
+
+        for days_ago in (1, 5, 9):
+            self.post("sale", self.film, "4", days_ago=days_ago)
+        Invoice(purpose="sale", payment_mode="credit", party=self.customer).post([
+            SalePurchase(inventory=self.film, quantity=Decimal("8"), price_per_unit=Decimal("10")),
+        ])
+
+        # 20 sold over 30 days, 80 left: 120 days of cover, under 150
+        alert = StockAlert.objects.get(inventory=self.film)
+        self.assertEqual(alert.daily_usage, Decimal("0.667"))
+        self.assertEqual(alert.days_of_cover, Decimal("120.0"))
+        self.assertTrue(alert.below_cover)
+
+        buckets = sorted(StockDay.objects.values_list("inventory", "day", "sold"))
+        self.assertEqual(rebuild(), 1)
+        self.assertEqual(sorted(StockDay.objects.values_list("inventory", "day", "sold")), buckets)
+
+        # a month later nothing sold recently: the alert clears
+        self.assertEqual(refresh(today=timezone.localdate() + timezone.timedelta(days=40)), 0)
+        self.assertFalse(StockDay.objects.exists())
+
+    def test_void_comes_off_the_sale_day(self):
+        from . import voiding
+        from .models import StockDay
+        from .stock import rebuild
+
+        self.post("sale", self.film, "4", days_ago=5)
+        self.post("sale", self.film, "6", days_ago=60)
+        self.post("sale", self.film, "3")
+        recent, old = SalePurchase.objects.filter(inventory=self.film).order_by("-date")[1:]
+        voiding.void(sales=SalePurchase.objects.filter(pk__in=[recent.pk, old.pk]))
+
+        # Not on today's bucket; the 60-day-old sale left the window
+        buckets = sorted(StockDay.objects.values_list("day", "sold"))
+        self.assertEqual(buckets, [
+            (timezone.localdate(recent.date), Decimal("0")),
+            (timezone.localdate(), Decimal("3")),
+        ])
+        rebuild()
+        self.assertEqual(sorted(StockDay.objects.values_list("day", "sold")), buckets)
+
+    def test_alerts_without_cover_sort_last(self):
+        from .models import StockAlert
+        from .stock import evaluate
+
+        self.product.reorder_level = Decimal("5000")
+        self.product.save()
+        self.post("sale", self.film, "30")
+        evaluate([self.product.pk])
+
+        self.assertEqual([alert.inventory_id for alert in StockAlert.objects.all()], [self.film.pk, self.product.pk])
+        self.assertIsNone(StockAlert.objects.get(inventory=self.product).days_of_cover)
+
+        plan = StockAlert.objects.all().explain()
+        self.assertIn("stock_alert_urgency", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_api_and_admin_list(self):
+        self.post("sale", self.film, "30")
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse("stock-alerts")).json()["alerts"]
+        self.assertEqual([alert["name"] for alert in data], ["LDPE Film"])
+        self.assertEqual(data[0]["days_of_cover"], "70.0")
+        self.assertFalse([query for query in queries if "salepurchase" in query["sql"]])
+
+        self.assertEqual(self.client.get(reverse("stock-alerts"), {"reason": "reorder"}).json()["alerts"], [])
+        self.assertContains(self.client.get(reverse("admin:accounting_stockalert_changelist")), "LDPE Film")
+
+
+# =====================================================
+# VOIDING
+# =====================================================
+
+class VoidTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+    def setUp(self):
+        from .models import Invoice
+
+        self.credit_sale = SalePurchase(purpose="sale", payment_mode="credit", party=self.customer,
+                                        inventory=self.product, quantity=Decimal("10"), price_per_unit=Decimal("90.25"))
+        self.credit_sale.save()
+        self.cash_purchase = SalePurchase(purpose="purchase", payment_mode="cash", party=self.supplier, account=self.account,
+                                          inventory=self.product, quantity=Decimal("4"), price_per_unit=Decimal("80"))
+        self.cash_purchase.save()
+        self.receipt = CashBankTransaction(transaction_type="receive", party=self.customer,
+                                           account=self.account, amount=Decimal("300.50"))
+        self.receipt.save()
+        self.invoice = Invoice(purpose="sale", payment_mode="cash", party=self.customer, account=self.account).post([
+            SalePurchase(inventory=self.product, quantity=Decimal("2"), price_per_unit=Decimal("95")),
+            SalePurchase(inventory=self.product, quantity=Decimal("1.5"), price_per_unit=Decimal("100")),
+        ])
+
+    def balances(self):
+        return (
+            Party.objects.get(pk=self.customer.pk).credit_balance,
+            Party.objects.get(pk=self.supplier.pk).credit_balance,
+            Account.objects.get(pk=self.account.pk).balance,
+            Inventory.objects.get(pk=self.product.pk).quantity,
+        )
+
+    def test_void_restores_balances_and_keeps_ledgers_consistent(self):
+        from .backup import figures
+        from .ledger import PartyLedger, AccountLedger, StockLedger
+        from .models import Invoice
+        from .voiding import void
+
+        self.assertNotEqual(self.balances(), (Decimal("0"), Decimal("0"), Decimal("0"), Decimal("1000")))
+
+        result = void(
+            sales=SalePurchase.objects.filter(pk__in=[self.credit_sale.pk, self.cash_purchase.pk]),
+            invoices=Invoice.objects.filter(pk=self.invoice.pk),
+            cash=CashBankTransaction.objects.filter(pk=self.receipt.pk),
+        )
+        self.assertEqual((result["sales"], result["invoices"], result["cash"]), (2, 1, 1))
+        self.assertEqual((result["parties"], result["accounts"], result["products"]), (1, 1, 1))
+
+        self.assertEqual(self.balances(), (Decimal("0"), Decimal("0"), Decimal("0"), Decimal("1000")))
+        self.assertEqual(self.credit_sale.reversal.amount, Decimal("-902.50"))
+        self.assertEqual(self.invoice.reversal.lines.count(), 2)
+
+        self.customer.refresh_from_db()
+        self.account.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(PartyLedger(self.customer).closing(), self.customer.credit_balance)
+        self.assertEqual(AccountLedger(self.account).closing(), self.account.balance)
+        self.assertEqual(StockLedger(self.product).rows()[-1]["type"], "SALE REVERSAL")
+        self.assertTrue(all(kind["mismatched"] == 0 for kind in (figures()["party"], figures()["account"])))
+
+    def test_rejected_batches_write_nothing(self):
+        from django.core.exceptions import ValidationError
+        from .voiding import void
+
+        void(sales=SalePurchase.objects.filter(pk=self.credit_sale.pk))
+        before = self.balances()
+        rows = SalePurchase.objects.count()
+
+        for selection in (
+            [self.credit_sale.pk, self.cash_purchase.pk],   # already voided
+            [self.credit_sale.reversal.pk],                 # a reversal
+            [self.invoice.lines.first().pk],                # an invoice line
+        ):
+            with self.assertRaises(ValidationError):
+                void(sales=SalePurchase.objects.filter(pk__in=selection))
+
+        # the purchased stock has been sold since
+        Inventory.objects.filter(pk=self.product.pk).update(quantity=Decimal("1"))
+        with self.assertRaisesMessage(ValidationError, "Not enough stock"):
+            void(sales=SalePurchase.objects.filter(pk=self.cash_purchase.pk))
+
+        Inventory.objects.filter(pk=self.product.pk).update(quantity=before[3])
+        self.assertEqual(self.balances(), before)
+        self.assertEqual(SalePurchase.objects.count(), rows)
+
+    def test_admin_action_and_api_replace_delete(self):
+        self.client.force_login(self.user)
+        changelist = reverse("admin:accounting_sale_changelist")
+
+        response = self.client.get(changelist)
+        self.assertContains(response, "void_selected")
+        self.assertNotContains(response, "delete_selected")
+
+        response = self.client.post(changelist, {"action": "void_selected", "_selected_action": [self.credit_sale.pk]}, follow=True)
+        self.assertContains(response, "Voided 1 row(s)")
+        self.assertEqual(Party.objects.get(pk=self.customer.pk).credit_balance, Decimal("-300.50"))
+
+        url = reverse("cashbanktransaction-detail", args=[self.receipt.pk])
+        self.assertEqual(self.client.delete(url).status_code, 405)
+
+        response = self.client.post(reverse("cashbanktransaction-void"), {"ids": [self.receipt.pk]}, content_type="application/json")
+        self.assertEqual(response.json()["cash"], 1)
+        response = self.client.post(reverse("cashbanktransaction-void"), {"ids": [self.receipt.pk]}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Party.objects.get(pk=self.customer.pk).credit_balance, Decimal("0.00"))
+
+        for ids in (["abc"], [{}], [True], [self.credit_sale.pk, None]):
+            response = self.client.post(reverse("salepurchase-void"), {"ids": ids}, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("integers", response.json()["error"])
+
+    def test_price_history_skips_archived_rows_voided_in_the_live_books(self):
+        from datetime import date
+        from . import pricing
+        from .closing import close_year
+        from .models import FiscalYear
+        from .voiding import void
+
+        year = FiscalYear.objects.create(name="2024-25", start_date=date(2024, 4, 1), end_date=date(2025, 3, 31))
+        sale = SalePurchase(purpose="sale", payment_mode="credit", party=self.customer, inventory=self.product,
+                            quantity=Decimal("1"), price_per_unit=Decimal("77"),
+                            date=timezone.make_aware(timezone.datetime(2025, 3, 10)))
+        sale.save()
+
+        # Voided after the year end: the reversal stays live, the sale is archived
+        void(sales=SalePurchase.objects.filter(pk=sale.pk), when=timezone.make_aware(timezone.datetime(2025, 4, 5)))
+        close_year(year)
+
+        pricing.rebuild()
+        rates = pricing.last_rates(self.product, self.customer)
+        self.assertNotIn("77.00", [rate["price"] for rate in rates["party_rates"] + rates["rates"]])
+        self.assertIn("90.25", [rate["price"] for rate in rates["party_rates"]])
+
+
+class FastReadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+        SalePurchase(purpose="sale", payment_mode="credit", party=cls.customer, inventory=cls.product,
+                     quantity=Decimal("2.5"), price_per_unit=Decimal("90.25")).save()
+        SalePurchase(purpose="purchase", payment_mode="cash", party=cls.supplier, account=cls.account,
+                     inventory=cls.product, quantity=Decimal("4"), price_per_unit=Decimal("80"),
+                     date=timezone.make_aware(timezone.datetime(2024, 3, 1, 9, 30, 15, 123456))).save()
+        CashBankTransaction(transaction_type="receive", party=cls.customer, account=cls.account,
+                            amount=Decimal("300.5")).save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_fast_list_matches_the_serializers(self):
+        for name in ("salepurchase-list", "cashbanktransaction-list"):
+            slow = self.client.get(reverse(name)).json()
+            fast = self.client.get(reverse(name), {"fast": "1"}).json()
+
+            self.assertEqual(len(fast), len(slow))
+            for slow_row, fast_row in zip(slow, fast):
+                self.assertEqual(list(slow_row.items()), [item for item in fast_row.items() if not item[0].endswith("_name")])
+                self.assertEqual(fast_row["party_name"], Party.objects.get(pk=fast_row["party"]).name)
+
+        fast = self.client.get(reverse("salepurchase-list"), {"fast": "1"}).json()
+        self.assertEqual(fast[1]["account_name"], "Cash")
+        self.assertIsNone(fast[0]["account_name"])
+        self.assertEqual(fast[0]["inventory_name"], "HDPE Granules")
+
+    def test_encoders_agree_with_drf_fields(self):
+        from zoneinfo import ZoneInfo
+        from .fastread import codec
+        from .serializers import SalePurchaseSerializer
+
+        fields = SalePurchaseSerializer().fields
+        row_codec = codec(SalePurchaseSerializer)
+        row = [None] * len(row_codec.names)
+
+        values = {
+            "quantity": Decimal("2.125"),       # rounds as DRF rounds
+            "amount": Decimal("-902.5"),
+            "date": timezone.make_aware(timezone.datetime(2024, 3, 1, 23, 59, 59, 5)),
+        }
+        for name, value in values.items():
+            row[row_codec.names.index(name)] = value
+
+        for zone in ("UTC", "Asia/Kolkata"):
+            with timezone.override(ZoneInfo(zone)):
+                encoded = row_codec.encode([row])[0]
+                for name, value in values.items():
+                    self.assertEqual(encoded[name], fields[name].to_representation(value))
+
+
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.client.force_login(self.user)
+
+    def profile(self, **overrides):
+        from django.test import override_settings
+
+        profiled = override_settings(
+            **{"PROFILE_DIR": self.directory, "PROFILE_PATHS": [r"/ledger/$"], "PROFILE_KEEP": 2, **overrides},
+        )
+        profiled.enable()
+        self.addCleanup(profiled.disable)
+
+    def test_off_by_default(self):
+        import os
+
+        self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]))
+        self.assertFalse(os.listdir(self.directory))
+
+    def test_slow_matching_requests_are_kept_and_rotated(self):
+        import os
+        from . import profiling
+
+        self.profile(PROFILE_MODE="cprofile", PROFILE_SLOWER_THAN_MS=0)
+        self.client.get(reverse("admin:accounting_party_changelist"))
+        for _ in range(3):
+            self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]))
+
+        self.assertEqual(len(os.listdir(profiling.directory())), 2)
+        profile = profiling.load(profiling.stored()[0]["id"])
+        self.assertEqual(profile["path"], reverse("admin:party-ledger", args=[self.customer.pk]))
+        self.assertEqual(profile["status"], 200)
+        self.assertTrue(any("party_ledger_view" in row["function"] for row in profile["top"]))
+
+        self.profile(PROFILE_SLOWER_THAN_MS=60_000)
+        self.client = self.client_class()
+        self.client.force_login(self.user)
+        self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]))
+        self.assertEqual(profiling.stored()[0]["id"], profile["id"])
+
+    def test_sampled_profiles_in_the_admin(self):
+        from . import profiling
+
+        self.profile(PROFILE_MODE="sample", PROFILE_SAMPLE_INTERVAL_MS=1)
+        self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]))
+        profile_id = profiling.stored()[0]["id"]
+
+        stacks = {("handler", "view", "loop"): 3, ("handler", "view"): 1}
+        self.assertEqual(
+            [(row["function"], row["self_ms"], row["total_ms"]) for row in profiling.sampled_top(stacks, 5)],
+            [("view", 5, 20), ("handler", 0, 20), ("loop", 15, 15)],
+        )
+
+        response = self.client.get(reverse("admin:accounting_requestprofile_changelist"))
+        self.assertContains(response, profile_id)
+
+        response = self.client.get(reverse("admin:accounting_requestprofile_change", args=[profile_id]))
+        self.assertContains(response, "samples every 1 ms")
+
+        response = self.client.get(reverse("admin:request-profile-folded", args=[profile_id]))
+        self.assertEqual(response.status_code, 200)
+        for line in response.content.decode().splitlines():
+            self.assertRegex(line, r"^\S.* \d+$")
+
+        response = self.client.get(reverse("admin:accounting_requestprofile_change", args=["..passwd"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_profiles_are_kept_per_company(self):
+        from . import profiling, tenancy
+
+        self.profile(PROFILE_SLOWER_THAN_MS=0)
+        self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]))
+        own = profiling.stored()[0]["id"]
+
+        other = profiling.save({
+            "method": "GET", "path": "/admin/other/", "view": None, "status": 200, "tenant": "other",
+            "started_at": time.time(), "duration_ms": 1.0, "mode": "sample", "top": [],
+        })
+
+        response = self.client.get(reverse("admin:accounting_requestprofile_changelist"))
+        self.assertContains(response, own)
+        self.assertNotContains(response, other)
+        response = self.client.get(reverse("admin:accounting_requestprofile_change", args=[other]))
+        self.assertEqual(response.status_code, 404)
+
+        with tenancy.activate("other"):
+            self.assertEqual([profile["id"] for profile in profiling.stored()], [other])
+
+    async def test_async_views_stay_on_the_event_loop(self):
+        from asgiref.sync import sync_to_async
+        from . import profiling
+
+        # cProfile cannot tell concurrent coroutines apart: sampled instead
+        self.profile(PROFILE_MODE="cprofile", PROFILE_PATHS=[r"/rows/$"])
+        self.assertTrue(profiling.ProfilingMiddleware.async_capable)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("ledger-rows", args=["party", self.customer.pk]))
+        self.assertEqual(response.status_code, 200)
+
+        profile = (await sync_to_async(profiling.stored)())[0]
+        self.assertEqual((profile["path"], profile["mode"]), (reverse("ledger-rows", args=["party", self.customer.pk]), "sample"))
+
+
+class StartupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.account, cls.customer, cls.supplier, cls.product = make_masters()
+
+    def test_heavy_dependencies_stay_out_of_startup(self):
+        import io
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        # Generous budgets: only the lazy-import check can fail here
+        call_command("bench_startup", runs=1, max_setup_ms=60_000, max_first_request_ms=60_000, stdout=out)
+        self.assertIn("within budget", out.getvalue())
+
+    def test_party_ledger_pdf(self):
+        import tempfile
+        from django.test import override_settings
+        from . import jobs
+        from .models import Job
+
+        SalePurchase(purpose="sale", payment_mode="credit", party=self.customer, inventory=self.product,
+                     quantity=Decimal("2"), price_per_unit=Decimal("90")).save()
+        self.client.force_login(self.user)
+
+        # Queued, not built in the request
+        response = self.client.get(reverse("admin:party-ledger", args=[self.customer.pk]), {"export": "1"})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse("admin:accounting_job_change", args=[job.pk]))
+        self.assertEqual((job.name, job.kwargs), ("party_ledger_pdf", {"party_id": self.customer.pk, "year_id": None}))
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(JOBS_RESULTS_DIR=directory):
+            jobs.run_pending()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.result["rows"]), (Job.SUCCEEDED, 1))
+
+            response = self.client.get(reverse("admin:job-download", args=[job.pk]))
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+            response.close()
@@ -0,0 +1,210 @@
+# accounting/timeseries.py
+
+"""
+Cash and bank balance curves per Account.
+
+Inflows (cash sales, receipts) and outflows (cash purchases, payments)
+are the AccountLedger's own rows and effects, summed per day in SQL and
+loaded once as integer arrays. ledger_core.bucket_totals() resamples
+them into daily, weekly (Monday) or monthly buckets with prefix sums,
+so a multi-year series costs one GROUP BY query per year and a linear
+pass. Closed years are read from the Archived* tables (history()),
+starting from the opening of the first closed year rather than the
+carried-forward opening on the account.
+
+Series are cached per company, account, granularity and range, under a
+key that includes fingerprint(): the row count and highest id of each
+posting table, live and archived, read from the database. Postings are never edited (a
+void adds reversing rows), so any posting, void, year close or restore
+changes the key, whichever process or command wrote it and whatever
+the cache backend; a rolled-back write never does. Edits to the
+account itself are in the key through its opening balance.
+settings.SERIES_CACHE_TIMEOUT only bounds how long unused series stay.
+"""
+
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from .ledger import AccountLedger
+from .ledger_core import bucket_totals, to_minor, to_decimal
+from .models import (
+    Account,
+    SalePurchase,
+    CashBankTransaction,
+    FiscalYear,
+    YearBalance,
+    ArchivedSalePurchase,
+    ArchivedCashBankTransaction,
+)
+
+
+GRANULARITIES = ("day", "week", "month")
+
+# Longest series served in one response (about 13 years of days)
+MAX_PERIODS = 5000
+
+
+def bucket_start(granularity, day):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(granularity, day):
+    if granularity == "week":
+        return day + timedelta(days=7)
+    if granularity == "month":
+        return (day + timedelta(days=32)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def periods(granularity, start, end):
+    """
+    Start dates of the buckets covering ``start``..``end``, plus the
+    start of the bucket after ``end`` (closing the last one).
+    """
+    bounds = [bucket_start(granularity, start)]
+    while bounds[-1] <= end:
+        if len(bounds) > MAX_PERIODS:
+            raise ValueError(f"More than {MAX_PERIODS} periods; use a longer granularity or a shorter range.")
+        bounds.append(next_bucket(granularity, bounds[-1]))
+    return bounds
+
+
+def first_activity():
+    """
+    Date of the earliest cash / bank posting, live or archived, or None.
+    """
+    dates = [
+        SalePurchase.objects.filter(account__isnull=False).aggregate(first=Min("date"))["first"],
+        CashBankTransaction.objects.aggregate(first=Min("date"))["first"],
+        ArchivedSalePurchase.objects.filter(account__isnull=False).aggregate(first=Min("date"))["first"],
+        ArchivedCashBankTransaction.objects.aggregate(first=Min("date"))["first"],
+    ]
+    dates = [value for value in dates if value is not None]
+    return min(dates).date() if dates else None
+
+
+# =====================================================
+# CACHE
+# =====================================================
+
+def fingerprint():
+    """
+    State of the postings: "rows.last_id" per live and archive posting
+    table, indexed aggregates.
+    """
+    parts = []
+    for model in (SalePurchase, CashBankTransaction, ArchivedSalePurchase, ArchivedCashBankTransaction):
+        state = model.objects.aggregate(rows=Count("pk"), last=Max("pk"))
+        parts.append(f"{state['rows']}.{state['last'] or 0}")
+    return "-".join(parts)
+
+
+# =====================================================
+# SERIES
+# =====================================================
+
+def history(account):
+    """
+    (opening, days, credits, debits) over the account's whole history:
+    each closed year's archive in date order, then the live tables.
+    The opening is the account's opening in the first closed year that
+    has one, else its current opening balance.
+    """
+    opening = (
+        YearBalance.objects
+        .filter(account=account, fiscal_year__is_closed=True)
+        .order_by("fiscal_year__start_date")
+        .values_list("opening", flat=True)
+        .first()
+    )
+    if opening is None:
+        opening = account.opening_balance
+
+    days, credits, debits = array("l"), array("q"), array("q")
+    years = FiscalYear.objects.filter(is_closed=True).order_by("start_date")
+
+    # Years do not overlap and live rows all follow the last close,
+    # so appending keeps the days ascending
+    for year in [*years, None]:
+        year_days, year_credits, year_debits = AccountLedger(account, year=year).daily_totals()
+        days.extend(year_days)
+        credits.extend(year_credits)
+        debits.extend(year_debits)
+
+    return opening, days, credits, debits
+
+
+def account_series(account, granularity, start, end, state=None):
+    """
+    One account's curve over the buckets of ``periods()``: opening
+    balance before the first bucket, then inflow, outflow and closing
+    balance per bucket (Decimal strings). ``state`` is a fingerprint()
+    shared by the accounts of one request.
+    """
+    # The read alias tells companies and live / snapshot data apart
+    key = ":".join(str(part) for part in (
+        "accounting:series", router.db_for_read(Account), state or fingerprint(),
+        account.pk, account.opening_balance, granularity, start, end,
+    ))
+
+    cached = cache.get(key)
+    if cached is not None:
+        return {**cached, "name": account.name, "type": account.account_type}
+
+    bounds = periods(granularity, start, end)
+    opening, days, credits, debits = history(account)
+
+    totals = bucket_totals(
+        days, credits, debits,
+        [bound.toordinal() for bound in bounds],
+        opening=to_minor(opening),
+    )
+
+    series = {
+        "id": account.pk,
+        "name": account.name,
+        "type": account.account_type,
+        "opening": str(to_decimal(totals["opening"])),
+        "inflow": [str(to_decimal(value)) for value in totals["credit"]],
+        "outflow": [str(to_decimal(value)) for value in totals["debit"]],
+        "balance": [str(to_decimal(value)) for value in totals["closing"]],
+    }
+
+    cache.set(key, series, settings.SERIES_CACHE_TIMEOUT)
+    return series
+
+
+def cash_flow(granularity, start=None, end=None, accounts=None):
+    """
+    Balance curves of ``accounts`` (all by default) on shared periods.
+    ``start`` defaults to the first posting, ``end`` to today.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}.")
+
+    end = end or timezone.now().date()
+    start = start or first_activity() or end
+    if start > end:
+        raise ValueError("start is after end.")
+
+    accounts = accounts if accounts is not None else Account.objects.order_by("name")
+    bounds = periods(granularity, start, end)
+    state = fingerprint()
+
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "periods": [bound.isoformat() for bound in bounds[:-1]],
+        "accounts": [account_series(account, granularity, start, end, state) for account in accounts],
+    }
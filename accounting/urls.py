@@ -1,11 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SalePurchaseViewSet, CashBankTransactionViewSet
+from .views import SalePurchaseViewSet, CashBankTransactionViewSet, InvoiceViewSet, SearchView, CashFlowView, LastRatesView, StockAlertView
+from . import views
 
 router = DefaultRouter()
 router.register(r'sale-purchase', SalePurchaseViewSet)
 router.register(r'cash-bank', CashBankTransactionViewSet)
+router.register(r'invoices', InvoiceViewSet)
 
 urlpatterns = [
+    path('search/', SearchView.as_view(), name='search'),
+    path('cash-flow/', CashFlowView.as_view(), name='cash-flow'),
+    path('rates/', LastRatesView.as_view(), name='last-rates'),
+    path('stock-alerts/', StockAlertView.as_view(), name='stock-alerts'),
+    path('ledgers/<str:kind>/<int:pk>/rows/', views.ledger_rows, name='ledger-rows'),
+    path('ledgers/<str:kind>/<int:pk>/totals/', views.ledger_totals, name='ledger-totals'),
+    path('ledgers/<str:kind>/<int:pk>/monthly/', views.ledger_monthly, name='ledger-monthly'),
+    path('ledgers/<str:kind>/<int:pk>/export.csv', views.ledger_export, name='ledger-export'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
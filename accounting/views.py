@@ -1,13 +1,315 @@
-from rest_framework import viewsets
-from .models import SalePurchase, CashBankTransaction
-from .serializers import SalePurchaseSerializer, CashBankTransactionSerializer
+import csv
+import io
+import json
+from datetime import date
+from functools import wraps
 
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from .models import SalePurchase, CashBankTransaction, Invoice, FiscalYear, Account, Party, Inventory, StockAlert
+from .serializers import SalePurchaseSerializer, CashBankTransactionSerializer, InvoiceSerializer
+from . import search, reporting, timeseries, pricing, voiding
+from .idempotency import IdempotentCreateMixin
+from .fastread import FastListMixin
+from .ledger import LEDGERS, CHUNK_SIZE, MAX_CHUNK_SIZE
 
-class SalePurchaseViewSet(viewsets.ModelViewSet):
+
+class VoidMixin:
+    """
+    POST <list url>/void/ {"ids": [...]} voids those rows in one
+    transaction (accounting.voiding): compensating entries are posted
+    and balances corrected. DELETE is not offered.
+    """
+
+    void_kind = None
+
+    http_method_names = [method for method in viewsets.ModelViewSet.http_method_names if method != "delete"]
+
+    @action(detail=False, methods=["post"])
+    def void(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids or not all(type(pk) is int for pk in ids):
+            return Response({"error": "ids must be a non-empty list of integers."}, status=400)
+
+        rows = self.get_queryset().filter(pk__in=ids)
+        if rows.count() != len(set(ids)):
+            return Response({"error": "Unknown (or archived) ids."}, status=400)
+
+        try:
+            result = voiding.void(**{self.void_kind: rows})
+        except ValidationError as error:
+            return Response({"error": error.messages}, status=400)
+
+        return Response(result)
+
+
+class SalePurchaseViewSet(FastListMixin, VoidMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = SalePurchase.objects.all()
     serializer_class = SalePurchaseSerializer
+    void_kind = "sales"
 
 
-class CashBankTransactionViewSet(viewsets.ModelViewSet):
+class CashBankTransactionViewSet(FastListMixin, VoidMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = CashBankTransaction.objects.all()
-    serializer_class = CashBankTransactionSerializer
\ No newline at end of file
+    serializer_class = CashBankTransactionSerializer
+    void_kind = "cash"
+
+
+class InvoiceViewSet(VoidMixin,
+                     IdempotentCreateMixin,
+                     mixins.CreateModelMixin,
+                     mixins.ListModelMixin,
+                     mixins.RetrieveModelMixin,
+                     viewsets.GenericViewSet):
+    """
+    Multi-line invoices. Posted invoices cannot be edited or deleted,
+    only voided.
+    """
+    queryset = Invoice.objects.prefetch_related('lines')
+    serializer_class = InvoiceSerializer
+    void_kind = "invoices"
+
+
+class SearchView(APIView):
+    """
+    Ranked party / product lookup.
+
+    GET /api/search/?q=<term>&type=party|inventory&limit=<n>
+    (type omitted → both).
+    """
+
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        term = request.query_params.get('q', '').strip()
+        kind = request.query_params.get('type')
+
+        try:
+            limit = int(request.query_params.get('limit', search.DEFAULT_LIMIT))
+        except ValueError:
+            limit = search.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        data = {}
+
+        if kind in (None, 'party'):
+            parties = search.search_parties(term, limit=limit) if term else []
+            data['parties'] = [
+                {
+                    'id': p.pk,
+                    'name': p.name,
+                    'phone': p.phone,
+                    'party_type': p.party_type,
+                }
+                for p in parties[:limit]
+            ]
+
+        if kind in (None, 'inventory'):
+            products = search.search_inventory(term, limit=limit) if term else []
+            data['inventory'] = [
+                {
+                    'id': i.pk,
+                    'name': i.name,
+                    'unit': i.unit,
+                    'default_price': str(i.default_price),
+                }
+                for i in products[:limit]
+            ]
+
+        return Response(data)
+
+
+class LastRatesView(APIView):
+    """
+    Last rates of a product, for billing forms.
+
+    GET /api/rates/?inventory=<id>&party=<id>&purpose=sale|purchase
+    (party optional, purpose defaults to sale).
+    """
+
+    def get(self, request):
+        params = request.query_params
+
+        try:
+            inventory = get_object_or_404(Inventory, pk=int(params.get("inventory", "")))
+            party = get_object_or_404(Party, pk=int(params["party"])) if params.get("party") else None
+            data = pricing.last_rates(inventory, party, params.get("purpose", "sale"))
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response(data)
+
+
+class StockAlertView(APIView):
+    """
+    Products at or below their reorder level or days-of-cover
+    threshold, most urgent first (no computation: the alert table is
+    kept by accounting.stock).
+
+    GET /api/stock-alerts/?reason=reorder|cover
+    """
+
+    def get(self, request):
+        alerts = StockAlert.objects.select_related("inventory")
+
+        reason = request.query_params.get("reason")
+        if reason == "reorder":
+            alerts = alerts.filter(below_reorder_level=True)
+        elif reason == "cover":
+            alerts = alerts.filter(below_cover=True)
+
+        return Response({
+            "alerts": [
+                {
+                    "inventory": alert.inventory_id,
+                    "name": alert.inventory.name,
+                    "unit": alert.inventory.unit,
+                    "quantity": str(alert.quantity),
+                    "reorder_level": str(alert.inventory.reorder_level),
+                    "daily_usage": str(alert.daily_usage),
+                    "days_of_cover": None if alert.days_of_cover is None else str(alert.days_of_cover),
+                    "min_cover_days": alert.inventory.min_cover_days,
+                    "below_reorder_level": alert.below_reorder_level,
+                    "below_cover": alert.below_cover,
+                    "since": alert.since,
+                }
+                for alert in alerts
+            ],
+        })
+
+
+class CashFlowView(APIView):
+    """
+    Cash / bank balance curves per account on shared periods.
+
+    GET /api/cash-flow/?granularity=day|week|month&start=<date>&end=<date>&account=<id>[,<id>...]
+    (defaults: month, first posting, today, every account).
+    """
+
+    def get(self, request):
+        params = request.query_params
+
+        try:
+            start = date.fromisoformat(params["start"]) if params.get("start") else None
+            end = date.fromisoformat(params["end"]) if params.get("end") else None
+
+            accounts = None
+            if params.get("account"):
+                ids = [int(pk) for pk in params["account"].split(",")]
+                accounts = Account.objects.filter(pk__in=ids).order_by("name")
+
+            with reporting.reads():
+                data = timeseries.cash_flow(params.get("granularity", "month"), start, end, accounts)
+
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        return Response(data)
+
+
+# =====================================================
+# ASYNC LEDGER READS (ASGI)
+# =====================================================
+#
+# GET /api/ledgers/<party|account|inventory>/<id>/rows/?offset=&limit=
+#     /totals/
+#     /monthly/       NDJSON, one line per month, streamed
+#     /export.csv     whole ledger as CSV, streamed
+#
+# All take ?year=<id> for a closed fiscal year. Under ASGI these are
+# coroutines: a long ledger waits on the database without holding a
+# worker, so quick requests keep being served next to it. Under WSGI
+# they still work, but Django buffers the streamed bodies. Session
+# authentication only (the DRF views also accept Basic auth).
+
+def ledger_endpoint(view):
+    """
+    Authenticate, then call ``view(request, source)`` with the ledger
+    named by the URL, read through the reporting snapshot.
+    """
+
+    @reporting.reporting_view
+    async def lookup(request, kind, pk):
+        if kind not in LEDGERS:
+            raise Http404("Unknown ledger.")
+
+        model, ledger_class = LEDGERS[kind]
+        obj = await model.objects.filter(pk=pk).afirst()
+        if obj is None:
+            raise Http404(f"No such {kind}.")
+
+        year = None
+        if request.GET.get("year"):
+            try:
+                year = await FiscalYear.objects.aget(pk=request.GET["year"], is_closed=True)
+            except (FiscalYear.DoesNotExist, ValueError):
+                raise Http404("No such closed fiscal year.")
+
+        return await view(request, ledger_class(obj, year=year))
+
+    @wraps(view)
+    async def wrapper(request, kind, pk):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+
+        return await lookup(request, kind, pk)
+
+    return wrapper
+
+
+@ledger_endpoint
+async def ledger_rows(request, source):
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+        limit = int(request.GET.get("limit", CHUNK_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "offset and limit must be integers"}, status=400)
+
+    limit = max(1, min(limit, MAX_CHUNK_SIZE))
+    return JsonResponse(await source.achunk(offset, limit))
+
+
+@ledger_endpoint
+async def ledger_totals(request, source):
+    return JsonResponse(await source.atotals_json())
+
+
+@ledger_endpoint
+async def ledger_monthly(request, source):
+
+    async def lines():
+        async for month, totals in source.amonthly_totals():
+            data = {"month": month.isoformat(), **{key: str(value) for key, value in totals.items()}}
+            yield json.dumps(data) + "\n"
+
+    return StreamingHttpResponse(reporting.stream(lines()), content_type="application/x-ndjson")
+
+
+@ledger_endpoint
+async def ledger_export(request, source):
+
+    def render(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def render_entries(entries):
+        return render(source.render_row(entry) for entry in entries)
+
+    async def lines():
+        yield render([source.HEADERS])
+
+        # CSV formatting runs off the event loop, one batch at a time
+        async for entries in source.abatches():
+            yield await sync_to_async(render_entries)(entries)
+
+    response = StreamingHttpResponse(reporting.stream(lines()), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{source.obj._meta.model_name}-{source.obj.pk}-ledger.csv"'
+    return response
@@ -0,0 +1,199 @@
+# accounting/voiding.py
+
+"""
+Void (reverse) posted transactions.
+
+Postings are never edited or deleted. A voided sale / purchase, invoice
+or cash entry gets a compensating entry instead: a copy dated at the
+void, with quantity and amount negated and ``reversal_of`` pointing at
+the original. Every ledger, balance figure and report sums signed
+amounts, so the pair nets to zero everywhere while both stay visible.
+
+void() handles any selection in one transaction: the rows are locked
+and checked, balance corrections are summed per party, account and
+product and applied with one write per entity, and the compensating
+entries are inserted in batches. A product whose stock would go
+negative (a purchase reversed after the goods were sold), a row that
+is already voided or is itself a reversal, an invoice line selected
+without its invoice or a date in a closed year rejects the whole batch.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from . import pricing, stock
+from .models import Account, Party, Inventory, SalePurchase, Invoice, CashBankTransaction, FiscalYear
+
+
+# Rows per bulk_create / bulk_update batch and per id lookup
+BATCH_SIZE = 500
+
+# Problems listed in one ValidationError
+MAX_PROBLEMS = 20
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _already_voided(model, rows):
+    voided = set()
+    for chunk in _chunks([row.pk for row in rows]):
+        voided.update(model.objects.filter(reversal_of__in=chunk).values_list("reversal_of_id", flat=True))
+    return voided
+
+
+def _check(label, model, rows, problems):
+    voided = _already_voided(model, rows)
+
+    for row in rows:
+        if row.reversal_of_id:
+            problems.append(f"{label} #{row.pk} is itself a reversal.")
+        elif row.pk in voided:
+            problems.append(f"{label} #{row.pk} is already voided.")
+        elif getattr(row, "invoice_id", None):
+            problems.append(f"{label} #{row.pk} is a line of invoice #{row.invoice_id}; void the invoice.")
+
+
+def _apply(model, field, deltas):
+    """
+    Add each entity's summed correction with one locked read and one
+    batched write per BATCH_SIZE entities.
+    """
+    changed = []
+
+    for chunk in _chunks(pk for pk, delta in deltas.items() if delta):
+        for obj in model.objects.select_for_update().filter(pk__in=chunk):
+            setattr(obj, field, getattr(obj, field) + deltas[obj.pk])
+
+            if field == "quantity" and obj.quantity < 0:
+                raise ValidationError(f"Not enough stock of {obj.name} left to reverse its purchase.")
+
+            changed.append(obj)
+
+    model.objects.bulk_update(changed, [field], batch_size=BATCH_SIZE)
+    return len(changed)
+
+
+def _reverse_line(line, when, invoice=None):
+    return SalePurchase(
+        purpose=line.purpose,
+        payment_mode=line.payment_mode,
+        party_id=line.party_id,
+        inventory_id=line.inventory_id,
+        account_id=line.account_id,
+        quantity=-line.quantity,
+        price_per_unit=line.price_per_unit,
+        amount=-line.amount,
+        invoice=invoice,
+        reversal_of=line,
+        date=when,
+    )
+
+
+def void(sales=None, invoices=None, cash=None, when=None):
+    """
+    Void the rows of the given SalePurchase, Invoice and
+    CashBankTransaction querysets. Returns counts of voided rows and of
+    corrected parties, accounts and products; raises ValidationError
+    (nothing written) listing what cannot be voided.
+    """
+    when = when or timezone.now()
+
+    with db_transaction.atomic():
+
+        FiscalYear.check_open(when)
+
+        sales = list(sales.select_for_update()) if sales is not None else []
+        invoices = list(invoices.select_for_update()) if invoices is not None else []
+        cash = list(cash.select_for_update()) if cash is not None else []
+
+        problems = []
+        _check("Sale / purchase", SalePurchase, sales, problems)
+        _check("Invoice", Invoice, invoices, problems)
+        _check("Cash entry", CashBankTransaction, cash, problems)
+
+        if problems:
+            more = len(problems) - MAX_PROBLEMS
+            raise ValidationError(problems[:MAX_PROBLEMS] + ([f"… and {more} more."] if more > 0 else []))
+
+        lines = []
+        for chunk in _chunks(invoice.pk for invoice in invoices):
+            lines += SalePurchase.objects.select_for_update().filter(invoice__in=chunk)
+
+        # ---------- one summed correction per entity ----------
+        party = defaultdict(Decimal)
+        account = defaultdict(Decimal)
+        quantity = defaultdict(Decimal)
+
+        for row in sales + invoices:
+            sign = 1 if row.purpose == "sale" else -1
+            if row.payment_mode == "cash":
+                account[row.account_id] -= sign * row.amount
+            else:
+                party[row.party_id] -= sign * row.amount
+
+        for line in sales + lines:
+            quantity[line.inventory_id] += line.quantity if line.purpose == "sale" else -line.quantity
+
+        for entry in cash:
+            sign = 1 if entry.transaction_type == "receive" else -1
+            account[entry.account_id] -= sign * entry.amount
+            party[entry.party_id] += sign * entry.amount
+
+        corrected = {
+            "parties": _apply(Party, "credit_balance", party),
+            "accounts": _apply(Account, "balance", account),
+            "products": _apply(Inventory, "quantity", quantity),
+        }
+
+        # ---------- compensating entries ----------
+        reversed_sales = [_reverse_line(line, when) for line in sales]
+        SalePurchase.objects.bulk_create(reversed_sales, batch_size=BATCH_SIZE)
+
+        reversed_invoices = Invoice.objects.bulk_create(
+            [
+                Invoice(
+                    purpose=invoice.purpose,
+                    payment_mode=invoice.payment_mode,
+                    party_id=invoice.party_id,
+                    account_id=invoice.account_id,
+                    amount=-invoice.amount,
+                    reversal_of=invoice,
+                    date=when,
+                )
+                for invoice in invoices
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        reversal_for = {invoice.reversal_of_id: invoice for invoice in reversed_invoices}
+
+        reversed_lines = [_reverse_line(line, when, reversal_for[line.invoice_id]) for line in lines]
+        SalePurchase.objects.bulk_create(reversed_lines, batch_size=BATCH_SIZE)
+
+        CashBankTransaction.objects.bulk_create(
+            [
+                CashBankTransaction(
+                    transaction_type=entry.transaction_type,
+                    party_id=entry.party_id,
+                    account_id=entry.account_id,
+                    amount=-entry.amount,
+                    reversal_of=entry,
+                    date=when,
+                )
+                for entry in cash
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        # ---------- derived data (bulk writes send no signals) ----------
+        pricing.forget(sales + lines)
+        stock.record(reversed_sales + reversed_lines)
+
+    return {"sales": len(sales), "invoices": len(invoices), "cash": len(cash), **corrected}
@@ -3,6 +3,10 @@ ASGI config for accounting_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with any ASGI server, e.g. ``uvicorn accounting_project.asgi:application``:
+the /api/ledgers/ endpoints are async views that stream long ledgers
+without tying up a worker (``manage.py loadtest_ledgers`` compares).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -14,3 +18,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'accounting_project.settings')
 
 application = get_asgi_application()
+
+# Background job runner for admin actions (settings.JOBS_AUTOSTART)
+from accounting import jobs  # noqa: E402
+
+jobs.autostart()
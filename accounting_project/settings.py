@@ -46,7 +46,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Off (removes itself) unless PROFILE_PATHS / PROFILE_SLOWER_THAN_MS
+    'accounting.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Picks the company database for the request (before sessions / auth)
+    'accounting.tenancy.TenantMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,6 +71,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounting.tenancy.branding',
             ],
         },
     },
@@ -88,6 +93,88 @@ DATABASES = {
     }
 }
 
+# Group companies served by this deployment, one SQLite file each:
+#
+#   TENANTS = {
+#       'bhavikha': {
+#           'hosts': ['bhavikha.example.com'],
+#           'database': BASE_DIR / 'db_bhavikha.sqlite3',   # optional
+#           'company': {'name': 'Bhavikha Plastic Pvt Ltd', 'gst': '...'},
+#       },
+#   }
+#
+# Requests pick a company by X-Company header or host (accounting.tenancy).
+# Empty: a single company on the 'default' database.
+TENANTS = {}
+
+# Branding shown in the admin and on statements, unless a tenant sets its own
+COMPANY = {
+    'name': 'Bhavikha Plastic Pvt Ltd',
+    'short_name': 'Bhavikha Plastic',
+    'gst': '24ABCDE1234F1Z5',
+    'address': 'Jharoda Kalan, New Delhi, India',
+}
+
+for _alias, _tenant in TENANTS.items():
+    DATABASES.setdefault(_alias, {
+        **DATABASES['default'],
+        'NAME': _tenant.get('database', BASE_DIR / f'db_{_alias}.sqlite3'),
+        # Keep each company's connection open between requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Reporting snapshot (accounting.reporting): ledgers and reports read a
+# read-only copy of each database, refreshed with `manage.py refresh_snapshot`
+# (SQLite online backup), so heavy reads never compete with posting.
+# Off: reports read the live database.
+REPORTING_SNAPSHOT = False
+
+# Snapshots older than this (seconds) are flagged as stale on report pages
+REPORTING_SNAPSHOT_MAX_AGE = 15 * 60
+
+# Cached cash-flow series (accounting.timeseries) are keyed by the state
+# of the posting tables, so no posting is ever missed; this only bounds
+# how long unused series stay in the cache
+SERIES_CACHE_TIMEOUT = 10 * 60
+
+# Days of sales the stock consumption rate averages over
+# (accounting.stock; run `manage.py refresh_stock_alerts` daily)
+STOCK_USAGE_DAYS = 30
+
+# Slow-request profiles (accounting.profiling): requests whose path
+# matches a PROFILE_PATHS regex (all, if only a threshold is set) and
+# take longer than PROFILE_SLOWER_THAN_MS are profiled by sampling the
+# stack every PROFILE_SAMPLE_INTERVAL_MS ('cprofile': exact but slower).
+# The newest PROFILE_KEEP of each company are kept in its own directory
+# under PROFILE_DIR and listed in its admin. Both empty: off.
+PROFILE_PATHS = []
+PROFILE_SLOWER_THAN_MS = None
+PROFILE_MODE = 'sample'
+PROFILE_SAMPLE_INTERVAL_MS = 5
+PROFILE_KEEP = 50
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Start-up budget checked by `manage.py bench_startup` (median of fresh
+# processes): django.setup() and the first request after it
+STARTUP_BUDGET_SETUP_MS = 600
+STARTUP_BUDGET_FIRST_REQUEST_MS = 400
+
+if REPORTING_SNAPSHOT:
+    for _alias in list(DATABASES):
+        DATABASES[f'{_alias}_snapshot'] = {
+            **DATABASES[_alias],
+            'NAME': f"file:{DATABASES[_alias]['NAME']}.snapshot?mode=ro",
+            # Reopen per request so a refreshed snapshot is picked up
+            'CONN_MAX_AGE': 0,
+            'TEST': {'MIRROR': _alias},
+        }
+
+DATABASE_ROUTERS = [
+    'accounting.reporting.ReportingRouter',
+    'accounting.tenancy.TenantRouter',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -114,6 +201,18 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Seconds a recorded Idempotency-Key response is replayed for
+# (pruned with `manage.py prune_idempotency_keys`)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Background jobs (accounting.jobs): worker threads per process, seconds
+# between polls of the job table, whether the web process runs jobs
+# itself (else use `manage.py run_jobs`), and where file results go
+JOBS_WORKERS = 2
+JOBS_POLL_INTERVAL = 2
+JOBS_AUTOSTART = True
+JOBS_RESULTS_DIR = BASE_DIR / 'job_results'
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
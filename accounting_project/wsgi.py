@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'accounting_project.settings')
 
 application = get_wsgi_application()
+
+# Background job runner for admin actions (settings.JOBS_AUTOSTART)
+from accounting import jobs  # noqa: E402
+
+jobs.autostart()